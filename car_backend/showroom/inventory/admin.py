@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Car, Customer, Sale
+from .models import (
+    Car, CarTombstone, Customer, CustomerSummary, DailyCarSales, MonthlyBrandSales, MonthlyCustomerSales, Reservation, Sale
+)
 from .models import UserProfile
 admin.site.register(UserProfile)
 
@@ -7,4 +9,9 @@ admin.site.register(UserProfile)
 admin.site.register(Car)
 admin.site.register(Customer)
 admin.site.register(Sale)
-
+admin.site.register(CustomerSummary)
+admin.site.register(DailyCarSales)
+admin.site.register(MonthlyBrandSales)
+admin.site.register(MonthlyCustomerSales)
+admin.site.register(Reservation)
+admin.site.register(CarTombstone)
@@ -0,0 +1,125 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import DailyCarSales, MonthlyBrandSales, MonthlyCustomerSales
+
+DEFAULT_RANGE_DAYS = 30
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# group_by -> (rollup, columns of each result row, granularity of the rollup)
+GROUPINGS = {
+    'day': (DailyCarSales, {'date': 'date'}, 'day'),
+    'car': (DailyCarSales, {'car': 'car_id', 'brand': 'car__brand', 'model': 'car__model'}, 'day'),
+    'month': (MonthlyBrandSales, {'month': 'month'}, 'month'),
+    'brand': (MonthlyBrandSales, {'brand': 'brand'}, 'month'),
+    'customer': (MonthlyCustomerSales, {'customer': 'customer_id', 'name': 'customer__name'}, 'month'),
+}
+ROLLUP_FIELDS = ('sales_count', 'units', 'revenue')
+CENTS = Decimal('0.01')
+# Aliases must not shadow the rollup columns they sum
+SUMS = {f'total_{name}': Sum(name) for name in ROLLUP_FIELDS}
+
+# Time series come back in date order, dimensions as a top list by revenue
+TIME_GROUPINGS = {'day', 'month'}
+
+# filter parameter -> lookup on each rollup that supports it
+FILTERS = {
+    'brand': {DailyCarSales: 'car__brand', MonthlyBrandSales: 'brand'},
+    'car': {DailyCarSales: 'car_id'},
+    'customer': {MonthlyCustomerSales: 'customer_id'},
+}
+
+
+def _totals(row):
+    # Money as a decimal string, like the serializers (DRF's encoder would make it a float)
+    return {
+        'sales_count': row['total_sales_count'] or 0,
+        'units': row['total_units'] or 0,
+        'revenue': str(Decimal(row['total_revenue'] or 0).quantize(CENTS)),
+    }
+
+
+def _parse_date(query_params, name, default, errors):
+    value = query_params.get(name, '').strip()
+    if not value:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        errors[name] = ["Enter a date as YYYY-MM-DD."]
+
+
+# ✅ Revenue analytics over the sales rollups
+# Two queries whatever the number of sales in the range: one grouped read of the
+# rollup rows and one aggregate for the totals. Monthly rollups answer by whole
+# months, so start / end are widened to month boundaries for those groupings.
+def sales_analytics(query_params):
+    errors = {}
+    group_by = query_params.get('group_by', 'day')
+    if group_by not in GROUPINGS:
+        errors['group_by'] = [f"Must be one of: {', '.join(GROUPINGS)}."]
+        return None, errors
+    model, columns, granularity = GROUPINGS[group_by]
+
+    end = _parse_date(query_params, 'end', timezone.localdate(), errors)
+    start = _parse_date(query_params, 'start', None, errors)
+    try:
+        limit = min(int(query_params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        errors['limit'] = ["Enter a positive integer."]
+    if errors:
+        return None, errors
+    if start is None:
+        start = end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end:
+        return None, {'start': ["Must not be after end."]}
+
+    if granularity == 'month':
+        start = start.replace(day=1)
+        end = (end.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        queryset = model.objects.filter(month__range=(start, end))
+    else:
+        queryset = model.objects.filter(date__range=(start, end))
+
+    for name, lookups in FILTERS.items():
+        value = query_params.get(name, '').strip()
+        if not value:
+            continue
+        if model not in lookups:
+            errors[name] = [f"Not available with group_by={group_by}."]
+            continue
+        if name != 'brand' and not value.isdigit():
+            errors[name] = ["Enter a whole number."]
+            continue
+        queryset = queryset.filter(**{lookups[model]: value})
+    if errors:
+        return None, errors
+
+    rows = (
+        queryset.order_by()
+        .values(*columns.values())
+        .annotate(**SUMS)
+    )
+    if group_by in TIME_GROUPINGS:
+        rows = rows.order_by(*columns.values())
+    else:
+        rows = rows.order_by('-total_revenue', *columns.values())[:limit]
+    totals = queryset.aggregate(**SUMS)
+
+    return {
+        'group_by': group_by,
+        'granularity': granularity,
+        'start': start,
+        'end': end,
+        'totals': _totals(totals),
+        'results': [
+            {**{name: row[source] for name, source in columns.items()}, **_totals(row)}
+            for row in rows
+        ],
+    }, None
@@ -0,0 +1,209 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Count, Max
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from rest_framework import exceptions
+from rest_framework.authentication import get_authorization_header
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .authentication import CachedTokenAuthentication
+from .caching import car_list_cache
+from .conditional import make_etag, not_modified_response, set_validators
+from .events import LIVE_EVENTS_SETTINGS, stream_events
+from .filters import CarFilter
+from .models import Car, Sale
+from .search import search_cars
+from .serializers import CarSerializer, SaleSerializer
+from .stats import aget_inventory_stats
+from .throttling import TokenBucketThrottle
+
+CAR_ORDERING_FIELDS = ['price', 'year', 'stock']
+
+
+# ✅ Async read endpoints
+# Native async views for the hot read paths, mounted under /api/async/. Under ASGI
+# they run on the event loop: token lookups, cache reads and queries go through the
+# async cache / ORM APIs instead of a thread per request. Responses (bodies, status
+# codes, pagination links, ETags) match the DRF views they mirror.
+def _json(data, status=200, **kwargs):
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False, **kwargs)
+
+
+async def _authenticate(request):
+    auth = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != b'token':
+        return None, None
+    if len(auth) != 2:
+        raise exceptions.AuthenticationFailed('Invalid token header.')
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        raise exceptions.AuthenticationFailed('Invalid token header. Token string should not contain invalid characters.')
+    return await CachedTokenAuthentication().aauthenticate_credentials(key)
+
+
+def async_read_view(*permission_classes, throttle_scope='default'):
+    """Authenticate with the cached token, check DRF permissions and rate limits,
+    render DRF errors."""
+    permission_classes = permission_classes or (IsAuthenticated,)
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return _json({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+            try:
+                user, token = await _authenticate(request)
+                # Replace the session-backed lazy user: resolving it would query synchronously
+                request.user, request.auth = user or AnonymousUser(), token
+                # Profiles come attached to the cached user: these checks never query
+                for permission_class in permission_classes:
+                    if not permission_class().has_permission(request, None):
+                        if user is None:
+                            raise exceptions.NotAuthenticated()
+                        raise exceptions.PermissionDenied()
+                throttle = TokenBucketThrottle()
+                if not await throttle.aallow_request(request, throttle_scope):
+                    raise exceptions.Throttled(throttle.wait())
+                return await view(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                headers = {'WWW-Authenticate': 'Token'} if exc.status_code == 401 else None
+                if getattr(exc, 'wait', None):
+                    headers = {'Retry-After': '%d' % float(exc.wait)}
+                detail = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+                return _json(detail, status=exc.status_code, headers=headers)
+        return wrapper
+    return decorator
+
+
+async def _paginate(request, queryset, page_size, page_size_param=None, max_page_size=None):
+    # PageNumberPagination with acount() and an async slice instead of Paginator's queries
+    if page_size_param and request.GET.get(page_size_param):
+        try:
+            requested = int(request.GET[page_size_param])
+            if requested > 0:
+                page_size = min(requested, max_page_size)
+        except ValueError:
+            pass
+
+    count = await queryset.acount()
+    paginator = Paginator(range(count), page_size)  # only used for the page arithmetic
+    page_number = request.GET.get('page') or 1
+    if page_number == 'last':
+        page_number = paginator.num_pages
+    try:
+        page = paginator.page(page_number)
+    except InvalidPage:
+        raise exceptions.NotFound('Invalid page.')
+
+    objects = [obj async for obj in queryset[page.start_index() - 1 if count else 0:page.end_index()]]
+    url = request.build_absolute_uri()
+    previous = None
+    if page.has_previous():
+        number = page.previous_page_number()
+        previous = remove_query_param(url, 'page') if number == 1 else replace_query_param(url, 'page', number)
+    return objects, {
+        'count': count,
+        'next': replace_query_param(url, 'page', page.next_page_number()) if page.has_next() else None,
+        'previous': previous,
+    }
+
+
+async def _filtered_cars(request):
+    filterset = CarFilter(request.GET, queryset=Car.objects.all())
+    if not filterset.is_valid():
+        raise exceptions.ValidationError(filterset.errors)
+    queryset = filterset.qs
+
+    ordering = [
+        term.strip() for term in request.GET.get('ordering', '').split(',')
+        if term.strip().lstrip('-') in CAR_ORDERING_FIELDS
+    ]
+    term = request.GET.get('search', '').strip()
+    if term:
+        # The trigram backend may need to (re)load its in-process index
+        queryset = await sync_to_async(search_cars)(queryset, term, rank=not request.GET.get('ordering'))
+    if ordering:
+        queryset = queryset.order_by(*ordering)
+    return queryset
+
+
+@async_read_view()
+async def car_list(request):
+    queryset = await _filtered_cars(request)
+    state = await queryset.aaggregate(last_modified=Max('updated_at'), total=Count('id'))
+    etag = make_etag(request.get_full_path(), state['last_modified'], state['total'])
+    not_modified = not_modified_response(request, etag, state['last_modified'])
+    if not_modified is not None:
+        return not_modified
+
+    key = await car_list_cache.akey(request)
+    data = await car_list_cache.aget(key)
+    cache_status = 'HIT'
+    if data is None:
+        cars, data = await _paginate(request, queryset, 5, 'page_size', 100)
+        data['results'] = CarSerializer(cars, many=True).data
+        await car_list_cache.aset(key, data)
+        cache_status = 'MISS'
+    response = _json(data, headers={'X-Cache': cache_status})
+    return set_validators(response, etag, state['last_modified'])
+
+
+@async_read_view()
+async def car_detail(request, pk):
+    car = await Car.objects.filter(pk=pk).afirst()
+    if car is None:
+        raise exceptions.NotFound('No Car matches the given query.')
+    etag = make_etag('car', pk, car.updated_at)
+    not_modified = not_modified_response(request, etag, car.updated_at)
+    if not_modified is not None:
+        return not_modified
+    return set_validators(_json(CarSerializer(car).data), etag, car.updated_at)
+
+
+@async_read_view(throttle_scope='car-statistics')
+async def car_statistics(request):
+    return _json(await aget_inventory_stats())
+
+
+@async_read_view()
+async def sale_list(request):
+    queryset = Sale.objects.select_related('car', 'customer').order_by('-sale_date', '-id')
+    customer_id = request.GET.get('customer')
+    if customer_id is not None:
+        if not customer_id.isdigit():
+            raise exceptions.ValidationError({'customer': ['Enter a whole number.']})
+        queryset = queryset.filter(customer_id=customer_id)
+    sales, data = await _paginate(request, queryset, 5)
+    data['results'] = SaleSerializer(sales, many=True).data
+    return _json(data)
+
+
+# ✅ Live stock and price changes as server-sent events (see events.py): one connection
+# per dashboard instead of polling the car list. EventSource reconnects by itself with
+# Last-Event-ID and gets what it missed; ?timeout=0 answers at once with the events
+# after Last-Event-ID (or ?last_event_id=), for clients that poll instead.
+@async_read_view(throttle_scope='car-stream')
+async def car_stream(request):
+    if not LIVE_EVENTS_SETTINGS['ENABLED']:
+        raise exceptions.NotFound('Live events are disabled.')
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    timeout = request.GET.get('timeout')
+    if last_id is not None and not last_id.isdigit():
+        raise exceptions.ValidationError({'last_event_id': ['Enter a whole number.']})
+    if timeout is not None and not timeout.isdigit():
+        raise exceptions.ValidationError({'timeout': ['Enter a whole number of seconds.']})
+
+    limit = LIVE_EVENTS_SETTINGS['MAX_STREAM_SECONDS']
+    events = stream_events(
+        int(last_id) if last_id is not None else None, min(int(timeout), limit) if timeout is not None else limit
+    )
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}  # no proxy buffering
+    if timeout == '0':
+        return HttpResponse(''.join([frame async for frame in events]), content_type='text/event-stream', headers=headers)
+    return StreamingHttpResponse(events, content_type='text/event-stream', headers=headers)
@@ -0,0 +1,197 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .models import UserProfile
+
+TOKEN_CACHE_SETTINGS = {
+    'MAX_SIZE': 10000,
+    # Entries of the shared cache: every worker sees the invalidations
+    'TTL': 300,
+    # Entries of the per-process LRU: invalidations only reach the worker that made
+    # them, so this bounds how long a revoked token still works on the others
+    'LOCAL_TTL': 5,
+    'SHARED_CACHE': '',
+    **getattr(settings, 'AUTH_TOKEN_CACHE', {}),
+}
+
+# The password hash never leaves the database; it stays deferred on cached users
+CACHED_USER_FIELDS = [f.attname for f in User._meta.concrete_fields if f.attname != 'password']
+CACHED_PROFILE_FIELDS = ['id', 'user_id', 'role']
+
+
+# ✅ Token → (user, role) caches
+class LocalTokenCache:
+    """Per-process LRU with a TTL on every entry."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    # In-memory only: safe to call straight from the event loop
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, value):
+        self.set(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SharedTokenCache:
+    """Entries kept in a Django cache (e.g. Redis / Memcached) shared by all workers."""
+
+    def __init__(self, alias, ttl):
+        self.alias = alias
+        self.ttl = ttl
+
+    def _key(self, key):
+        # Keys are secrets: only a digest is ever written to the shared store
+        return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        return caches[self.alias].get(self._key(key))
+
+    def set(self, key, value):
+        caches[self.alias].set(self._key(key), value, self.ttl)
+
+    def delete(self, key):
+        caches[self.alias].delete(self._key(key))
+
+    async def aget(self, key):
+        return await caches[self.alias].aget(self._key(key))
+
+    async def aset(self, key, value):
+        await caches[self.alias].aset(self._key(key), value, self.ttl)
+
+    def clear(self):
+        pass  # shared entries expire through their TTL
+
+
+if TOKEN_CACHE_SETTINGS['SHARED_CACHE']:
+    token_cache = SharedTokenCache(TOKEN_CACHE_SETTINGS['SHARED_CACHE'], TOKEN_CACHE_SETTINGS['TTL'])
+else:
+    token_cache = LocalTokenCache(TOKEN_CACHE_SETTINGS['MAX_SIZE'], TOKEN_CACHE_SETTINGS['LOCAL_TTL'])
+
+
+# Entries are dropped once the change commits: dropped earlier, a request could reload
+# the old row from the database (the change is not visible yet) and cache it again
+def _drop_after_commit(keys):
+    def drop():
+        for key in keys:
+            token_cache.delete(key)
+    transaction.on_commit(drop)
+
+
+def invalidate_token(key):
+    _drop_after_commit([key])
+
+
+def invalidate_user_tokens(user_id):
+    _drop_after_commit(list(Token.objects.filter(user_id=user_id).values_list('key', flat=True)))
+
+
+# ✅ Cached Token Authentication
+# A cache miss loads token, user and profile in one query; a hit costs no query at all.
+# The user comes back with its profile already attached, so IsAdmin / IsStaffOrAdmin
+# read request.user.userprofile.role without another round-trip. Entries are dropped
+# on logout, role changes and user / profile saves (see signals.py).
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is None:
+            entry = self._load(key)
+            token_cache.set(key, entry)
+
+        user, token = self._build(key, entry)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (user, token)
+
+    async def aauthenticate_credentials(self, key):
+        """Same as authenticate_credentials() for async views: no blocking call on the loop."""
+        entry = await token_cache.aget(key)
+        if entry is None:
+            try:
+                token = await Token.objects.select_related('user__userprofile').aget(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            entry = self._entry(token)
+            await token_cache.aset(key, entry)
+
+        user, token = self._build(key, entry)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (user, token)
+
+    def _load(self, key):
+        try:
+            token = Token.objects.select_related('user__userprofile').get(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        return self._entry(token)
+
+    def _entry(self, token):
+        user = token.user
+        try:
+            profile = user.userprofile
+        except UserProfile.DoesNotExist:
+            profile = None
+        return {
+            'db': token._state.db,
+            'created': token.created,
+            'user': [getattr(user, field) for field in CACHED_USER_FIELDS],
+            'profile': [getattr(profile, field) for field in CACHED_PROFILE_FIELDS] if profile else None,
+        }
+
+    def _build(self, key, entry):
+        # Fresh instances per request: cached data is never shared as mutable objects
+        db = entry['db']
+        user = User.from_db(db, CACHED_USER_FIELDS, entry['user'])
+        profile = None
+        if entry['profile'] is not None:
+            profile = UserProfile.from_db(db, CACHED_PROFILE_FIELDS, entry['profile'])
+            UserProfile.user.field.set_cached_value(profile, user)
+        # Same caching select_related() does; a missing profile is cached as None
+        User.userprofile.related.set_cached_value(user, profile)
+
+        token = Token.from_db(db, ['key', 'user_id', 'created'], [key, user.pk, entry['created']])
+        Token.user.field.set_cached_value(token, user)
+        return user, token
@@ -0,0 +1,144 @@
+import json
+import time
+from datetime import timedelta
+from itertools import count
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .models import UserProfile
+from .services import reserve_stock
+from .sync import encode_cursor
+from .throttling import rate_limits_bypassed
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list (None when empty)."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def latency_summary(latencies, elapsed):
+    """requests/s and latency percentiles (ms) of a run, in the shape the benchmark files use."""
+    latencies = sorted(latencies)
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 2)
+
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p90_ms': ms(percentile(latencies, 0.90)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'max_ms': ms(latencies[-1] if latencies else None),
+    }
+
+
+# ✅ Route scenarios
+# One representative request per URL name in inventory/urls.py, shared by bench_routes
+# and the query budget tests. Each scenario gets the Fixture (a car, a customer, a sale,
+# an admin user and a reservation) and returns the request to send.
+BENCH_PASSWORD = 'bench-routes-Passw0rd!'
+
+
+def _get(path, **params):
+    return {'method': 'get', 'path': path, 'data': params}
+
+
+def _post(path, data):
+    return {'method': 'post', 'path': path, 'data': json.dumps(data), 'content_type': 'application/json'}
+
+
+def _import_request(fixture):
+    rows = 'brand,model,year,price,stock\n' + ''.join(
+        f'Bench,Import {n},2022,{1000000 + n}.00,{n + 1}\n' for n in range(20)
+    )
+    upload = SimpleUploadedFile('cars.csv', rows.encode(), content_type='text/csv')
+    return {'method': 'post', 'path': reverse('car-import'), 'data': {'file': upload}}
+
+
+SCENARIOS = {
+    'car-list-create': lambda f: _get(reverse('car-list-create'), brand=f.car.brand, ordering='-price'),
+    'car-detail': lambda f: _get(reverse('car-detail', args=[f.car.pk])),
+    'car-list-cache-stats': lambda f: _get(reverse('car-list-cache-stats')),
+    'car-facets': lambda f: _get(reverse('car-facets')),
+    'car-changes': lambda f: _get(reverse('car-changes'), cursor=f.sync_cursor),
+    'car-import': _import_request,
+    'car-statistics': lambda f: _get(reverse('car-statistics')),
+    'average-price': lambda f: _get(reverse('average-price')),
+    'expensive-cars': lambda f: _get(reverse('expensive-cars')),
+    'low-stock-cars': lambda f: _get(reverse('low-stock-cars')),
+    'register': lambda f: _post(reverse('register'), {'username': f'bench-register-{next(f.sequence)}', 'password': BENCH_PASSWORD}),
+    'login': lambda f: _post(reverse('login'), {'username': f.user.username, 'password': BENCH_PASSWORD}),
+    'logout': lambda f: _post(reverse('logout'), {}),
+    'user-bulk-create': lambda f: _post(reverse('user-bulk-create'), {
+        'mode': 'partial',
+        'users': [{'username': f'bench-bulk-{next(f.sequence)}', 'password': BENCH_PASSWORD} for _ in range(10)],
+    }),
+    'sale-list-create': lambda f: _get(reverse('sale-list-create'), page=2),
+    'sale-bulk-create': lambda f: _post(reverse('sale-bulk-create'), {
+        'mode': 'partial',
+        'sales': [{'car': f.car.pk, 'customer': f.customer.pk, 'quantity': 1}] * 10,
+    }),
+    'sale-feed': lambda f: _get(reverse('sale-feed')),
+    'sales-analytics': lambda f: _get(reverse('sales-analytics'), group_by='brand'),
+    'sale-detail': lambda f: _get(reverse('sale-detail', args=[f.sale.pk])),
+    'async-car-list': lambda f: _get(reverse('async-car-list'), brand=f.car.brand, ordering='-price'),
+    'async-car-detail': lambda f: _get(reverse('async-car-detail', args=[f.car.pk])),
+    'async-car-statistics': lambda f: _get(reverse('async-car-statistics')),
+    'async-car-stream': lambda f: _get(reverse('async-car-stream'), timeout=0),
+    'async-sale-list': lambda f: _get(reverse('async-sale-list'), page=2),
+    'reservation-list-create': lambda f: _get(reverse('reservation-list-create'), status='active'),
+    'reservation-detail': lambda f: _get(reverse('reservation-detail', args=[f.reservation.pk])),
+    'reservation-convert': lambda f: _post(reverse('reservation-convert', args=[f.reservation.pk]), {}),
+    'reservation-release': lambda f: _post(reverse('reservation-release', args=[f.reservation.pk]), {}),
+    'customer-list-create': lambda f: _get(reverse('customer-list-create'), ordering='-lifetime_spend'),
+    'customer-detail': lambda f: _get(reverse('customer-detail', args=[f.customer.pk])),
+    'db-pool-stats': lambda f: _get(reverse('db-pool-stats')),
+    'metrics': lambda f: _get(reverse('metrics')),
+    'assign-role': lambda f: _post(reverse('assign-role'), {'role': 'admin'}),
+}
+
+
+def inventory_route_names():
+    names = []
+    for pattern in get_resolver().url_patterns:
+        for inner in getattr(pattern, 'url_patterns', []):
+            if getattr(inner, 'name', None) and inner.callback.__module__.startswith('inventory.'):
+                names.append(inner.name)
+    return names
+
+
+class Fixture:
+    def __init__(self, car, customer, sale):
+        self.car, self.customer, self.sale = car, customer, sale
+        self.user = User.objects.create_user(username=f'bench-routes-{time.time_ns()}', password=BENCH_PASSWORD)
+        UserProfile.objects.create(user=self.user, role='admin')
+        self.reservation = reserve_stock(car, customer, 1, ttl=86400, created_by=self.user)
+        self.sync_cursor = encode_cursor((timezone.now() - timedelta(hours=1), 0))
+        self.sequence = count()
+
+
+def run_scenario(client, name, fixture, timer):
+    """Send the route's scenario request with `timer` (a QueryTimer) installed, without
+    rate limits, and roll its writes back. Returns (path, response, seconds)."""
+    # A fresh token when the previous request logged out
+    token, _ = Token.objects.get_or_create(user=fixture.user)
+    request = SCENARIOS[name](fixture)
+    method = getattr(client, request.pop('method'))
+    with transaction.atomic(), rate_limits_bypassed():
+        with timer.installed():
+            started = time.perf_counter()
+            response = method(HTTP_AUTHORIZATION=f'Token {token.key}', **request)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            duration = time.perf_counter() - started
+        transaction.set_rollback(True)
+    return request['path'], response, duration
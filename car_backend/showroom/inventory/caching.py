@@ -0,0 +1,126 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache, caches
+from django.db import transaction
+from showroom.db.routers import read_model_timeout, read_source
+
+INVENTORY_VERSION_KEY = 'inventory:version'
+
+
+# ✅ Inventory version
+# Every cached read model (statistics snapshot, facets, car list responses) is keyed on this counter, which
+# is bumped after any Car / Sale change commits. Entries for old versions are simply
+# never read again and age out of the cache, so readers can't resurrect stale data.
+def get_inventory_version():
+    version = cache.get(INVENTORY_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a lost/evicted counter never reuses an old version
+        cache.add(INVENTORY_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(INVENTORY_VERSION_KEY)
+    return version
+
+
+async def aget_inventory_version():
+    version = await cache.aget(INVENTORY_VERSION_KEY)
+    if version is None:
+        await cache.aadd(INVENTORY_VERSION_KEY, int(time.time() * 1000), None)
+        version = await cache.aget(INVENTORY_VERSION_KEY)
+    return version
+
+
+def _bump():
+    try:
+        cache.incr(INVENTORY_VERSION_KEY)
+    except ValueError:
+        get_inventory_version()
+
+
+def bump_inventory_version():
+    # Runs after commit, so a reader can't cache pre-commit data under the new version
+    transaction.on_commit(_bump)
+
+
+# ✅ Versioned response cache
+# Serialized response data keyed on the inventory version, the role of the caller and
+# the normalized query string. Any Car / Sale change moves the version, so a stale
+# page is never served; superseded entries are evicted by the size-bounded
+# 'responses' cache alias. Hit / miss counters live in the default cache so they are
+# shared by all workers when that cache is.
+class ResponseCache:
+    # Query parameters that never change a response (client cache busters)
+    ignored_params = {'_'}
+
+    def __init__(self, name, alias='responses'):
+        self.name = name
+        self.alias = alias
+
+    def key(self, request):
+        return self._key(request, get_inventory_version())
+
+    async def akey(self, request):
+        return self._key(request, await aget_inventory_version())
+
+    def _key(self, request, version):
+        # DRF requests expose query_params, the async views use plain Django requests
+        query = getattr(request, 'query_params', request.GET)
+        params = sorted(
+            (name, value)
+            for name in query
+            if name not in self.ignored_params
+            for value in query.getlist(name)
+            if value != ''
+        )
+        profile = getattr(request.user, 'userprofile', None)
+        role = getattr(profile, 'role', 'anonymous')
+        digest = hashlib.sha256(f'{request.path}?{urlencode(params)}'.encode()).hexdigest()
+        return f'{self.name}:{version}:{read_source()}:{role}:{digest}'
+
+    def get(self, key):
+        data = caches[self.alias].get(key)
+        self._count('hits' if data is not None else 'misses')
+        return data
+
+    def set(self, key, data):
+        caches[self.alias].set(key, data, self._timeout())
+
+    async def aget(self, key):
+        data = await caches[self.alias].aget(key)
+        await self._acount('hits' if data is not None else 'misses')
+        return data
+
+    async def aset(self, key, data):
+        await caches[self.alias].aset(key, data, self._timeout())
+
+    def _timeout(self):
+        return read_model_timeout(caches[self.alias].default_timeout)
+
+    def _count(self, outcome):
+        counter = f'{self.name}:stats:{outcome}'
+        try:
+            cache.incr(counter)
+        except ValueError:
+            if not cache.add(counter, 1, None):
+                cache.incr(counter)
+
+    async def _acount(self, outcome):
+        counter = f'{self.name}:stats:{outcome}'
+        try:
+            await cache.aincr(counter)
+        except ValueError:
+            if not await cache.aadd(counter, 1, None):
+                await cache.aincr(counter)
+
+    def stats(self):
+        hits = cache.get(f'{self.name}:stats:hits', 0)
+        misses = cache.get(f'{self.name}:stats:misses', 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+        }
+
+
+car_list_cache = ResponseCache('car-list')
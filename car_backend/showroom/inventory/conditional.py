@@ -0,0 +1,47 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+# ✅ Conditional GET (ETag / Last-Modified)
+# Runs inside the DRF view, after authentication and permission checks. Views provide
+# get_validators(), which must be cheaper than building the response (typically one
+# small query on updated_at). A matching If-None-Match / If-Modified-Since is answered
+# with an empty 304 before anything is serialized.
+class ConditionalGetMixin:
+    def get_validators(self, request, *args, **kwargs):
+        """Return (etag, last_modified datetime); (None, None) disables validation."""
+        return None, None
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request, *args, **kwargs)
+        if etag is None and last_modified is None:
+            return super().get(request, *args, **kwargs)
+
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(super().get(request, *args, **kwargs), etag, last_modified)
+
+
+def not_modified_response(request, etag, last_modified):
+    """The 304 answering ``request``'s If-None-Match / If-Modified-Since, or None."""
+    return get_conditional_response(
+        request,
+        etag=quote_etag(etag) if etag is not None else None,
+        last_modified=int(last_modified.timestamp()) if last_modified is not None else None,
+    )
+
+
+def set_validators(response, etag, last_modified):
+    if response.status_code == 200:
+        if etag is not None:
+            response['ETag'] = quote_etag(etag)
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(int(last_modified.timestamp()))
+    return response
+
+
+def make_etag(*parts):
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
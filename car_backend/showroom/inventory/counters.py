@@ -0,0 +1,156 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, TruncMonth
+from django.utils import timezone
+
+from .models import Car, CustomerSummary, DailyCarSales, MonthlyBrandSales, MonthlyCustomerSales, Sale
+
+
+# ✅ Maintained sales counters (Car.sold_count and CustomerSummary)
+# Counters are moved with F() expressions so concurrent sales never overwrite each
+# other, and they bump updated_at so HTTP validators (ETag / Last-Modified) follow
+# them. Single sales are tracked by the Sale signals; bulk_create() skips signals,
+# so bulk paths call apply_bulk_sale_counters() with the rows they inserted.
+def bump_sold_count(car_id, delta):
+    if delta:
+        Car.objects.filter(pk=car_id).update(sold_count=F('sold_count') + delta, updated_at=timezone.now())
+
+
+def bump_customer_summary(customer_id, sales=0, units=0, spend=0, purchased_at=None,
+                           recompute_last_purchase=False, create_missing=True):
+    changes = {}
+    if sales:
+        changes['sales_count'] = F('sales_count') + sales
+    if units:
+        changes['units_bought'] = F('units_bought') + units
+    if spend:
+        changes['lifetime_spend'] = F('lifetime_spend') + spend
+    if recompute_last_purchase:
+        changes['last_purchase_at'] = Subquery(
+            Sale.objects.filter(customer=OuterRef('pk'))
+            .order_by('-sale_date')
+            .values('sale_date')[:1]
+        )
+    elif purchased_at is not None:
+        changes['last_purchase_at'] = Greatest(
+            Coalesce('last_purchase_at', Value(purchased_at)), Value(purchased_at)
+        )
+    if not changes:
+        return
+
+    changes['updated_at'] = timezone.now()
+    updated = CustomerSummary.objects.filter(pk=customer_id).update(**changes)
+    if not updated and create_missing:
+        # Customers created outside Customer.save() (bulk_create, raw SQL) have no row yet
+        CustomerSummary.rebuild([customer_id])
+
+
+def apply_bulk_sale_counters(sales):
+    """Apply the counters of newly inserted sales: one UPDATE for all cars, one per customer."""
+    sold = {}
+    per_customer = {}
+    for sale in sales:
+        sold[sale.car_id] = sold.get(sale.car_id, 0) + sale.quantity
+        totals = per_customer.setdefault(
+            sale.customer_id, {'sales': 0, 'units': 0, 'spend': 0, 'purchased_at': None}
+        )
+        totals['sales'] += 1
+        totals['units'] += sale.quantity
+        totals['spend'] += sale.total_price or 0
+        if totals['purchased_at'] is None or sale.sale_date > totals['purchased_at']:
+            totals['purchased_at'] = sale.sale_date
+
+    if sold:
+        Car.objects.filter(pk__in=sold).update(
+            sold_count=F('sold_count') + Case(
+                *[When(pk=car_id, then=Value(units)) for car_id, units in sold.items()],
+                default=Value(0),
+            ),
+            updated_at=timezone.now(),
+        )
+    for customer_id in sorted(per_customer):
+        bump_customer_summary(customer_id, **per_customer[customer_id])
+
+    fold_into_rollups(
+        (sale.car_id, sale.car.brand, sale.customer_id, sale.sale_date, sale.quantity, sale.total_price)
+        for sale in sales
+    )
+
+
+# ✅ Sales rollups (daily per car, monthly per brand and per customer)
+# Revenue analytics read these instead of scanning Sale. They are moved by the same
+# signals (and bulk paths) as the counters above, so they commit or roll back with
+# the sale itself; `manage.py rebuild_sales_rollups` recomputes them from scratch.
+def rollup_keys(car_id, brand, customer_id, sale_date):
+    day = timezone.localdate(sale_date)
+    month = day.replace(day=1)
+    return [
+        (DailyCarSales, {'date': day, 'car_id': car_id}),
+        (MonthlyBrandSales, {'month': month, 'brand': brand}),
+        (MonthlyCustomerSales, {'month': month, 'customer_id': customer_id}),
+    ]
+
+
+def bump_rollup(model, lookup, count, units, revenue, create_missing=True):
+    changes = {
+        'sales_count': F('sales_count') + count,
+        'units': F('units') + units,
+        'revenue': F('revenue') + revenue,
+    }
+    if model.objects.filter(**lookup).update(**changes):
+        if count < 0:
+            # Drop buckets whose last sale went away so they match a rebuild
+            model.objects.filter(**lookup, sales_count__lte=0).delete()
+        return
+    if not create_missing:
+        return
+    try:
+        # Savepoint: a concurrent first sale of the same bucket may win the insert
+        with transaction.atomic():
+            model.objects.create(**lookup, sales_count=count, units=units, revenue=revenue)
+    except IntegrityError:
+        model.objects.filter(**lookup).update(**changes)
+
+
+def bump_sales_rollups(car_id, brand, customer_id, sale_date, count, units, revenue,
+                       create_missing=True):
+    if not (count or units or revenue):
+        return
+    for model, lookup in rollup_keys(car_id, brand, customer_id, sale_date):
+        bump_rollup(model, lookup, count, units, revenue, create_missing=create_missing)
+
+
+def fold_into_rollups(rows):
+    """Add (car_id, brand, customer_id, sale_date, quantity, total_price) rows: one write per bucket."""
+    buckets = {}
+    for car_id, brand, customer_id, sale_date, quantity, total_price in rows:
+        for model, lookup in rollup_keys(car_id, brand, customer_id, sale_date):
+            totals = buckets.setdefault((model, tuple(sorted(lookup.items()))), [0, 0, 0])
+            totals[0] += 1
+            totals[1] += quantity
+            totals[2] += total_price or 0
+    # A stable order keeps concurrent bulk writers from locking buckets in opposite orders
+    for (model, lookup), (count, units, revenue) in sorted(
+        buckets.items(), key=lambda item: (item[0][0]._meta.label, str(item[0][1]))
+    ):
+        bump_rollup(model, dict(lookup), count, units, revenue)
+
+
+def move_brand_rollups(car_id, old_brand, new_brand):
+    """Move a renamed car's sales from its old brand's monthly buckets to the new brand's."""
+    months = (
+        DailyCarSales.objects.filter(car_id=car_id)
+        .annotate(month=TruncMonth('date'))
+        .order_by('month')
+        .values('month')
+        .annotate(total_sales=Sum('sales_count'), total_units=Sum('units'), total_revenue=Sum('revenue'))
+    )
+    for row in months:
+        count, units, revenue = row['total_sales'], row['total_units'], row['total_revenue']
+        # Add before subtracting: with a case-insensitive collation (MySQL) a change of
+        # case leaves both names on one row, which must not be emptied and dropped
+        bump_rollup(MonthlyBrandSales, {'month': row['month'], 'brand': new_brand}, count, units, revenue)
+        bump_rollup(
+            MonthlyBrandSales, {'month': row['month'], 'brand': old_brand}, -count, -units, -revenue,
+            create_missing=False,
+        )
@@ -0,0 +1,281 @@
+import asyncio
+import json
+import threading
+import time
+import weakref
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .models import Car
+
+LIVE_EVENTS_SETTINGS = {
+    'ENABLED': True,
+    # 'local': events fan out inside this process only (one ASGI worker).
+    # 'cache': events go through a shared cache (Redis / Memcached), so every worker
+    # sees the writes of every other one and Last-Event-ID resumes on any worker.
+    'BACKEND': 'local',
+    'CACHE': 'default',
+    # Events kept for Last-Event-ID resume: the last BUFFER_SIZE, for RETENTION_SECONDS
+    # with the cache backend. An older id gets a "reset" event.
+    'BUFFER_SIZE': 1000,
+    'RETENTION_SECONDS': 300,
+    # How often each worker checks the shared cache for new events
+    'POLL_INTERVAL': 0.5,
+    # Comment line sent on idle connections, so proxies do not time them out
+    'HEARTBEAT_SECONDS': 15,
+    # Streams end after this long and the client reconnects with Last-Event-ID, so
+    # workers can be drained and restarted
+    'MAX_STREAM_SECONDS': 300,
+    'RETRY_MS': 3000,
+    **getattr(settings, 'LIVE_EVENTS', {}),
+}
+
+SEQUENCE_KEY = 'live-events:sequence'
+
+
+def _seed():
+    # Ids start from the clock, so ids from before a restart (or a lost counter) are
+    # older than anything published since, and resuming with one gets a reset
+    return int(time.time() * 1000)
+
+
+# ✅ Broadcasters
+# Subscribers are coroutines parked on the event loop of an ASGI worker; publishers are
+# the threads running sync views and commands. A publish wakes every parked
+# subscriber, which then reads what it missed by event id.
+class _Subscribers:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = set()  # (event loop, asyncio.Event)
+        # Set once this process serves a stream: until then publishing is skipped
+        self.listening = False
+
+    def _wake(self):
+        with self._lock:
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # loop closed
+
+    async def _park(self, timeout):
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+    def _parked(self):
+        with self._lock:
+            return bool(self._waiters)
+
+    async def wait(self, last_id, timeout):
+        """True once an event after ``last_id`` exists, False after ``timeout`` seconds."""
+        deadline = time.monotonic() + timeout
+        while True:
+            if await self.alast_id() > last_id:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await self._park(remaining)
+
+
+class LocalBroadcaster(_Subscribers):
+    def __init__(self, size):
+        super().__init__()
+        self._events = deque(maxlen=size)  # (id, kind, data)
+        self._last_id = _seed()
+
+    def publish(self, kind, data):
+        with self._lock:
+            self._last_id += 1
+            self._events.append((self._last_id, kind, data))
+        self._wake()
+
+    async def alast_id(self):
+        return self._last_id
+
+    async def aevents_after(self, last_id):
+        """(events after ``last_id``, id of a missing event still expected) or None when
+        some of them are no longer kept."""
+        with self._lock:
+            first = self._events[0][0] if self._events else self._last_id + 1
+            if last_id > self._last_id or first > last_id + 1:
+                return None
+            return [event for event in self._events if event[0] > last_id], None
+
+
+class CacheBroadcaster(_Subscribers):
+    """Events in the shared cache: an incr'd sequence, and one key per event."""
+
+    def __init__(self, alias, size, retention, poll_interval):
+        super().__init__()
+        self.alias, self.size, self.retention, self.poll_interval = alias, size, retention, poll_interval
+        self._pollers = weakref.WeakKeyDictionary()  # event loop -> task
+        # Subscribers only read the cache, so any process may have them
+        self.listening = True
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def publish(self, kind, data):
+        try:
+            event_id = self.cache.incr(SEQUENCE_KEY)
+        except ValueError:
+            self.cache.add(SEQUENCE_KEY, _seed(), None)
+            event_id = self.cache.incr(SEQUENCE_KEY)
+        self.cache.set(f'live-events:{event_id}', (kind, data), self.retention)
+        self._wake()
+
+    async def alast_id(self):
+        last_id = await self.cache.aget(SEQUENCE_KEY)
+        if last_id is None:
+            await self.cache.aadd(SEQUENCE_KEY, _seed(), None)
+            last_id = await self.cache.aget(SEQUENCE_KEY)
+        return last_id
+
+    async def aevents_after(self, last_id):
+        current = await self.alast_id()
+        if last_id > current or current - last_id > self.size:
+            return None
+        ids = range(last_id + 1, current + 1)
+        found = await self.cache.aget_many([f'live-events:{event_id}' for event_id in ids])
+        events = []
+        for event_id in ids:
+            stored = found.get(f'live-events:{event_id}')
+            if stored is None:
+                # Taken by a publisher that has not stored it yet (or evicted):
+                # the caller decides how long to wait for it
+                return events, event_id
+            events.append((event_id, *stored))
+        return events, None
+
+    async def wait(self, last_id, timeout):
+        loop = asyncio.get_running_loop()
+        poller = self._pollers.get(loop)
+        if poller is None or poller.done():
+            self._pollers[loop] = loop.create_task(self._poll())
+        return await super().wait(last_id, timeout)
+
+    async def _poll(self):
+        # One poller per worker, however many streams it serves
+        seen = await self.alast_id()
+        while self._parked():
+            await asyncio.sleep(self.poll_interval)
+            current = await self.alast_id()
+            if current != seen:
+                seen = current
+                self._wake()
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is None:
+            if LIVE_EVENTS_SETTINGS['BACKEND'] == 'cache':
+                _broadcaster = CacheBroadcaster(
+                    LIVE_EVENTS_SETTINGS['CACHE'], LIVE_EVENTS_SETTINGS['BUFFER_SIZE'],
+                    LIVE_EVENTS_SETTINGS['RETENTION_SECONDS'], LIVE_EVENTS_SETTINGS['POLL_INTERVAL'],
+                )
+            else:
+                _broadcaster = LocalBroadcaster(LIVE_EVENTS_SETTINGS['BUFFER_SIZE'])
+        return _broadcaster
+
+
+# ✅ Publishing
+# Stock and price move through F() updates, so the new values are read back once the
+# write commits: one primary-key query per committed transaction, none when no stream
+# can be listening. Rolled back writes publish nothing.
+def _publish_cars(car_ids):
+    broadcaster = get_broadcaster()
+    if not broadcaster.listening:
+        return
+    rows = Car.objects.filter(pk__in=car_ids).order_by('pk').values('id', 'brand', 'model', 'price', 'stock', 'reserved')
+    for row in rows:
+        broadcaster.publish('car', {
+            'id': row['id'], 'brand': row['brand'], 'model': row['model'], 'price': str(row['price']),
+            'stock': row['stock'], 'available': row['stock'] - row['reserved'],
+        })
+
+
+def cars_changed(car_ids):
+    """Publish the stock and price of these cars after the current transaction commits."""
+    car_ids = sorted(set(car_ids))
+    if LIVE_EVENTS_SETTINGS['ENABLED'] and car_ids:
+        transaction.on_commit(lambda: _publish_cars(car_ids))
+
+
+def _publish_deleted(car_id):
+    broadcaster = get_broadcaster()
+    if broadcaster.listening:
+        broadcaster.publish('car-deleted', {'id': car_id})
+
+
+def car_deleted(car_id):
+    if LIVE_EVENTS_SETTINGS['ENABLED']:
+        transaction.on_commit(lambda: _publish_deleted(car_id))
+
+
+# ✅ Server-sent events
+def _frame(event_id, kind, data):
+    return f'id: {event_id}\nevent: {kind}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+
+async def stream_events(last_id=None, duration=None):
+    """SSE frames of every event after ``last_id`` (None: from now on), for ``duration``
+    seconds (0: only what is already there)."""
+    broadcaster = get_broadcaster()
+    broadcaster.listening = True
+    duration = LIVE_EVENTS_SETTINGS['MAX_STREAM_SECONDS'] if duration is None else duration
+    deadline = time.monotonic() + duration
+    if last_id is None:
+        last_id = await broadcaster.alast_id()
+    # The id line sets the client's Last-Event-ID even before the first event
+    yield f'retry: {LIVE_EVENTS_SETTINGS["RETRY_MS"]}\nid: {last_id}\n\n'
+
+    stalled_since = None
+    while True:
+        batch = await broadcaster.aevents_after(last_id)
+        if batch is None:
+            missing = None
+        else:
+            events, missing = batch
+            for event in events:
+                last_id = event[0]
+                yield _frame(*event)
+        if missing is not None:
+            stalled_since = stalled_since or time.monotonic()
+            if time.monotonic() - stalled_since > 2 * LIVE_EVENTS_SETTINGS['POLL_INTERVAL'] + 1:
+                batch = None  # never stored: treat as lost
+        else:
+            stalled_since = None
+        if batch is None:
+            # Events were lost or aged out: the client reloads its state and carries on
+            last_id = await broadcaster.alast_id()
+            stalled_since = None
+            yield _frame(last_id, 'reset', {'detail': 'Missed events are no longer available, reload the cars.'})
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if stalled_since is not None:
+            await asyncio.sleep(min(LIVE_EVENTS_SETTINGS['POLL_INTERVAL'], remaining))
+        elif not await broadcaster.wait(last_id, min(remaining, LIVE_EVENTS_SETTINGS['HEARTBEAT_SECONDS'])):
+            if deadline - time.monotonic() > 0:
+                yield ': keep-alive\n\n'
@@ -0,0 +1,127 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from showroom.db.routers import read_model_timeout, read_source
+
+from .caching import get_inventory_version
+from .filters import CarFilter
+from .models import Car
+from .search import search_cars
+
+FACETS_CACHE_TIMEOUT = getattr(settings, 'INVENTORY_FACETS_CACHE_TIMEOUT', 300)
+
+# (label, lower bound inclusive, upper bound exclusive); None = open ended
+PRICE_BANDS = getattr(settings, 'CAR_FACET_PRICE_BANDS', [
+    ('under-500k', None, 500000),
+    ('500k-1m', 500000, 1000000),
+    ('1m-2.5m', 1000000, 2500000),
+    ('2.5m-5m', 2500000, 5000000),
+    ('5m-plus', 5000000, None),
+])
+STOCK_BUCKETS = getattr(settings, 'CAR_FACET_STOCK_BUCKETS', [
+    ('out-of-stock', 0, 1),
+    ('low', 1, 5),
+    ('medium', 5, 20),
+    ('high', 20, None),
+])
+
+FACET_PARAMS = set(CarFilter.base_filters) | {'search'}
+
+
+def _range_q(field, low, high):
+    q = Q()
+    if low is not None:
+        q &= Q(**{f'{field}__gte': low})
+    if high is not None:
+        q &= Q(**{f'{field}__lt': high})
+    return q
+
+
+def facet_cache_key(query_params):
+    # Only parameters that change the result are part of the key, in a stable order
+    normalized = sorted(
+        (name, value.strip())
+        for name in query_params
+        if name in FACET_PARAMS
+        for value in query_params.getlist(name)
+        if value.strip()
+    )
+    digest = hashlib.sha256(urlencode(normalized).encode()).hexdigest()
+    return f'inventory:facets:{get_inventory_version()}:{read_source()}:{digest}'
+
+
+def _field_filters(filterset, field):
+    # The validated filters on one model field, as a Q
+    q = Q()
+    for name, value in filterset.form.cleaned_data.items():
+        flt = filterset.filters[name]
+        if flt.field_name == field and value not in (None, ''):
+            q &= Q(**{f'{field}__{flt.lookup_expr}': value})
+    return q
+
+
+# ✅ Car catalog facets
+# Three grouped queries whatever the filter set: brand counts, year counts, and one
+# conditional aggregate for every price band and stock bucket. Each facet counts the
+# cars matching every filter except its own, so picking a brand still shows the others.
+def compute_car_facets(query_params):
+    filterset = CarFilter(query_params, queryset=Car.objects.order_by())
+    if not filterset.is_valid():
+        return None, filterset.errors
+    queryset = Car.objects.order_by()
+    term = query_params.get('search', '').strip()
+    if term:
+        queryset = search_cars(queryset, term, rank=False)
+    by_field = {field: _field_filters(filterset, field) for field in ('brand', 'model', 'year', 'price', 'stock')}
+
+    def excluding(*fields):
+        q = Q()
+        for field, field_q in by_field.items():
+            if field not in fields:
+                q &= field_q
+        return q
+
+    brands = [
+        {'value': row['brand'], 'count': row['count']}
+        for row in queryset.filter(excluding('brand')).values('brand')
+        .annotate(count=Count('id')).order_by('-count', 'brand')
+    ]
+    years = [
+        {'value': row['year'], 'count': row['count']}
+        for row in queryset.filter(excluding('year')).values('year').annotate(count=Count('id')).order_by('-year')
+    ]
+
+    aggregates = {'total': Count('id', filter=by_field['price'] & by_field['stock'])}
+    for label, low, high in PRICE_BANDS:
+        aggregates[f'price:{label}'] = Count('id', filter=_range_q('price', low, high) & by_field['stock'])
+    for label, low, high in STOCK_BUCKETS:
+        aggregates[f'stock:{label}'] = Count('id', filter=_range_q('stock', low, high) & by_field['price'])
+    counts = queryset.filter(excluding('price', 'stock')).aggregate(**aggregates)
+
+    return {
+        'total': counts['total'],
+        'brands': brands,
+        'years': years,
+        'price_bands': [
+            {'label': label, 'min': low, 'max': high, 'count': counts[f'price:{label}']}
+            for label, low, high in PRICE_BANDS
+        ],
+        'stock_buckets': [
+            {'label': label, 'min': low, 'max': high, 'count': counts[f'stock:{label}']}
+            for label, low, high in STOCK_BUCKETS
+        ],
+    }, None
+
+
+def get_car_facets(query_params):
+    key = facet_cache_key(query_params)
+    facets = cache.get(key)
+    if facets is not None:
+        return facets, None
+    facets, errors = compute_car_facets(query_params)
+    if errors is None:
+        cache.set(key, facets, read_model_timeout(FACETS_CACHE_TIMEOUT))
+    return facets, errors
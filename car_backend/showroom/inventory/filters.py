@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+import django_filters
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Car, Customer
+
+
+def _removed_lookup(value):
+    raise ValidationError("This filter was removed: it scanned every car. Use ?search= instead.")
+
+
+def _removed_customer_lookup(value):
+    raise ValidationError("This filter was removed: it scanned every customer. Use ?name= for an exact match.")
+
+
+# ✅ Car filters (shared by the car list and the facets endpoint)
+class CarFilter(django_filters.FilterSet):
+    # LIKE '%term%' cannot use an index; ?search= goes through the search backend.
+    # Still declared so old clients get a 400 instead of an unfiltered list.
+    brand__icontains = django_filters.CharFilter(validators=[_removed_lookup])
+    model__icontains = django_filters.CharFilter(validators=[_removed_lookup])
+
+    class Meta:
+        model = Car
+        fields = {
+            'brand': ['exact'],
+            'model': ['exact'],
+            'year': ['exact', 'lt', 'lte', 'gt', 'gte'],
+            'price': ['exact', 'lt', 'lte', 'gt', 'gte'],
+            'stock': ['exact', 'lt', 'lte', 'gt', 'gte']
+        }
+
+
+# ✅ Customer filters over the maintained purchase summary
+class CustomerFilter(django_filters.FilterSet):
+    # LIKE '%term%' scans every customer; old clients get a 400 instead of an unfiltered list
+    name__icontains = django_filters.CharFilter(validators=[_removed_customer_lookup])
+    min_sales = django_filters.NumberFilter(field_name='summary__sales_count', lookup_expr='gte')
+    min_units = django_filters.NumberFilter(field_name='summary__units_bought', lookup_expr='gte')
+    min_spend = django_filters.NumberFilter(field_name='summary__lifetime_spend', lookup_expr='gte')
+    max_spend = django_filters.NumberFilter(field_name='summary__lifetime_spend', lookup_expr='lte')
+    purchased_since = django_filters.IsoDateTimeFilter(field_name='summary__last_purchase_at', lookup_expr='gte')
+    # Customers with no purchase in the last N days (including customers who never bought)
+    inactive_days = django_filters.NumberFilter(method='filter_inactive_days')
+
+    ordering = django_filters.OrderingFilter(
+        fields=(
+            ('cust_id', 'cust_id'),
+            ('name', 'name'),
+            ('created_at', 'created_at'),
+            ('summary__sales_count', 'sales_count'),
+            ('summary__units_bought', 'total_cars_bought'),
+            ('summary__lifetime_spend', 'lifetime_spend'),
+            ('summary__last_purchase_at', 'last_purchase_at'),
+        )
+    )
+
+    class Meta:
+        model = Customer
+        fields = {
+            'name': ['exact'],
+            'phone': ['exact'],
+        }
+
+    def filter_inactive_days(self, queryset, name, value):
+        cutoff = timezone.now() - timedelta(days=int(value))
+        return queryset.filter(
+            Q(summary__last_purchase_at__lt=cutoff) | Q(summary__last_purchase_at__isnull=True)
+        )
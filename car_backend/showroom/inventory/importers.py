@@ -0,0 +1,155 @@
+import csv
+import io
+import json
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .caching import bump_inventory_version
+from .events import cars_changed
+from .models import Car
+from .search import trigram_index
+from .serializers import CarSerializer
+
+CAR_IMPORT_FIELDS = ['brand', 'model', 'year', 'price', 'stock']
+
+
+# ✅ Row readers: both yield (line_number, row) one line at a time
+def iter_csv_rows(stream):
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_ndjson_rows(stream):
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            row = e
+        yield line_number, row
+
+
+def open_rows(binary_stream, file_format):
+    text = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        return iter_csv_rows(text)
+    if file_format == 'ndjson':
+        return iter_ndjson_rows(text)
+    raise ValueError("file format must be 'csv' or 'ndjson'")
+
+
+def guess_format(filename):
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+
+# ✅ Car catalog importer
+# Rows are validated with CarSerializer (same rules as POST /api/cars/) and upserted
+# per batch, keyed on brand + model + year: one lookup query, one bulk_update and one
+# bulk_create per batch. Rows matching the stored price and stock are left alone, so
+# re-importing an unchanged catalog writes nothing and invalidates no cache. Only the
+# current batch is kept in memory, and progress and row errors are yielded as events
+# while the file is read.
+class CarImporter:
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.stats = {'rows': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0}
+
+    def run(self, rows):
+        batch = []
+        for line_number, row in rows:
+            self.stats['rows'] += 1
+            data, errors = self._validate(row)
+            if errors:
+                self.stats['failed'] += 1
+                yield {'event': 'error', 'line': line_number, 'errors': errors}
+                continue
+            batch.append((line_number, data))
+            if len(batch) >= self.batch_size:
+                yield from self._flush(batch)
+                batch = []
+                yield {'event': 'progress', **self.stats}
+        if batch:
+            yield from self._flush(batch)
+        yield {'event': 'done', **self.stats}
+
+    def _validate(self, row):
+        if isinstance(row, Exception):
+            return None, {'non_field_errors': [f"Invalid JSON: {row}"]}
+        if not isinstance(row, dict):
+            return None, {'non_field_errors': ["Each row must be an object"]}
+        serializer = CarSerializer(data={field: row.get(field) for field in CAR_IMPORT_FIELDS})
+        if not serializer.is_valid():
+            return None, serializer.errors
+        return serializer.validated_data, None
+
+    @staticmethod
+    def _key(brand, model, year):
+        # MySQL compares brand/model case-insensitively, so match the same way here
+        return brand.casefold(), model.casefold(), year
+
+    def _flush(self, batch):
+        """Upsert a batch of (line_number, data); yields the rows that cannot be applied."""
+        incoming = {}
+        for line_number, data in batch:
+            incoming[self._key(data['brand'], data['model'], data['year'])] = (line_number, data)  # last row wins
+
+        lookup = reduce(or_, (
+            Q(brand=data['brand'], model=data['model'], year=data['year'])
+            for _, data in incoming.values()
+        ))
+        rejected, unchanged = [], 0
+        with transaction.atomic():
+            # Locked, so no hold is taken on these cars between the check and the update
+            existing = {}
+            for car in Car.objects.select_for_update().filter(lookup).order_by('pk'):
+                existing.setdefault(self._key(car.brand, car.model, car.year), car)
+
+            now = timezone.now()
+            to_update, to_create = [], []
+            for key, (line_number, data) in incoming.items():
+                car = existing.get(key)
+                if car is None:
+                    to_create.append(Car(**data))
+                elif data['stock'] < car.reserved:
+                    # The stock can never drop below the units held by reservations
+                    rejected.append({'event': 'error', 'line': line_number, 'errors': {
+                        'stock': [f"{car.reserved} units are held by reservations."],
+                    }})
+                elif car.price == data['price'] and car.stock == data['stock']:
+                    unchanged += 1
+                else:
+                    car.price, car.stock, car.updated_at = data['price'], data['stock'], now
+                    to_update.append(car)
+
+            if to_update:
+                Car.objects.bulk_update(to_update, ['price', 'stock', 'updated_at'])
+            if to_create:
+                Car.objects.bulk_create(to_create)
+            if to_update or to_create:
+                bump_inventory_version()
+            changed = [car.pk for car in to_update + to_create]
+            if None in changed:
+                # bulk_create returns no ids on MySQL: read the new cars' ids back by key
+                changed = [car.pk for car in to_update] + list(Car.objects.filter(reduce(or_, (
+                    Q(brand=car.brand, model=car.model, year=car.year) for car in to_create
+                ))).values_list('pk', flat=True))
+            cars_changed(changed)
+        if to_create:
+            trigram_index.invalidate(changed[len(to_update):])
+        self.stats['updated'] += len(to_update)
+        self.stats['created'] += len(to_create)
+        self.stats['unchanged'] += unchanged
+        self.stats['failed'] += len(rejected)
+        yield from rejected
@@ -0,0 +1,96 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from inventory.models import Car, CarTombstone, Customer, Sale
+from inventory.services import InsufficientStock, commit_sale
+from inventory.sync import SYNC_SETTINGS
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark concurrent sales of a single car through the sale commit path and "
+        "verify that nothing is oversold. Creates (and removes) its own car and customer "
+        "in the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help="Concurrent sellers (default: 8)")
+        parser.add_argument('--attempts', type=int, default=50, help="Sales attempted per thread (default: 50)")
+        parser.add_argument('--stock', type=int, default=200, help="Initial stock of the car (default: 200)")
+        parser.add_argument('--quantity', type=int, default=1, help="Units per sale (default: 1)")
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark car, customer and sales")
+
+    def handle(self, *args, **options):
+        threads, attempts = options['threads'], options['attempts']
+        stock, quantity = options['stock'], options['quantity']
+
+        car = Car.objects.create(brand='Benchmark', model='Concurrency', year=2020, price=1, stock=stock)
+        cust_id = (Customer.objects.order_by('-cust_id').values_list('cust_id', flat=True).first() or 0) + 1
+        customer = Customer.objects.create(
+            cust_id=cust_id, name='Benchmark', phone=f'bench-{cust_id}', address='-'
+        )
+        # Sellers must not share the connection opened by this thread
+        connection.close()
+
+        results = {'sold': 0, 'rejected': 0, 'errors': 0}
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(threads)
+
+        def seller():
+            sold = rejected = errors = 0
+            try:
+                start_barrier.wait()
+                for _ in range(attempts):
+                    try:
+                        commit_sale(car, customer, quantity)
+                        sold += 1
+                    except InsufficientStock:
+                        rejected += 1
+                    except Exception:
+                        errors += 1
+            finally:
+                connection.close()
+                with lock:
+                    results['sold'] += sold
+                    results['rejected'] += rejected
+                    results['errors'] += errors
+
+        workers = [threading.Thread(target=seller) for _ in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        car.refresh_from_db()
+        car_id = car.pk
+        recorded_units = sum(Sale.objects.filter(car=car).values_list('quantity', flat=True))
+        attempted = threads * attempts
+        oversold = recorded_units > stock or car.stock != stock - recorded_units
+
+        self.stdout.write(f"threads={threads} attempts={attempted} quantity={quantity} initial_stock={stock}")
+        self.stdout.write(
+            f"sold={results['sold']} rejected={results['rejected']} errors={results['errors']} "
+            f"elapsed={elapsed:.3f}s throughput={attempted / elapsed:.1f} attempts/s"
+        )
+        self.stdout.write(
+            f"final_stock={car.stock} units_recorded={recorded_units} sold_count={car.sold_count}"
+        )
+
+        if not options['keep']:
+            car.delete()
+            customer.delete()
+            # No sync cursor can have passed a car younger than the settle delay, so its
+            # tombstone would only be noise in every client's next delta
+            if car.created_at > timezone.now() - timedelta(seconds=SYNC_SETTINGS['SETTLE_SECONDS']):
+                CarTombstone.objects.filter(car_id=car_id).delete()
+
+        if oversold or car.sold_count != recorded_units:
+            raise CommandError("Stock and recorded sales disagree: oversold or lost update")
+        self.stdout.write(self.style.SUCCESS("No oversell: stock + recorded sales match the initial stock"))
@@ -0,0 +1,129 @@
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urljoin, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.benchmarking import latency_summary
+
+DEFAULT_PATHS = ['cars/', 'cars/?page=2', 'cars/statistics/', 'sales/']
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the read endpoints of one or more running servers and compare requests/s "
+        "and latency percentiles, e.g. the sync views under WSGI against the async views "
+        "under ASGI. Use an admin token (admins are not rate limited by default):\n"
+        "  gunicorn showroom.wsgi -w 4 -b :8000\n"
+        "  uvicorn showroom.asgi:application --workers 4 --port 8001\n"
+        "  manage.py bench_http_reads --token KEY "
+        "--target wsgi=http://127.0.0.1:8000/api/ --target asgi=http://127.0.0.1:8001/api/async/"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True, metavar='LABEL=BASE_URL',
+            help="Server to test; paths are resolved against BASE_URL (repeatable)",
+        )
+        parser.add_argument('--token', required=True, help="API token sent as 'Authorization: Token ...'")
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help=f"Path relative to the base URL, requested round-robin (default: {' '.join(DEFAULT_PATHS)})",
+        )
+        parser.add_argument('--concurrency', type=int, default=100, help="Concurrent clients (default: 100)")
+        parser.add_argument('--duration', type=float, default=15, help="Seconds per target (default: 15)")
+        parser.add_argument('--warmup', type=float, default=2, help="Unmeasured seconds per target (default: 2)")
+        parser.add_argument('--output', help="Also write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            label, sep, base_url = target.partition('=')
+            if not sep or not base_url.startswith(('http://', 'https://')):
+                raise CommandError(f"--target must look like LABEL=http://host:port/prefix/, got {target!r}")
+            targets.append((label, base_url if base_url.endswith('/') else base_url + '/'))
+        paths = options['paths'] or DEFAULT_PATHS
+
+        results = []
+        for label, base_url in targets:
+            self._run(base_url, paths, options, options['warmup'])
+            result = self._run(base_url, paths, options, options['duration'])
+            result = {'target': label, 'base_url': base_url, **result}
+            results.append(result)
+            self.stdout.write(
+                f"{label:<10} requests={result['requests']} errors={result['errors']} "
+                f"rps={result['rps']:.1f} p50={result['p50_ms']}ms p99={result['p99_ms']}ms "
+                f"max={result['max_ms']}ms"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({
+                    'concurrency': options['concurrency'],
+                    'duration': options['duration'],
+                    'paths': paths,
+                    'results': results,
+                }, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _run(self, base_url, paths, options, duration):
+        headers = {'Authorization': f"Token {options['token']}", 'Connection': 'keep-alive'}
+        urls = [urlsplit(urljoin(base_url, path)) for path in paths]
+        latencies, statuses = [], {}
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(options['concurrency'] + 1)
+        deadline = [None]
+
+        def client(offset):
+            connection = None
+            timings, codes = [], {}
+            start_barrier.wait()
+            index = offset
+            while time.perf_counter() < deadline[0]:
+                url = urls[index % len(urls)]
+                index += 1
+                target = url.path + (f'?{url.query}' if url.query else '')
+                started = time.perf_counter()
+                try:
+                    if connection is None:
+                        connection_class = (
+                            http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+                        )
+                        connection = connection_class(url.netloc, timeout=30)
+                    connection.request('GET', target, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    status = response.status
+                except (OSError, http.client.HTTPException):
+                    if connection is not None:
+                        connection.close()
+                    connection = None
+                    status = 'error'
+                timings.append(time.perf_counter() - started)
+                codes[status] = codes.get(status, 0) + 1
+            if connection is not None:
+                connection.close()
+            with lock:
+                latencies.extend(timings)
+                for status, count in codes.items():
+                    statuses[status] = statuses.get(status, 0) + count
+
+        workers = [threading.Thread(target=client, args=(n,)) for n in range(options['concurrency'])]
+        for worker in workers:
+            worker.start()
+        # Clients start together once all of them are up
+        started = time.perf_counter()
+        deadline[0] = started + duration
+        start_barrier.wait()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        errors = sum(count for status, count in statuses.items() if status == 'error' or status >= 400)
+        return {
+            **latency_summary(latencies, elapsed),
+            'errors': errors,
+            'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        }
@@ -0,0 +1,109 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from inventory.benchmarking import SCENARIOS, Fixture, inventory_route_names, latency_summary, run_scenario
+from inventory.metrics import QueryTimer
+from inventory.models import Car, Customer, Sale
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every inventory route in-process (Django test client, no network) and "
+        "report requests/s, latency percentiles and SQL queries per request. Run it against "
+        "a populated database (see generate_showroom_data); writes are rolled back and "
+        "reads go to the primary. Use --output to save a JSON report and --compare to diff "
+        "against an earlier one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help="Measured requests per route (default: 50)")
+        parser.add_argument('--warmup', type=int, default=5, help="Unmeasured requests per route (default: 5)")
+        parser.add_argument('--route', action='append', dest='routes', help="Only benchmark this URL name (repeatable)")
+        parser.add_argument('--output', help="Write the results as JSON to this file")
+        parser.add_argument('--compare', help="Earlier --output file to compare p50 latency and queries with")
+
+    def handle(self, *args, **options):
+        names = inventory_route_names()
+        missing = [name for name in names if name not in SCENARIOS]
+        if missing:
+            raise CommandError(f"No benchmark scenario for: {', '.join(missing)} (add them to SCENARIOS)")
+        if options['routes']:
+            unknown = set(options['routes']) - set(names)
+            if unknown:
+                raise CommandError(f"Unknown routes: {', '.join(sorted(unknown))}")
+            names = [name for name in names if name in options['routes']]
+
+        # The fixture reserves a unit of the car
+        car = Car.objects.filter(stock__gt=F('reserved')).order_by('-sold_count', 'pk').first()
+        customer = Customer.objects.order_by('pk').first()
+        sale = Sale.objects.order_by('-pk').first()
+        if car is None or customer is None or sale is None:
+            raise CommandError("Needs at least one car, customer and sale; run generate_showroom_data first")
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as report:
+                baseline = {result['route']: result for result in json.load(report)['results']}
+
+        results = []
+        # Replica lag would hide the benchmark user created inside the transaction
+        with override_settings(DATABASE_REPLICAS=[]), transaction.atomic():
+            fixture = Fixture(car, customer, sale)
+            for name in names:
+                result = self._bench_route(name, fixture, options)
+                results.append(result)
+                self._report(result, baseline.get(name) if baseline else None)
+            transaction.set_rollback(True)
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({
+                    'generated_at': timezone.now().isoformat(),
+                    'database': connection.vendor,
+                    'iterations': options['iterations'],
+                    'rows': {
+                        'cars': Car.objects.count(),
+                        'customers': Customer.objects.count(),
+                        'sales': Sale.objects.count(),
+                    },
+                    'results': results,
+                }, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _bench_route(self, name, fixture, options):
+        client = Client(HTTP_HOST='localhost', raise_request_exception=False)
+        latencies, queries, statuses = [], [], {}
+        elapsed = 0.0
+        for iteration in range(options['warmup'] + options['iterations']):
+            timer = QueryTimer()
+            path, response, duration = run_scenario(client, name, fixture, timer)
+            if iteration < options['warmup']:
+                continue
+            elapsed += duration
+            latencies.append(duration)
+            queries.append(timer.count)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+        return {
+            'route': name,
+            'path': path,
+            **latency_summary(latencies, elapsed),
+            'statuses': statuses,
+            'queries_avg': round(sum(queries) / len(queries), 2) if queries else None,
+            'queries_max': max(queries, default=None),
+        }
+
+    def _report(self, result, previous):
+        line = (
+            f"{result['route']:<22} rps={result['rps']:<9} p50={result['p50_ms']}ms "
+            f"p99={result['p99_ms']}ms queries={result['queries_avg']} statuses={result['statuses']}"
+        )
+        if previous and previous.get('p50_ms') and result['p50_ms'] is not None:
+            change = (result['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] * 100
+            line += f"  p50 {change:+.1f}% queries {previous['queries_avg']}->{result['queries_avg']}"
+        self.stdout.write(line)
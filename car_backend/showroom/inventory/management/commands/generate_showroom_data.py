@@ -0,0 +1,200 @@
+import math
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from inventory.caching import bump_inventory_version
+from inventory.models import Car, Customer, Sale
+from inventory.search import trigram_index
+
+# (brand, price tier, relative popularity)
+BRANDS = [
+    ('Maruti Suzuki', 'economy', 40), ('Hyundai', 'economy', 25), ('Tata', 'economy', 22),
+    ('Mahindra', 'mid', 18), ('Kia', 'mid', 14), ('Toyota', 'mid', 12), ('Honda', 'mid', 9),
+    ('Renault', 'economy', 6), ('Skoda', 'mid', 5), ('Volkswagen', 'mid', 5), ('MG', 'mid', 5),
+    ('Nissan', 'economy', 3), ('Jeep', 'premium', 2), ('BMW', 'luxury', 2), ('Mercedes-Benz', 'luxury', 2),
+    ('Audi', 'luxury', 1.5), ('Volvo', 'luxury', 1), ('Lexus', 'luxury', 0.5), ('Porsche', 'luxury', 0.3),
+    ('Land Rover', 'luxury', 0.4),
+]
+# Median price and spread (lognormal sigma) per tier
+PRICE_TIERS = {
+    'economy': (700000, 0.35),
+    'mid': (1600000, 0.35),
+    'premium': (3500000, 0.3),
+    'luxury': (9000000, 0.45),
+}
+MODEL_NAMES = [
+    'Aria', 'Nova', 'Vista', 'Astra', 'Zen', 'Orbit', 'Pulse', 'Crest', 'Vertex', 'Sierra',
+    'Terra', 'Bolt', 'Echo', 'Rover', 'Summit', 'Drift', 'Lumen', 'Swift', 'Harbor', 'Atlas',
+]
+TRIMS = ['', ' LX', ' VX', ' ZX', ' Sport', ' Plus', ' Hybrid', ' EV', ' AT', ' Turbo']
+FIRST_NAMES = [
+    'Aarav', 'Vivaan', 'Aditya', 'Ananya', 'Diya', 'Ishaan', 'Kavya', 'Meera', 'Rohan', 'Saanvi',
+    'Arjun', 'Priya', 'Rahul', 'Sneha', 'Vikram', 'Neha', 'Karan', 'Pooja', 'Aman', 'Riya',
+]
+LAST_NAMES = [
+    'Sharma', 'Verma', 'Patel', 'Reddy', 'Iyer', 'Nair', 'Gupta', 'Singh', 'Khan', 'Das',
+    'Mehta', 'Joshi', 'Rao', 'Kapoor', 'Bose', 'Menon', 'Chopra', 'Pillai', 'Shah', 'Malhotra',
+]
+CITIES = ['Mumbai', 'Delhi', 'Bengaluru', 'Chennai', 'Hyderabad', 'Pune', 'Kolkata', 'Ahmedabad', 'Jaipur', 'Kochi']
+STREETS = ['MG Road', 'Station Road', 'Park Street', 'Lake View', 'Ring Road', 'Hill Road', 'Church Street']
+# Most sales are a single car; fleets are rare
+QUANTITIES = ([1, 2, 3, 5], [85, 10, 4, 1])
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep the created_at / sale_date values we generate."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add in saved:
+            field.auto_now_add = auto_now_add
+
+
+def zipf_cum_weights(count, exponent):
+    # A few cars / customers account for most of the sales, like real catalogs
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a reproducible synthetic showroom (cars, customers, sales) "
+        "through bulk_create, then rebuild the maintained counters and rollups. Use an "
+        "empty database, or --append to add to existing data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cars', type=int, default=100000, help="Cars to create (default: 100000)")
+        parser.add_argument('--customers', type=int, default=50000, help="Customers to create (default: 50000)")
+        parser.add_argument('--sales', type=int, default=2000000, help="Sales to create (default: 2000000)")
+        parser.add_argument('--days', type=int, default=730, help="Sales are spread over this many past days (default: 730)")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed; same seed, same data (default: 42)")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per bulk_create (default: 5000)")
+        parser.add_argument('--append', action='store_true', help="Add to a database that already has data")
+
+    def handle(self, *args, **options):
+        if not options['append'] and (Car.objects.exists() or Customer.objects.exists() or Sale.objects.exists()):
+            raise CommandError("The database already has cars, customers or sales; pass --append to add to them")
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.days = options['days']
+
+        car_rows = self._create_cars(options['cars'])
+        customer_ids = self._create_customers(options['customers'])
+        if options['sales'] and car_rows and customer_ids:
+            self._create_sales(options['sales'], car_rows, customer_ids)
+
+        self.stdout.write("Rebuilding sales counters and rollups...")
+        call_command('rebuild_sales_counters', stdout=self.stdout)
+        call_command('rebuild_sales_rollups', stdout=self.stdout)
+        trigram_index.invalidate()
+        bump_inventory_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {len(car_rows)} cars, {len(customer_ids)} customers and {options['sales']} sales"
+        ))
+
+    def _past(self, skew):
+        # skew > 1 favours recent dates (the business grows over time)
+        return self.now - timedelta(seconds=self.days * 86400 * (1 - self.rng.random() ** (1 / skew)))
+
+    def _bulk_insert(self, model, objects, label, total):
+        with transaction.atomic():
+            model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.stdout.write(f"  {label}: {total}")
+
+    def _create_cars(self, count):
+        rng = self.rng
+        brand_weights = list(accumulate(weight for _, _, weight in BRANDS))
+        current_year = self.now.year
+        first_id = (Car.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+
+        self.stdout.write(f"Creating {count} cars...")
+        created, batch = 0, []
+        with explicit_timestamps(Car._meta.get_field('created_at')):
+            for _ in range(count):
+                brand, tier, _ = rng.choices(BRANDS, cum_weights=brand_weights)[0]
+                median, sigma = PRICE_TIERS[tier]
+                age = min(int(rng.expovariate(1 / 4)), 25)
+                price = median * math.exp(rng.gauss(0, sigma)) * (0.93 ** age)
+                stock = 0 if rng.random() < 0.05 else min(int(rng.expovariate(1 / 8)) + 1, 200)
+                batch.append(Car(
+                    brand=brand,
+                    model=f"{rng.choice(MODEL_NAMES)} {rng.randint(1, 9)}{rng.choice(TRIMS)}",
+                    year=current_year - age,
+                    price=Decimal(round(price, -3)).quantize(Decimal('0.01')),
+                    stock=stock,
+                    created_at=self._past(skew=1.5),
+                ))
+                if len(batch) >= self.batch_size:
+                    created += len(batch)
+                    self._bulk_insert(Car, batch, 'cars', created)
+                    batch = []
+            if batch:
+                created += len(batch)
+                self._bulk_insert(Car, batch, 'cars', created)
+
+        # Backends that do not return primary keys from bulk_create: read them back
+        return list(
+            Car.objects.filter(id__gte=first_id).order_by('id').values_list('id', 'price')
+        )
+
+    def _create_customers(self, count):
+        rng = self.rng
+        first_id = (Customer.objects.order_by('-cust_id').values_list('cust_id', flat=True).first() or 0) + 1
+        self.stdout.write(f"Creating {count} customers...")
+        batch = []
+        for cust_id in range(first_id, first_id + count):
+            batch.append(Customer(
+                cust_id=cust_id,
+                name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                phone=f"9{cust_id:010d}"[-12:],
+                address=f"{rng.randint(1, 999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}",
+            ))
+            if len(batch) >= self.batch_size:
+                self._bulk_insert(Customer, batch, 'customers', cust_id - first_id + 1)
+                batch = []
+        if batch:
+            self._bulk_insert(Customer, batch, 'customers', count)
+        return list(range(first_id, first_id + count))
+
+    def _create_sales(self, count, car_rows, customer_ids):
+        rng = self.rng
+        # Popularity is independent of insertion order
+        car_rows = car_rows[:]
+        rng.shuffle(car_rows)
+        customer_ids = customer_ids[:]
+        rng.shuffle(customer_ids)
+        car_weights = zipf_cum_weights(len(car_rows), 0.9)
+        customer_weights = zipf_cum_weights(len(customer_ids), 0.7)
+        quantities, quantity_weights = QUANTITIES
+
+        self.stdout.write(f"Creating {count} sales...")
+        created = 0
+        with explicit_timestamps(Sale._meta.get_field('sale_date')):
+            while created < count:
+                size = min(self.batch_size, count - created)
+                cars = rng.choices(car_rows, cum_weights=car_weights, k=size)
+                customers = rng.choices(customer_ids, cum_weights=customer_weights, k=size)
+                amounts = rng.choices(quantities, weights=quantity_weights, k=size)
+                batch = [
+                    Sale(
+                        car_id=car_id, customer_id=customer_id, quantity=quantity,
+                        total_price=price * quantity, sale_date=self._past(skew=1.3),
+                    )
+                    for (car_id, price), customer_id, quantity in zip(cars, customers, amounts)
+                ]
+                created += size
+                self._bulk_insert(Sale, batch, 'sales', created)
@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.importers import CarImporter, guess_format, open_rows
+
+
+class Command(BaseCommand):
+    help = "Stream-import a car catalog from CSV or NDJSON, upserting on brand + model + year"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV (brand,model,year,price,stock) or NDJSON file")
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'ndjson'],
+                            help="Input format (default: guessed from the file extension)")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Rows upserted per transaction (default: 500)")
+
+    def handle(self, *args, **options):
+        file_format = options['file_format'] or guess_format(options['path'])
+        if file_format is None:
+            raise CommandError("Cannot guess the file format, pass --format csv|ndjson")
+
+        importer = CarImporter(batch_size=options['batch_size'])
+        with open(options['path'], 'rb') as f:
+            for event in importer.run(open_rows(f, file_format)):
+                if event['event'] == 'error':
+                    self.stderr.write(f"line {event['line']}: {json.dumps(event['errors'])}")
+                else:
+                    self.stdout.write(
+                        f"{event['event']}: rows={event['rows']} created={event['created']} "
+                        f"updated={event['updated']} unchanged={event['unchanged']} failed={event['failed']}"
+                    )
@@ -0,0 +1,69 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.importers import guess_format, open_rows
+from inventory.provisioning import provision_users
+from inventory.serializers import BulkUserItemSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users with their profile and API token from a CSV (username,password[,role]) "
+        "or NDJSON file, in batches of bulk INSERTs with passwords hashed in parallel. "
+        "Writes username,role,token for every created user as CSV."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or NDJSON file of users")
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'ndjson'],
+                            help="Input format (default: guessed from the file extension)")
+        parser.add_argument('--role', default='customer', choices=['admin', 'staff', 'customer'],
+                            help="Role of rows without one (default: customer)")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Users created per transaction (default: 500)")
+        parser.add_argument('--output', help="Write the created usernames and tokens here instead of stdout")
+
+    def handle(self, *args, **options):
+        file_format = options['file_format'] or guess_format(options['path'])
+        if file_format is None:
+            raise CommandError("Cannot guess the file format, pass --format csv|ndjson")
+
+        output = open(options['output'], 'w', newline='') if options['output'] else self.stdout
+        writer = csv.writer(output)
+        writer.writerow(['username', 'role', 'token'])
+        created = failed = 0
+        try:
+            with open(options['path'], 'rb') as f:
+                batch = []
+                for line_number, row in open_rows(f, file_format):
+                    serializer = BulkUserItemSerializer(
+                        data=row if isinstance(row, dict) else {}, context={'default_role': options['role']}
+                    )
+                    if isinstance(row, dict) and serializer.is_valid():
+                        batch.append((line_number, serializer.validated_data))
+                    else:
+                        failed += 1
+                        errors = serializer.errors if isinstance(row, dict) else {'non_field_errors': [str(row)]}
+                        self.stderr.write(f"line {line_number}: {json.dumps(errors)}")
+                    if len(batch) >= options['batch_size']:
+                        created, failed = self._flush(batch, writer, created, failed)
+                        batch = []
+                if batch:
+                    created, failed = self._flush(batch, writer, created, failed)
+        finally:
+            if options['output']:
+                output.close()
+        self.stderr.write(f"created={created} failed={failed}")
+
+    def _flush(self, batch, writer, created, failed):
+        results = provision_users([data for _, data in batch], all_or_nothing=False)
+        for (line_number, _), result in zip(batch, results):
+            if isinstance(result, dict):
+                failed += 1
+                self.stderr.write(f"line {line_number}: {json.dumps(result)}")
+            else:
+                created += 1
+                writer.writerow([result.username, result.userprofile.role, result.auth_token.key])
+        return created, failed
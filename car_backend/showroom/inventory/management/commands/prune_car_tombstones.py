@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from inventory.sync import SYNC_SETTINGS, prune_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the tombstones of cars deleted more than CAR_SYNC['TOMBSTONE_DAYS'] ago. "
+        "Delta sync cursors older than that get 410 and resync from scratch."
+    )
+
+    def handle(self, *args, **options):
+        pruned = prune_tombstones()
+        self.stdout.write(f"Pruned {pruned} tombstones older than {SYNC_SETTINGS['TOMBSTONE_DAYS']} days")
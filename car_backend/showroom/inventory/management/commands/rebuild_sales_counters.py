@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from inventory.models import Car, Customer, CustomerSummary, Sale
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the maintained sales counters (Car.sold_count and CustomerSummary) "
+        "from the inventory_sale table"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Number of cars / customers recomputed per batch (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        sold = (
+            Sale.objects.filter(car=OuterRef('pk'))
+            .order_by()
+            .values('car')
+            .annotate(total=Sum('quantity'))
+            .values('total')
+        )
+        cars = 0
+        for pks in self._batches(Car, batch_size):
+            total = Coalesce(Subquery(sold), Value(0))
+            with transaction.atomic():
+                # Only drifted rows are written, so the delta sync hands out real changes only
+                cars += Car.objects.filter(pk__in=pks).exclude(sold_count=total).update(
+                    sold_count=total, updated_at=timezone.now()
+                )
+        self.stdout.write(self.style.SUCCESS(f"Corrected sold_count of {cars} cars"))
+
+        customers = 0
+        for pks in self._batches(Customer, batch_size):
+            customers += CustomerSummary.rebuild(pks)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt purchase summaries for {customers} customers"))
+
+    def _batches(self, model, batch_size):
+        # Walk the primary key in order so every batch is a cheap index range scan
+        last_pk = None
+        while True:
+            queryset = model.objects.order_by('pk')
+            if last_pk is not None:
+                queryset = queryset.filter(pk__gt=last_pk)
+            pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return
+            yield pks
+            last_pk = pks[-1]
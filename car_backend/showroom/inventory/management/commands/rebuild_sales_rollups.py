@@ -0,0 +1,112 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from inventory.counters import bump_rollup, rollup_keys
+from inventory.models import DailyCarSales, MonthlyBrandSales, MonthlyCustomerSales, Sale
+
+ROLLUP_MODELS = (DailyCarSales, MonthlyBrandSales, MonthlyCustomerSales)
+
+
+def _next_month(month):
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def _local_midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the sales rollups (daily per car, monthly per brand and per customer) "
+        "from the inventory_sale table, one month per transaction: only that month's "
+        "rollup rows are locked while it is rebuilt, and analytics keep reading its old "
+        "rows until the new ones commit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help="Sales fetched per round trip, and rollup rows inserted per statement (default: 5000)",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        # Every month that has sales or rollup rows, so stale rows of a month whose
+        # sales are all gone are dropped as well
+        bounds = [
+            Sale.objects.aggregate(first=Min('sale_date'), last=Max('sale_date')),
+            DailyCarSales.objects.aggregate(first=Min('date'), last=Max('date')),
+            MonthlyBrandSales.objects.aggregate(first=Min('month'), last=Max('month')),
+            MonthlyCustomerSales.objects.aggregate(first=Min('month'), last=Max('month')),
+        ]
+        days = [
+            timezone.localdate(value) if isinstance(value, datetime) else value
+            for row in bounds for value in row.values() if value is not None
+        ]
+        if not days:
+            self.stdout.write(self.style.SUCCESS("No sales to roll up"))
+            return
+
+        month, last = min(days).replace(day=1), max(days).replace(day=1)
+        sales, written = 0, dict.fromkeys(ROLLUP_MODELS, 0)
+        while month <= last:
+            following = _next_month(month)
+            month_sales, buckets = self._rebuild_month(month, following, chunk_size)
+            sales += month_sales
+            for model in ROLLUP_MODELS:
+                written[model] += len(buckets.get(model, {}))
+            month = following
+
+        for model in ROLLUP_MODELS:
+            self.stdout.write(f"{written[model]} {model._meta.verbose_name_plural} rows")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt sales rollups from {sales} sales"))
+
+    def _rebuild_month(self, month, following, chunk_size):
+        with transaction.atomic():
+            # Deleting the month's buckets first locks them: sales that already moved one
+            # have committed when this returns (so the read below sees them), and sales
+            # that move one from now on wait for this transaction and apply after it
+            DailyCarSales.objects.filter(date__gte=month, date__lt=following).delete()
+            MonthlyBrandSales.objects.filter(month=month).delete()
+            MonthlyCustomerSales.objects.filter(month=month).delete()
+
+            # A single statement, so a single snapshot of the month's sales
+            buckets = {}
+            sales = 0
+            rows = (
+                Sale.objects.filter(sale_date__gte=_local_midnight(month), sale_date__lt=_local_midnight(following))
+                .order_by()
+                .values_list('car_id', 'car__brand', 'customer_id', 'sale_date', 'quantity', 'total_price')
+                .iterator(chunk_size=chunk_size)
+            )
+            for car_id, brand, customer_id, sale_date, quantity, total_price in rows:
+                for model, lookup in rollup_keys(car_id, brand, customer_id, sale_date):
+                    totals = buckets.setdefault(model, {}).setdefault(tuple(sorted(lookup.items())), [0, 0, 0])
+                    totals[0] += 1
+                    totals[1] += quantity
+                    totals[2] += total_price or 0
+                sales += 1
+
+            for model in ROLLUP_MODELS:
+                self._write(model, buckets.get(model, {}), chunk_size)
+        return sales, buckets
+
+    def _write(self, model, buckets, chunk_size):
+        items = sorted(buckets.items(), key=lambda item: str(item[0]))
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create([
+                        model(**dict(lookup), sales_count=count, units=units, revenue=revenue)
+                        for lookup, (count, units, revenue) in chunk
+                    ])
+            except IntegrityError:
+                # A bucket first created by a sale the snapshot does not include: add to it
+                for lookup, (count, units, revenue) in chunk:
+                    bump_rollup(model, dict(lookup), count, units, revenue)
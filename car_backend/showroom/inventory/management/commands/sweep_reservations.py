@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from inventory.services import expire_reservations
+
+
+class Command(BaseCommand):
+    help = (
+        "Release the stock of expired reservations in bulk. Run it once (e.g. from cron) or "
+        "as a long-running worker with --interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Seconds between sweeps; 0 sweeps once and exits (default: 0)")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Reservations expired per transaction (default: 1000)")
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_reservations(batch_size=options['batch_size'])
+            if expired or not options['interval']:
+                self.stdout.write(f"Expired {expired} reservations")
+            if not options['interval']:
+                break
+            # Do not keep a connection open (or let it go stale) between sweeps
+            connection.close()
+            time.sleep(options['interval'])
@@ -0,0 +1,230 @@
+import os
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+METRICS_SETTINGS = {
+    'ENABLED': True,
+    # Share of requests whose latency, SQL and size are measured; request counts are always exact
+    'SAMPLE_RATE': 1.0,
+    **getattr(settings, 'REQUEST_METRICS', {}),
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+KNOWN_METHODS = {'GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE'}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+# ✅ Per-process request metrics
+# Plain dicts behind one lock: an update is a handful of additions, cheap enough to
+# leave on in production. Every worker keeps its own registry (scrape each worker, or
+# sum across pids in the query); /api/metrics/ renders it in the Prometheus text format.
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}  # (view, method, status) -> count
+            self.latency = {}  # view -> Histogram (seconds)
+            self.queries = {}  # view -> Histogram (queries per request)
+            self.sql_seconds = {}  # view -> total SQL time
+            self.response_size = {}  # view -> Histogram (bytes)
+            self.rejected = {}  # (scope, role) -> requests refused by rate limiting
+
+    def observe(self, view, method, status, duration=None, queries=None, sql_seconds=None, size=None):
+        with self._lock:
+            key = (view, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if duration is None:
+                return  # not sampled
+            self.latency.setdefault(view, Histogram(LATENCY_BUCKETS)).observe(duration)
+            self.queries.setdefault(view, Histogram(QUERY_COUNT_BUCKETS)).observe(queries)
+            self.sql_seconds[view] = self.sql_seconds.get(view, 0.0) + sql_seconds
+            if size is not None:
+                self.response_size.setdefault(view, Histogram(SIZE_BUCKETS)).observe(size)
+
+    def rate_limited(self, scope, role):
+        with self._lock:
+            self.rejected[(scope, role)] = self.rejected.get((scope, role), 0) + 1
+
+    def render(self):
+        lines = [
+            '# HELP showroom_process_info Worker process serving these metrics.',
+            '# TYPE showroom_process_info gauge',
+            f'showroom_process_info{_labels(pid=os.getpid())} 1',
+        ]
+        with self._lock:
+            lines += [
+                '# HELP showroom_http_requests_total Requests by view, method and status code.',
+                '# TYPE showroom_http_requests_total counter',
+            ]
+            for (view, method, status), count in sorted(self.requests.items()):
+                lines.append(f'showroom_http_requests_total{_labels(view=view, method=method, status=status)} {count}')
+
+            self._render_histograms(
+                lines, 'showroom_http_request_duration_seconds',
+                'Latency of sampled requests by view.', self.latency,
+            )
+            self._render_histograms(
+                lines, 'showroom_db_queries_per_request',
+                'SQL queries issued by sampled requests by view.', self.queries,
+            )
+            lines += [
+                '# HELP showroom_db_query_seconds_total SQL time of sampled requests by view.',
+                '# TYPE showroom_db_query_seconds_total counter',
+            ]
+            for view, seconds in sorted(self.sql_seconds.items()):
+                lines.append(f'showroom_db_query_seconds_total{_labels(view=view)} {seconds:.6f}')
+            self._render_histograms(
+                lines, 'showroom_http_response_size_bytes',
+                'Body size of sampled (non-streaming) responses by view.', self.response_size,
+            )
+            lines += [
+                '# HELP showroom_rate_limited_total Requests rejected by rate limiting by scope and role.',
+                '# TYPE showroom_rate_limited_total counter',
+            ]
+            for (scope, role), count in sorted(self.rejected.items()):
+                lines.append(f'showroom_rate_limited_total{_labels(scope=scope, role=role)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histograms(lines, name, help_text, histograms):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for view, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(view=view, le=bound)} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(view=view, le="+Inf")} {histogram.count}')
+            lines.append(f'{name}_sum{_labels(view=view)} {histogram.sum}')
+            lines.append(f'{name}_count{_labels(view=view)} {histogram.count}')
+
+
+registry = MetricsRegistry()
+
+
+class QueryTimer:
+    """execute_wrapper counting and timing the SQL run while it is installed."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+    def installed(self):
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return stack
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    # URL names keep the label set bounded; unmatched paths are never used as labels
+    return (match.view_name or match._func_path) if match else 'unmatched'
+
+
+def _method(request):
+    return request.method if request.method in KNOWN_METHODS else 'OTHER'
+
+
+def _response_size(response):
+    if getattr(response, 'streaming', False):
+        return None
+    return len(response.content)
+
+
+# ✅ Request metrics middleware: outermost, so latency covers the whole stack
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        return random.random() < METRICS_SETTINGS['SAMPLE_RATE']
+
+    def _record(self, request, response, started=None, timer=None):
+        if started is None:
+            registry.observe(_view_name(request), _method(request), response.status_code)
+            return
+        registry.observe(
+            _view_name(request), _method(request), response.status_code,
+            duration=time.perf_counter() - started,
+            queries=timer.count, sql_seconds=timer.seconds,
+            size=_response_size(response),
+        )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not METRICS_SETTINGS['ENABLED']:
+            return self.get_response(request)
+        if not self._sampled():
+            response = self.get_response(request)
+            self._record(request, response)
+            return response
+
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with timer.installed():
+            response = self.get_response(request)
+        self._record(request, response, started, timer)
+        return response
+
+    async def __acall__(self, request):
+        if not METRICS_SETTINGS['ENABLED']:
+            return await self.get_response(request)
+        if not self._sampled():
+            response = await self.get_response(request)
+            self._record(request, response)
+            return response
+
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with timer.installed():
+            response = await self.get_response(request)
+        self._record(request, response, started, timer)
+        return response
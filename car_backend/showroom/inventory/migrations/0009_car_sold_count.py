@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:21
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_sold_count(apps, schema_editor):
+    Car = apps.get_model('inventory', 'Car')
+    Sale = apps.get_model('inventory', 'Sale')
+    sold = (
+        Sale.objects.filter(car=OuterRef('pk'))
+        .order_by()
+        .values('car')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    Car.objects.update(sold_count=Coalesce(Subquery(sold), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_alter_sale_customer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='sold_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_sold_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def backfill_customer_summaries(apps, schema_editor):
+    Customer = apps.get_model('inventory', 'Customer')
+    CustomerSummary = apps.get_model('inventory', 'CustomerSummary')
+    Sale = apps.get_model('inventory', 'Sale')
+    totals = {
+        row['customer']: row
+        for row in Sale.objects.order_by().values('customer').annotate(
+            sales_count=Count('id'),
+            units_bought=Sum('quantity'),
+            lifetime_spend=Sum('total_price'),
+            last_purchase_at=Max('sale_date'),
+        )
+    }
+    summaries = []
+    for customer_id in Customer.objects.values_list('pk', flat=True).iterator():
+        row = totals.get(customer_id, {})
+        summaries.append(CustomerSummary(
+            customer_id=customer_id,
+            sales_count=row.get('sales_count') or 0,
+            units_bought=row.get('units_bought') or 0,
+            lifetime_spend=row.get('lifetime_spend') or 0,
+            last_purchase_at=row.get('last_purchase_at'),
+        ))
+    CustomerSummary.objects.bulk_create(summaries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_car_sold_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerSummary',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='inventory.customer')),
+                ('sales_count', models.PositiveIntegerField(db_index=True, default=0)),
+                ('units_bought', models.PositiveIntegerField(db_index=True, default=0)),
+                ('lifetime_spend', models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=14)),
+                ('last_purchase_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_customer_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_customersummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['sale_date', 'id'], name='inv_sale_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['customer', 'sale_date', 'id'], name='inv_sale_cust_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_sale_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['brand', 'model', 'year'], name='inv_car_brand_model_year_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+# MySQL only: FULLTEXT index with the ngram parser for inventory.search. Other
+# databases use the in-process trigram index and need no schema change.
+def create_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX inv_car_search_ft ON inventory_car (brand, model) WITH PARSER ngram'
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('DROP INDEX inv_car_search_ft ON inventory_car')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_car_import_key_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_car_fulltext_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['stock', 'id'], name='inv_car_stock_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['price', 'id'], name='inv_car_price_id_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_car_report_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='customersummary',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['updated_at', 'id'], name='inv_car_updated_id_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0015_updated_at_validators'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyBrandSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('brand', models.CharField(max_length=100)),
+                ('sales_count', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('month', 'brand'), name='inv_monthly_brand_sales_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyCarSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('sales_count', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='inventory.car')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'car'), name='inv_daily_car_sales_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyCustomerSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('sales_count', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_sales', to='inventory.customer')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('month', 'customer'), name='inv_monthly_cust_sales_uniq')],
+            },
+        ),
+    ]
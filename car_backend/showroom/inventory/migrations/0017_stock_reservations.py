@@ -0,0 +1,61 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:57
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0016_sales_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('status', models.CharField(choices=[('active', 'Active'), ('converted', 'Converted to a sale'), ('released', 'Released'), ('expired', 'Expired')], default='active', max_length=10)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='reserved',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddConstraint(
+            model_name='car',
+            constraint=models.CheckConstraint(condition=models.Q(('stock__gte', models.F('reserved'))), name='inv_car_reserved_lte_stock'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='car',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='inventory.car'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='customer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='inventory.customer'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='sale',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservation', to='inventory.sale'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'expires_at', 'id'], name='inv_resv_status_expiry_idx'),
+        ),
+    ]
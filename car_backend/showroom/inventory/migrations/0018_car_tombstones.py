@@ -0,0 +1,24 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0017_stock_reservations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('car_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['deleted_at', 'car_id'], name='inv_tomb_deleted_car_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0018_car_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['name', 'cust_id'], name='inv_customer_name_idx'),
+        ),
+    ]
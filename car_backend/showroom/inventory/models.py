@@ -2,6 +2,7 @@ from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models import Count, F, Max, Q, Sum
 from datetime import datetime
 
 # ✅ User Profile for Role-Based Access Control
@@ -29,15 +30,74 @@ class Car(models.Model):
     )
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField()
+    # Units sold across all sales, maintained by the Sale signals (see signals.py)
+    sold_count = models.PositiveIntegerField(default=0, editable=False)
+    # Units held by active reservations, moved only by the reservation services
+    reserved = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Upsert key of the catalog import
+            models.Index(fields=['brand', 'model', 'year'], name='inv_car_brand_model_year_idx'),
+            # Keyset pagination of the low-stock / expensive-car reports
+            models.Index(fields=['stock', 'id'], name='inv_car_stock_id_idx'),
+            models.Index(fields=['price', 'id'], name='inv_car_price_id_idx'),
+            # Cheap max(updated_at) for the HTTP validators of car list pages
+            models.Index(fields=['updated_at', 'id'], name='inv_car_updated_id_idx'),
+        ]
+        constraints = [
+            # Held units are part of the stock: the stock can never drop below them
+            models.CheckConstraint(condition=Q(stock__gte=F('reserved')), name='inv_car_reserved_lte_stock'),
+        ]
 
     def __str__(self):
         return f"{self.brand} {self.model} ({self.year})"
 
+    @property
+    def available(self):
+        return self.stock - self.reserved
+
+    def clean(self):
+        if self.stock is not None and self.stock < self.reserved:
+            raise ValidationError({'stock': f"{self.reserved} units are held by reservations."})
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        car = super().from_db(db, field_names, values)
+        if 'brand' in field_names:
+            # The stored brand: the brand rollups follow a rename (see signals.py)
+            car._loaded_brand = car.brand
+        return car
+
+    def save(self, *args, **kwargs):
+        # sold_count and reserved are only moved by F() updates (Sale signals, reservation
+        # services), so never write back the (possibly stale) copies held by this instance
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in ('sold_count', 'reserved') and f.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+# ✅ Deleted cars, kept for the delta sync (see sync.py): a client syncing with a cursor
+# learns which cars to drop. Pruned after CAR_SYNC['TOMBSTONE_DAYS'].
+class CarTombstone(models.Model):
+    car_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Same keyset as the cars' (updated_at, id), merged into one change stream
+            models.Index(fields=['deleted_at', 'car_id'], name='inv_tomb_deleted_car_idx'),
+        ]
+
+    def __str__(self):
+        return f"car {self.car_id} deleted at {self.deleted_at}"
+
 # ✅ Customer Model
 class Customer(models.Model):
     cust_id = models.IntegerField(primary_key=True)
@@ -45,6 +105,13 @@ class Customer(models.Model):
     phone = models.CharField(max_length=15, unique=True)
     address = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # ?name= and ?ordering=name on the customer list
+            models.Index(fields=['name', 'cust_id'], name='inv_customer_name_idx'),
+        ]
 
     def __str__(self):
         return f"{self.cust_id} - {self.name}"
@@ -58,7 +125,149 @@ class Sale(models.Model):
     total_price = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
     sale_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the sales feed, globally and per customer
+            models.Index(fields=['sale_date', 'id'], name='inv_sale_date_id_idx'),
+            models.Index(fields=['customer', 'sale_date', 'id'], name='inv_sale_cust_date_id_idx'),
+        ]
+
     def __str__(self):
         return f"Sale of {self.quantity} {self.car.brand} {self.car.model} to {self.customer.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Keep the values as loaded so the signals can move counters by the delta on update
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if value is not models.DEFERRED
+        }
+        return instance
+
     # Remove the save method with stock management logic, since it's handled in the serializer
+
+# ✅ Customer Purchase Summary (maintained by the Sale signals, see signals.py)
+class CustomerSummary(models.Model):
+    customer = models.OneToOneField(
+        Customer, on_delete=models.CASCADE, primary_key=True, related_name='summary'
+    )
+    sales_count = models.PositiveIntegerField(default=0, db_index=True)
+    units_bought = models.PositiveIntegerField(default=0, db_index=True)
+    lifetime_spend = models.DecimalField(max_digits=14, decimal_places=2, default=0, db_index=True)
+    last_purchase_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.customer_id} - {self.sales_count} sales"
+
+    @classmethod
+    def rebuild(cls, customer_ids):
+        """Recompute the summaries of the given customers from the raw sales."""
+        customer_ids = list(customer_ids)
+        totals = {
+            row['customer']: row
+            for row in Sale.objects.filter(customer__in=customer_ids)
+            .order_by()
+            .values('customer')
+            .annotate(
+                sales_count=Count('id'),
+                units_bought=Sum('quantity'),
+                lifetime_spend=Sum('total_price'),
+                last_purchase_at=Max('sale_date'),
+            )
+        }
+        summaries = []
+        for customer_id in customer_ids:
+            row = totals.get(customer_id, {})
+            summaries.append(cls(
+                customer_id=customer_id,
+                sales_count=row.get('sales_count') or 0,
+                units_bought=row.get('units_bought') or 0,
+                lifetime_spend=row.get('lifetime_spend') or 0,
+                last_purchase_at=row.get('last_purchase_at'),
+            ))
+        with transaction.atomic():
+            cls.objects.filter(customer_id__in=customer_ids).delete()
+            cls.objects.bulk_create(summaries)
+        return len(summaries)
+
+# ✅ Sales Rollups (maintained with every Sale write, see counters.py)
+class DailyCarSales(models.Model):
+    date = models.DateField()
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name='daily_sales')
+    sales_count = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'car'], name='inv_daily_car_sales_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} car {self.car_id}: {self.units} units"
+
+
+class MonthlyBrandSales(models.Model):
+    month = models.DateField()  # first day of the month
+    brand = models.CharField(max_length=100)
+    sales_count = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'brand'], name='inv_monthly_brand_sales_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.brand}: {self.units} units"
+
+
+class MonthlyCustomerSales(models.Model):
+    month = models.DateField()  # first day of the month
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='monthly_sales')
+    sales_count = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'customer'], name='inv_monthly_cust_sales_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} customer {self.customer_id}: {self.units} units"
+
+
+# ✅ Stock reservation: a time-limited hold on units of a car while a deal is closed.
+# Car.reserved carries the total held, so availability (stock - reserved) never scans
+# this table; sweep_reservations releases expired holds in bulk.
+class Reservation(models.Model):
+    ACTIVE, CONVERTED, RELEASED, EXPIRED = 'active', 'converted', 'released', 'expired'
+    STATUS_CHOICES = (
+        (ACTIVE, 'Active'),
+        (CONVERTED, 'Converted to a sale'),
+        (RELEASED, 'Released'),
+        (EXPIRED, 'Expired'),
+    )
+
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name='reservations')
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=ACTIVE)
+    expires_at = models.DateTimeField()
+    sale = models.OneToOneField(Sale, on_delete=models.SET_NULL, null=True, blank=True, related_name='reservation')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The sweeper's scan: active holds past their expiry, oldest first
+            models.Index(fields=['status', 'expires_at', 'id'], name='inv_resv_status_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x car {self.car_id} for customer {self.customer_id} ({self.status})"
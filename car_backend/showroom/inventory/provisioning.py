@@ -0,0 +1,105 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from .models import UserProfile
+
+PROVISIONING_SETTINGS = {
+    # Threads hashing passwords. The hashers (PBKDF2, Argon2, bcrypt) release the GIL
+    # while hashing, so the threads run on separate cores.
+    'HASH_WORKERS': os.cpu_count() or 1,
+    'MAX_USERS': 1000,
+    **getattr(settings, 'USER_PROVISIONING', {}),
+}
+
+ROLE_FLAGS = {
+    'admin': {'is_staff': True, 'is_superuser': True},
+    'staff': {'is_staff': True, 'is_superuser': False},
+    'customer': {'is_staff': False, 'is_superuser': False},
+}
+
+_executor = (None, None)  # (pid, ThreadPoolExecutor)
+_executor_lock = threading.Lock()
+
+
+def _hash_executor():
+    global _executor
+    with _executor_lock:
+        pid, executor = _executor
+        # Threads do not survive a fork: every worker process starts its own pool
+        if executor is None or pid != os.getpid():
+            executor = ThreadPoolExecutor(PROVISIONING_SETTINGS['HASH_WORKERS'], thread_name_prefix='password-hash')
+            _executor = (os.getpid(), executor)
+        return executor
+
+
+def hash_passwords(passwords):
+    """make_password() for each password, spread over the hashing pool."""
+    if len(passwords) < 2 or PROVISIONING_SETTINGS['HASH_WORKERS'] < 2:
+        return [make_password(password) for password in passwords]
+    return list(_hash_executor().map(make_password, passwords))
+
+
+# ✅ User provisioning
+# Users, profiles and tokens are written with three bulk INSERTs, so no post_save
+# signal runs (a new user has nothing cached to invalidate). Passwords are hashed
+# before the transaction opens, so no locks are held while hashing.
+def provision_users(items, all_or_nothing=True, validate_only=False):
+    """Create users with their profile and API token.
+
+    ``items`` is a sequence of ``{'username': ..., 'password': ..., 'role': ...}``.
+    Returns a list aligned with ``items`` holding either the created User (with
+    ``userprofile`` and ``auth_token`` attached) or a dict of errors. With
+    ``all_or_nothing`` any error means nothing is written; ``validate_only`` checks
+    the items without writing anything.
+    """
+    # MySQL compares usernames case-insensitively, so duplicates are matched the same way
+    existing = {
+        username.casefold()
+        for username in User.objects.filter(username__in=[item['username'] for item in items])
+        .values_list('username', flat=True)
+    }
+
+    results, seen = [], set()
+    for item in items:
+        key = item['username'].casefold()
+        if key in existing or key in seen:
+            results.append({'username': ['A user with that username already exists.']})
+            continue
+        seen.add(key)
+        results.append(User(username=item['username'], **ROLE_FLAGS[item['role']]))
+
+    created = [(item, user) for item, user in zip(items, results) if isinstance(user, User)]
+    if validate_only or not created or (all_or_nothing and len(created) != len(results)):
+        return results
+
+    passwords = hash_passwords([item['password'] for item, _ in created])
+    users = []
+    for (item, user), password in zip(created, passwords):
+        user.password = password
+        users.append(user)
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=500)
+        if users[0].pk is None:
+            # Backends that do not return primary keys from bulk_create: read them back
+            ids = dict(
+                User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id')
+            )
+            for user in users:
+                user.pk = ids[user.username]
+        profiles = [UserProfile(user=user, role=item['role']) for item, user in created]
+        tokens = [Token(key=Token.generate_key(), user=user) for user in users]
+        UserProfile.objects.bulk_create(profiles, batch_size=500)
+        Token.objects.bulk_create(tokens, batch_size=500)
+
+    for user, profile, token in zip(users, profiles, tokens):
+        user.userprofile = profile
+        user.auth_token = token
+    return results
@@ -0,0 +1,152 @@
+import logging
+import re
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.fields import Field
+from rest_framework.serializers import BaseSerializer
+
+from .metrics import QueryTimer
+
+QUERY_INSPECTION_SETTINGS = {
+    'ENABLED': False,
+    # A statement shape run more often than this within one request is reported
+    'THRESHOLD': 3,
+    # Raise RepeatedQueries instead of logging (CI, local development)
+    'RAISE': False,
+    **getattr(settings, 'QUERY_INSPECTION', {}),
+}
+
+logger = logging.getLogger('inventory.queries')
+
+PROJECT_DIR = str(Path(__file__).resolve().parent.parent)
+THIS_FILE = str(Path(__file__).resolve())
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?)\s*,)*\s*(?:%s|\?)\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Shape of a statement: literals and parameter lists folded away, so the N queries
+    of an N+1 loop share one fingerprint."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _origin():
+    # Innermost serializer field being rendered, and the innermost project frame
+    field = location = None
+    frame = sys._getframe(2)
+    while frame is not None and (field is None or location is None):
+        code = frame.f_code
+        if field is None and code.co_name == 'to_representation':
+            serializer, current = frame.f_locals.get('self'), frame.f_locals.get('field')
+            if isinstance(serializer, BaseSerializer) and isinstance(current, Field):
+                field = f'{type(serializer).__name__}.{current.field_name}'
+        if (location is None and code.co_filename.startswith(PROJECT_DIR)
+                and code.co_filename != THIS_FILE and 'site-packages' not in code.co_filename):
+            location = f'{Path(code.co_filename).relative_to(PROJECT_DIR)}:{frame.f_lineno} in {code.co_name}'
+        frame = frame.f_back
+    return field, location
+
+
+class RepeatedQueries(Exception):
+    pass
+
+
+# ✅ N+1 / duplicate query detection
+# Records the shape, parameters and origin (serializer field, project code line) of
+# every statement while installed. Walking the stack per query is too slow for
+# production: the middleware is opt-in, and the test suite uses query_budget().
+class QueryInspector(QueryTimer):
+    def __init__(self, threshold=None):
+        super().__init__()
+        self.threshold = QUERY_INSPECTION_SETTINGS['THRESHOLD'] if threshold is None else threshold
+        self.queries = []  # (fingerprint, sql, params, field, location)
+
+    def __call__(self, execute, sql, params, many, context):
+        field, location = _origin()
+        self.queries.append((fingerprint(sql), sql, repr(params), field, location))
+        return super().__call__(execute, sql, params, many, context)
+
+    def repeated(self):
+        """Statement shapes run more than `threshold` times, most frequent first."""
+        groups = {}
+        for shape, sql, params, field, location in self.queries:
+            group = groups.setdefault(shape, {
+                'count': 0, 'sql': sql, 'params': set(), 'fields': set(), 'locations': set(),
+            })
+            group['count'] += 1
+            group['params'].add(params)
+            if field:
+                group['fields'].add(field)
+            if location:
+                group['locations'].add(location)
+        return sorted((
+            {
+                'count': group['count'],
+                # Same statement with the same parameters: a plain duplicate, not just N+1
+                'identical': group['count'] - len(group['params']),
+                'sql': group['sql'],
+                'fields': sorted(group['fields']),
+                'locations': sorted(group['locations']),
+            }
+            for group in groups.values() if group['count'] > self.threshold
+        ), key=lambda group: -group['count'])
+
+    def report(self, view=None):
+        lines = [f"{view or 'request'}: {self.count} queries"]
+        for group in self.repeated():
+            lines.append(
+                f"  {group['count']}x ({group['identical']} identical) {group['sql'][:300]}"
+            )
+            if group['fields']:
+                lines.append(f"    serializer fields: {', '.join(group['fields'])}")
+            for location in group['locations']:
+                lines.append(f"    at {location}")
+        return '\n'.join(lines)
+
+
+@contextmanager
+def query_budget(max_queries=None, threshold=None, label=None):
+    """Fail (AssertionError) when the block runs more than max_queries statements or
+    repeats a statement shape more than `threshold` times."""
+    inspector = QueryInspector(threshold)
+    with inspector.installed():
+        yield inspector
+    over_budget = max_queries is not None and inspector.count > max_queries
+    if over_budget or inspector.repeated():
+        budget = f" (budget {max_queries})" if max_queries is not None else ''
+        raise AssertionError(inspector.report(label) + budget)
+
+
+# ✅ Opt-in middleware (QUERY_INSPECTION['ENABLED']): logs, or raises on, repeated
+# statement shapes per request, naming the view and serializer field responsible
+class QueryInspectionMiddleware:
+    def __init__(self, get_response):
+        if not QUERY_INSPECTION_SETTINGS['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inspector = QueryInspector()
+        with inspector.installed():
+            response = self.get_response(request)
+
+        response['X-Query-Count'] = str(inspector.count)
+        repeated = inspector.repeated()
+        if repeated:
+            match = getattr(request, 'resolver_match', None)
+            view = match.view_name if match else request.path
+            response['X-Repeated-Queries'] = str(len(repeated))
+            if QUERY_INSPECTION_SETTINGS['RAISE']:
+                raise RepeatedQueries(inspector.report(view))
+            logger.warning(inspector.report(view))
+        return response
@@ -0,0 +1,216 @@
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, IntegerField, When
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+from showroom.db.routers import replica_reads
+
+from .models import Car
+
+SEARCH_SETTINGS = {
+    # 'auto' uses the MySQL FULLTEXT (ngram) index on MySQL and the trigram index elsewhere
+    'BACKEND': 'auto',
+    # Matches ordered by relevance; any further matches still filter and count, after them by id
+    'MAX_RESULTS': 1000,
+    'MIN_SCORE': 0.5,
+    # Catalog changes other processes catch up on by re-reading only the changed cars;
+    # an index further behind (or with a change aged out of the log) is rebuilt
+    'CATCH_UP_LIMIT': 500,
+    'CHANGE_LOG_SECONDS': 3600,
+    **getattr(settings, 'CAR_SEARCH', {}),
+}
+
+SEARCH_VERSION_KEY = 'inventory:search-version'
+_WORD_RE = re.compile(r'\w+')
+
+
+def _change_key(version):
+    return f'inventory:search-change:{version}'
+
+
+def _words(text):
+    return _WORD_RE.findall(text.casefold())
+
+
+def _trigrams(word, prefix=False):
+    # pg_trgm style padding; query words are left open on the right so they also
+    # match as a prefix ("toy" -> "toyota")
+    padded = f'  {word}' if prefix else f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# ✅ Portable trigram index
+# An in-process inverted index trigram -> car ids. A search only walks the posting
+# lists of the query's trigrams, so its cost follows the number of matching cars and
+# not the size of the table. Every catalog change is numbered by the shared "search
+# version" in the cache and logged under that number with the ids of the cars it
+# touched: other processes re-read just those cars before their next search, and
+# only rebuild the whole index when they are too far behind.
+class TrigramIndex:
+    def __init__(self):
+        self._postings = defaultdict(set)
+        self._documents = {}
+        self._version = None
+        self._lock = threading.RLock()
+
+    def _current_version(self):
+        version = cache.get(SEARCH_VERSION_KEY)
+        if version is None:
+            cache.add(SEARCH_VERSION_KEY, 1, None)
+            version = cache.get(SEARCH_VERSION_KEY)
+        return version
+
+    def _ensure_fresh(self):
+        version = self._current_version()
+        if version == self._version:
+            return
+        if self._version is None or not 0 < version - self._version <= SEARCH_SETTINGS['CATCH_UP_LIMIT']:
+            self.rebuild(version)
+            return
+        keys = [_change_key(number) for number in range(self._version + 1, version + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys) or None in changes.values():
+            # Aged out, not stored yet by its publisher, or a bulk change without ids
+            self.rebuild(version)
+            return
+        self._reload(set().union(*changes.values()))
+        self._version = version
+
+    def rebuild(self, version=None):
+        with self._lock:
+            self._postings = defaultdict(set)
+            self._documents = {}
+            # Built from the primary: a lagging replica would miss cars until the next change
+            with replica_reads(False):
+                for car_id, brand, model in Car.objects.order_by().values_list('id', 'brand', 'model').iterator():
+                    self._add(car_id, brand, model)
+            self._version = self._current_version() if version is None else version
+
+    def _reload(self, car_ids):
+        with replica_reads(False):
+            rows = list(Car.objects.filter(pk__in=car_ids).values_list('id', 'brand', 'model'))
+        for car_id in car_ids:
+            self._remove(car_id)  # deleted cars are simply not found again
+        for car_id, brand, model in rows:
+            self._add(car_id, brand, model)
+
+    def _add(self, car_id, brand, model):
+        grams = set()
+        for word in _words(f'{brand} {model}'):
+            grams |= _trigrams(word)
+        self._documents[car_id] = grams
+        for gram in grams:
+            self._postings[gram].add(car_id)
+
+    def _remove(self, car_id):
+        for gram in self._documents.pop(car_id, ()):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(car_id)
+                if not posting:
+                    del self._postings[gram]
+
+    def _publish(self, car_ids):
+        """Number and log a committed change (None: reload everything); returns its version."""
+        try:
+            version = cache.incr(SEARCH_VERSION_KEY)
+        except ValueError:
+            cache.add(SEARCH_VERSION_KEY, 1, None)
+            version = cache.incr(SEARCH_VERSION_KEY)
+        cache.set(_change_key(version), car_ids and set(car_ids), SEARCH_SETTINGS['CHANGE_LOG_SECONDS'])
+        return version
+
+    def _apply(self, change, car_ids):
+        # Apply our own change locally when the index was current just before it;
+        # otherwise the next search catches up from the log, this change included
+        with self._lock:
+            version = self._publish(car_ids)
+            if self._version is not None and self._version == version - 1:
+                change()
+                self._version = version
+
+    def update(self, car_id, brand, model):
+        def change():
+            self._remove(car_id)
+            self._add(car_id, brand, model)
+        self._apply(change, [car_id])
+
+    def remove(self, car_id):
+        self._apply(lambda: self._remove(car_id), [car_id])
+
+    def invalidate(self, car_ids=None):
+        """Cars changed without the signals (bulk writes): re-read ``car_ids``, or every car."""
+        with self._lock:
+            self._publish(car_ids)
+
+    def search(self, term, limit=None, min_score=0):
+        query = set()
+        for word in _words(term):
+            query |= _trigrams(word, prefix=True)
+        if not query:
+            return []
+
+        with self._lock:
+            self._ensure_fresh()
+            hits = Counter()
+            for gram in query:
+                hits.update(self._postings.get(gram, ()))
+
+        # Share of the query's trigrams found in the car: tolerates typos, rewards prefixes
+        scored = [(count / len(query), car_id) for car_id, count in hits.items()]
+        scored = [(score, car_id) for score, car_id in scored if score >= min_score]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored[:limit]
+
+
+trigram_index = TrigramIndex()
+
+
+def search_backend():
+    backend = SEARCH_SETTINGS['BACKEND']
+    if backend == 'auto':
+        return 'mysql' if connection.vendor == 'mysql' else 'trigram'
+    return backend
+
+
+def search_cars(queryset, term, rank=True):
+    """Restrict ``queryset`` to cars matching ``term``, best matches first when ``rank``."""
+    limit = SEARCH_SETTINGS['MAX_RESULTS']
+    if search_backend() == 'mysql':
+        # FULLTEXT index with the ngram parser (migration 0013): substring and prefix
+        # matches, and relevance degrades gracefully with typos
+        queryset = queryset.annotate(
+            search_score=RawSQL(
+                'MATCH (inventory_car.brand, inventory_car.model) AGAINST (%s IN NATURAL LANGUAGE MODE)',
+                (term,),
+            )
+        ).filter(search_score__gt=0)
+        return queryset.order_by('-search_score', 'id') if rank else queryset
+
+    # Every match filters, so counts and other filters see them all; only the ranking is capped
+    ids = [car_id for _, car_id in trigram_index.search(term, min_score=SEARCH_SETTINGS['MIN_SCORE'])]
+    queryset = queryset.filter(pk__in=ids)
+    if rank and ids:
+        queryset = queryset.order_by(Case(
+            *[When(pk=car_id, then=position) for position, car_id in enumerate(ids[:limit])],
+            default=limit, output_field=IntegerField(),
+        ), 'id')
+    return queryset
+
+
+# ✅ DRF filter backend replacing SearchFilter's LIKE '%term%' scans
+class CarSearchFilter(BaseFilterBackend):
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        if not term:
+            return queryset
+        # An explicit ?ordering= wins over relevance
+        rank = not request.query_params.get('ordering')
+        return search_cars(queryset, term, rank=rank)
@@ -1,21 +1,33 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from django.db.models import Sum
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.db import transaction
 
-from .models import Car, Customer, Sale, UserProfile
+from .models import Car, Customer, Reservation, Sale, UserProfile
+from .services import RESERVATION_SETTINGS, InsufficientStock, commit_sale, move_sale_stock, reserve_stock
 
 # 🔹 Car Serializer
 class CarSerializer(serializers.ModelSerializer):
-    sold_count = serializers.SerializerMethodField(read_only=True)
+    # Stock not held by active reservations
+    available = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Car
-        fields = ['id', 'brand', 'model', 'year', 'price', 'stock', 'sold_count']
+        fields = ['id', 'brand', 'model', 'year', 'price', 'stock', 'sold_count', 'available']
+        read_only_fields = ['sold_count']
 
-    def get_sold_count(self, obj):
-        result = Sale.objects.filter(car=obj).aggregate(total=Sum('quantity'))
-        return result['total'] or 0
+    def update(self, instance, validated_data):
+        if 'stock' not in validated_data:
+            return super().update(instance, validated_data)
+        with transaction.atomic():
+            # Read the held units under the row lock: a hold taken since the car was
+            # loaded counts too, and none can be taken before this save commits
+            instance.reserved = Car.objects.select_for_update().values_list('reserved', flat=True).get(pk=instance.pk)
+            if validated_data['stock'] < instance.reserved:
+                raise serializers.ValidationError(
+                    {'stock': [f"{instance.reserved} units are held by reservations."]}
+                )
+            return super().update(instance, validated_data)
 
 
 # 🔹 User Serializer
@@ -45,25 +57,24 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 # 🔹 Customer Serializer
+# Purchase figures come from the maintained CustomerSummary row; views load it with
+# select_related('summary') so a page of customers costs a single query.
 class CustomerSerializer(serializers.ModelSerializer):
-    sales_count = serializers.SerializerMethodField(read_only=True)
-    total_cars_bought = serializers.SerializerMethodField(read_only=True)
+    sales_count = serializers.IntegerField(source='summary.sales_count', read_only=True, default=0)
+    total_cars_bought = serializers.IntegerField(source='summary.units_bought', read_only=True, default=0)
+    lifetime_spend = serializers.DecimalField(
+        source='summary.lifetime_spend', max_digits=14, decimal_places=2, read_only=True, default=0
+    )
+    last_purchase_at = serializers.DateTimeField(source='summary.last_purchase_at', read_only=True, default=None)
 
     class Meta:
         model = Customer
         fields = [
             'cust_id', 'name', 'phone', 'address', 'created_at',
-            'sales_count', 'total_cars_bought'
+            'sales_count', 'total_cars_bought', 'lifetime_spend', 'last_purchase_at'
         ]
         read_only_fields = ['created_at']
 
-    def get_sales_count(self, obj):
-        return Sale.objects.filter(customer=obj).count()
-
-    def get_total_cars_bought(self, obj):
-        result = Sale.objects.filter(customer=obj).aggregate(total=Sum('quantity'))
-        return result['total'] or 0
-
 
 # In serializers.py - modify the SaleSerializer
 class SaleSerializer(serializers.ModelSerializer):
@@ -72,29 +83,27 @@ class SaleSerializer(serializers.ModelSerializer):
 
     customer_name = serializers.CharField(source='customer.name', read_only=True)
     car_model = serializers.CharField(source='car.model', read_only=True)
+    # Only present on create/update responses: stock left on the car after this sale
+    remaining_stock = serializers.IntegerField(read_only=True, required=False)
 
     class Meta:
         model = Sale
         fields = [
             'id', 'car', 'car_model',
             'customer', 'customer_name',
-            'quantity', 'total_price', 'sale_date'
+            'quantity', 'total_price', 'sale_date', 'remaining_stock'
         ]
         read_only_fields = ['total_price', 'sale_date']
 
     def create(self, validated_data):
-        car = validated_data['car']
-        quantity = validated_data['quantity']
-
-        if car.stock < quantity:
-            raise serializers.ValidationError(f"Not enough stock available! Only {car.stock} cars left.")
-
-        with transaction.atomic():
-            car.stock -= quantity
-            car.save()
-
-            validated_data['total_price'] = quantity * car.price
-            return super().create(validated_data)
+        try:
+            sale, remaining = commit_sale(
+                validated_data['car'], validated_data['customer'], validated_data['quantity']
+            )
+        except InsufficientStock as e:
+            raise serializers.ValidationError(str(e))
+        sale.remaining_stock = remaining
+        return sale
 
     def update(self, instance, validated_data):
         old_car = instance.car
@@ -107,27 +116,60 @@ class SaleSerializer(serializers.ModelSerializer):
         if old_car == new_car and old_quantity == new_quantity:
             return super().update(instance, validated_data)
 
-        with transaction.atomic():
-            if old_car == new_car:
-                diff = new_quantity - old_quantity
-                if diff > 0:
-                    if new_car.stock < diff:
-                        raise serializers.ValidationError(f"Not enough stock available! Only {new_car.stock} cars left.")
-                    new_car.stock -= diff
-                elif diff < 0:
-                    new_car.stock += abs(diff)
-                new_car.save()
-            else:
-                old_car.stock += old_quantity
-                old_car.save()
-
-                if new_car.stock < new_quantity:
-                    raise serializers.ValidationError(f"Not enough stock available! Only {new_car.stock} cars left.")
-                new_car.stock -= new_quantity
-                new_car.save()
-
-            validated_data['total_price'] = new_quantity * new_car.price
-            return super().update(instance, validated_data)
+        try:
+            with transaction.atomic():
+                remaining = move_sale_stock(instance, new_car, new_quantity)
+                validated_data['total_price'] = new_quantity * new_car.price
+                sale = super().update(instance, validated_data)
+        except InsufficientStock as e:
+            raise serializers.ValidationError(str(e))
+        sale.remaining_stock = remaining
+        return sale
+
+# 🔹 Reservation Serializer (holds are created through reserve_stock, never saved directly)
+class ReservationSerializer(serializers.ModelSerializer):
+    ttl_seconds = serializers.IntegerField(
+        write_only=True, required=False, min_value=1, max_value=RESERVATION_SETTINGS['MAX_TTL']
+    )
+
+    class Meta:
+        model = Reservation
+        fields = ['id', 'car', 'customer', 'quantity', 'status', 'expires_at', 'sale', 'created_at', 'ttl_seconds']
+        read_only_fields = ['status', 'expires_at', 'sale', 'created_at']
+
+    def create(self, validated_data):
+        request = self.context.get('request')
+        try:
+            return reserve_stock(
+                validated_data['car'], validated_data['customer'], validated_data['quantity'],
+                ttl=validated_data.get('ttl_seconds', RESERVATION_SETTINGS['DEFAULT_TTL']),
+                created_by=request.user if request else None,
+            )
+        except InsufficientStock as e:
+            raise serializers.ValidationError(str(e))
+
+# 🔹 Bulk Sale item (shape only; cars, customers and stock are checked in one pass by commit_bulk_sales)
+class BulkSaleItemSerializer(serializers.Serializer):
+    car = serializers.IntegerField()
+    customer = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+# 🔹 Bulk User item (shape only; duplicate usernames are checked in one pass by provision_users)
+class BulkUserItemSerializer(serializers.Serializer):
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    password = serializers.CharField(trim_whitespace=False)
+    role = serializers.CharField(required=False, allow_blank=True)  # blank: the default role
+
+    def validate_role(self, value):
+        role = value.lower()
+        if role and role not in dict(UserProfile.ROLE_CHOICES):
+            raise serializers.ValidationError("Role must be admin, staff, or customer")
+        return role
+
+    def validate(self, attrs):
+        if not attrs.get('role'):
+            attrs['role'] = self.context.get('default_role', 'customer')
+        return attrs
 
 # 🔹 UserProfile Serializer
 class UserProfileSerializer(serializers.ModelSerializer):
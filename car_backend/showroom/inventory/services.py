@@ -0,0 +1,291 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .caching import bump_inventory_version
+from .counters import apply_bulk_sale_counters
+from .events import cars_changed
+from .models import Car, Customer, Reservation, Sale
+
+
+# ✅ Sale commit path
+# Stock is only ever moved here, with conditional UPDATEs evaluated by the database
+# ("... SET stock = stock - n WHERE id = ? AND stock >= n"). The row lock taken by the
+# UPDATE is held only until the surrounding transaction commits, there is no
+# read-check-write window in Python, and concurrent sellers can never oversell.
+class InsufficientStock(Exception):
+    def __init__(self, car_id, requested, available):
+        self.car_id = car_id
+        self.requested = requested
+        self.available = available
+        super().__init__(f"Not enough stock available! Only {available} cars left.")
+
+
+def _current_stock(car_id):
+    return Car.objects.filter(pk=car_id).values_list('stock', flat=True).first() or 0
+
+
+def _available_stock(car_id):
+    # Units held by reservations cannot be sold to anyone else
+    row = Car.objects.filter(pk=car_id).values_list('stock', 'reserved').first()
+    return row[0] - row[1] if row else 0
+
+
+def take_stock(car_id, quantity):
+    """Atomically remove ``quantity`` unreserved units of a car and return the remaining stock."""
+    updated = Car.objects.filter(pk=car_id, stock__gte=F('reserved') + quantity).update(
+        stock=F('stock') - quantity, updated_at=timezone.now()
+    )
+    if not updated:
+        raise InsufficientStock(car_id, quantity, _available_stock(car_id))
+    cars_changed([car_id])
+    # Our UPDATE holds the row lock until commit, so this read sees our own write
+    return _current_stock(car_id)
+
+
+def return_stock(car_id, quantity):
+    Car.objects.filter(pk=car_id).update(stock=F('stock') + quantity, updated_at=timezone.now())
+    cars_changed([car_id])
+
+
+def commit_sale(car, customer, quantity):
+    """Take the stock and record the sale in one transaction; returns (sale, remaining_stock)."""
+    with transaction.atomic():
+        remaining = take_stock(car.pk, quantity)
+        sale = Sale.objects.create(
+            car=car, customer=customer, quantity=quantity, total_price=quantity * car.price
+        )
+    return sale, remaining
+
+
+def move_sale_stock(sale, new_car, new_quantity):
+    """Re-balance stock when an existing sale changes car or quantity.
+
+    Must run inside the transaction that saves the sale. Returns the remaining
+    stock of ``new_car``.
+    """
+    old_car_id, old_quantity = sale.car_id, sale.quantity
+    if old_car_id == new_car.pk:
+        diff = new_quantity - old_quantity
+        if diff > 0:
+            return take_stock(new_car.pk, diff)
+        if diff < 0:
+            return_stock(new_car.pk, -diff)
+        return _current_stock(new_car.pk)
+
+    # Touch the two rows in primary key order so crossing updates cannot deadlock
+    if old_car_id < new_car.pk:
+        return_stock(old_car_id, old_quantity)
+        return take_stock(new_car.pk, new_quantity)
+    remaining = take_stock(new_car.pk, new_quantity)
+    return_stock(old_car_id, old_quantity)
+    return remaining
+
+
+def commit_bulk_sales(items, all_or_nothing=True, validate_only=False):
+    """Record many sales with one lock pass, one stock UPDATE and one bulk INSERT.
+
+    ``items`` is a sequence of ``{'car': id, 'customer': id, 'quantity': n}``. Returns a
+    list aligned with ``items`` holding either the created Sale or a dict of errors.
+    With ``all_or_nothing`` any error means nothing is written; ``validate_only`` checks
+    the items against current stock without writing anything.
+    """
+    car_ids = {item['car'] for item in items}
+    customer_ids = set(
+        Customer.objects.filter(pk__in={item['customer'] for item in items}).values_list('pk', flat=True)
+    )
+
+    with transaction.atomic():
+        # Lock every car involved once, in pk order, then allocate stock in request order
+        cars = {car.pk: car for car in Car.objects.select_for_update().filter(pk__in=car_ids).order_by('pk')}
+        available = {pk: car.available for pk, car in cars.items()}
+
+        results = []
+        for item in items:
+            car = cars.get(item['car'])
+            if car is None:
+                results.append({'car': [f"Invalid pk \"{item['car']}\" - object does not exist."]})
+            elif item['customer'] not in customer_ids:
+                results.append({'customer': [f"Invalid pk \"{item['customer']}\" - object does not exist."]})
+            elif available[car.pk] < item['quantity']:
+                results.append({'non_field_errors': [
+                    f"Not enough stock available! Only {available[car.pk]} cars left."
+                ]})
+            else:
+                available[car.pk] -= item['quantity']
+                results.append(Sale(
+                    car=car, customer_id=item['customer'], quantity=item['quantity'],
+                    total_price=item['quantity'] * car.price,
+                ))
+
+        sales = [result for result in results if isinstance(result, Sale)]
+        if validate_only or not sales or (all_or_nothing and len(sales) != len(results)):
+            return results
+
+        taken = {pk: car.available - available[pk] for pk, car in cars.items() if available[pk] != car.available}
+        Car.objects.filter(pk__in=taken).update(
+            stock=F('stock') - Case(
+                *[When(pk=pk, then=Value(units)) for pk, units in taken.items()], default=Value(0)
+            ),
+            updated_at=timezone.now(),
+        )
+        Sale.objects.bulk_create(sales, batch_size=500)
+        if sales[0].pk is None:
+            # Backends that do not return primary keys from bulk_create (MySQL): read them
+            # back. Every sale of these cars since they were locked is one of ours, and
+            # equal rows were numbered in insert order.
+            ids = {}
+            rows = (
+                Sale.objects.filter(car__in=taken, sale_date__gte=min(sale.sale_date for sale in sales))
+                .order_by('pk').values_list('pk', 'car_id', 'customer_id', 'quantity', 'sale_date')
+            )
+            for pk, *key in rows:
+                ids.setdefault(tuple(key), []).append(pk)
+            for sale in sales:
+                sale.pk = ids[(sale.car_id, sale.customer_id, sale.quantity, sale.sale_date)].pop(0)
+        apply_bulk_sale_counters(sales)
+        bump_inventory_version()
+        cars_changed(taken)
+    return results
+
+
+# ✅ Reservations
+# A hold moves units from "available" to Car.reserved with the same kind of conditional
+# UPDATE as a sale ("... SET reserved = reserved + n WHERE stock >= reserved + n"), and
+# every state change of a hold is a conditional UPDATE on its status, so a hold is
+# converted, released or expired exactly once however the callers race.
+RESERVATION_SETTINGS = {
+    'DEFAULT_TTL': 900,  # seconds
+    'MAX_TTL': 86400,
+    **getattr(settings, 'RESERVATIONS', {}),
+}
+
+
+class ReservationUnavailable(Exception):
+    pass
+
+
+def reserve_stock(car, customer, quantity, ttl, created_by=None):
+    """Hold ``quantity`` units of ``car`` for ``ttl`` seconds; returns the Reservation."""
+    now = timezone.now()
+    with transaction.atomic():
+        held = Car.objects.filter(pk=car.pk, stock__gte=F('reserved') + quantity).update(
+            reserved=F('reserved') + quantity, updated_at=now
+        )
+        if not held:
+            raise InsufficientStock(car.pk, quantity, _available_stock(car.pk))
+        cars_changed([car.pk])
+        reservation = Reservation.objects.create(
+            car=car, customer=customer, quantity=quantity,
+            expires_at=now + timedelta(seconds=ttl), created_by=created_by,
+        )
+        bump_inventory_version()
+    return reservation
+
+
+def _close(reservation, status, now, unexpired=False):
+    # Only the caller whose UPDATE flips the status may touch the stock
+    active = Reservation.objects.filter(pk=reservation.pk, status=Reservation.ACTIVE)
+    if unexpired:
+        active = active.filter(expires_at__gt=now)
+    if not active.update(status=status, updated_at=now):
+        reservation.refresh_from_db(fields=['status', 'expires_at'])
+        if reservation.status == Reservation.ACTIVE:
+            raise ReservationUnavailable("Reservation has expired")
+        raise ReservationUnavailable(f"Reservation is already {reservation.status}")
+
+
+def convert_reservation(reservation):
+    """Turn an active, unexpired hold into a Sale of the held units; returns (sale, remaining_stock)."""
+    now = timezone.now()
+    with transaction.atomic():
+        _close(reservation, Reservation.CONVERTED, now, unexpired=True)
+        # The held units are already set aside: no availability check needed
+        Car.objects.filter(pk=reservation.car_id).update(
+            stock=F('stock') - reservation.quantity, reserved=F('reserved') - reservation.quantity, updated_at=now
+        )
+        # brand is read by the sale rollups
+        car = Car.objects.only('price', 'stock', 'brand').get(pk=reservation.car_id)
+        sale = Sale.objects.create(
+            car=car, customer_id=reservation.customer_id,
+            quantity=reservation.quantity, total_price=reservation.quantity * car.price,
+        )
+        Reservation.objects.filter(pk=reservation.pk).update(sale=sale)
+        cars_changed([car.pk])
+    reservation.status, reservation.sale = Reservation.CONVERTED, sale
+    return sale, car.stock
+
+
+def release_reservation(reservation):
+    """Give the held units back before the hold expires."""
+    now = timezone.now()
+    with transaction.atomic():
+        _close(reservation, Reservation.RELEASED, now)
+        Car.objects.filter(pk=reservation.car_id).update(
+            reserved=F('reserved') - reservation.quantity, updated_at=now
+        )
+        bump_inventory_version()
+        cars_changed([reservation.car_id])
+    reservation.status = Reservation.RELEASED
+
+
+def release_deleted_reservation(reservation):
+    """Give back the units of a hold being deleted (in the admin, or with its customer or car)."""
+    now = timezone.now()
+    with transaction.atomic():
+        if not Reservation.objects.filter(pk=reservation.pk, status=Reservation.ACTIVE).update(
+            status=Reservation.RELEASED, updated_at=now
+        ):
+            return  # already converted, released or expired
+        Car.objects.filter(pk=reservation.car_id).update(
+            reserved=F('reserved') - reservation.quantity, updated_at=now
+        )
+        bump_inventory_version()
+        cars_changed([reservation.car_id])
+
+
+def expire_reservations(now=None, batch_size=1000):
+    """Release every active hold past its expiry, a batch at a time: one locking read,
+    one status UPDATE (one per hold without SKIP LOCKED) and one Car UPDATE per batch.
+    Returns the number expired."""
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            due = Reservation.objects.filter(status=Reservation.ACTIVE, expires_at__lte=now)
+            locked = connection.features.has_select_for_update_skip_locked
+            rows = list(
+                (due.select_for_update(skip_locked=True) if locked else due)
+                .order_by('expires_at', 'id').values_list('id', 'car_id', 'quantity')[:batch_size]
+            )
+            if not rows:
+                break
+            if locked:
+                # Rows a concurrent convert / release is working on were skipped above
+                due.filter(pk__in=[pk for pk, _, _ in rows]).update(status=Reservation.EXPIRED, updated_at=now)
+                flipped = rows
+            else:
+                # Read without a lock: a convert / release may have closed some of these
+                # holds since, so only the ones this UPDATE flips are ours to release
+                flipped = [
+                    row for row in rows
+                    if due.filter(pk=row[0]).update(status=Reservation.EXPIRED, updated_at=now)
+                ]
+            held = {}
+            for _, car_id, quantity in flipped:
+                held[car_id] = held.get(car_id, 0) + quantity
+            Car.objects.filter(pk__in=held).update(
+                reserved=F('reserved') - Case(
+                    *[When(pk=pk, then=Value(units)) for pk, units in sorted(held.items())], default=Value(0)
+                ),
+                updated_at=now,
+            )
+            bump_inventory_version()
+            cars_changed(held)
+        expired += len(flipped)
+        if len(rows) < batch_size:
+            break
+    return expired
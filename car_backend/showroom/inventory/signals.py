@@ -1,16 +1,230 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+from django.db.models.signals import pre_delete, pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import UserProfile
+from .models import UserProfile, Car, CarTombstone, Customer, CustomerSummary, Reservation, Sale
+from .caching import bump_inventory_version
+from .authentication import invalidate_token, invalidate_user_tokens
+from .search import search_backend, trigram_index
+from .counters import bump_sold_count, bump_customer_summary, bump_sales_rollups, move_brand_rollups
+from .events import car_deleted, cars_changed
+from .services import release_deleted_reservation
 
 # ❌ DO NOT automatically create UserProfile anymore
 # Creation is now handled manually in RegisterView
 
-# ✅ Save UserProfile only if it exists (optional but safe to keep)
+# ✅ Save UserProfile only if it was loaded with the user (looking it up would cost a
+# query on every user save, and a new user has no profile yet)
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    try:
-        if hasattr(instance, 'userprofile'):
-            instance.userprofile.save()
-    except UserProfile.DoesNotExist:
-        pass  # Profile might not yet be created; ignore
+def save_user_profile(sender, instance, created, **kwargs):
+    if not created and User.userprofile.related.is_cached(instance):
+        instance.userprofile.save()
+
+
+# ✅ Drop cached token authentication entries when who a token belongs to changes
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_auth_cache(sender, instance, created=False, **kwargs):
+    if not created:  # a new user has no tokens yet
+        invalidate_user_tokens(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_auth_cache(sender, instance, **kwargs):
+    invalidate_user_tokens(instance.user_id)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+# ✅ Sales counters
+# Counter updates (see counters.py) run inside the caller's transaction, so a rolled
+# back sale also rolls back its counters.
+TRACKED_SALE_FIELDS = ('car_id', 'customer_id', 'quantity', 'total_price')
+
+
+def _previous_sale(instance):
+    loaded = getattr(instance, '_loaded_values', None)
+    if not loaded or any(field not in loaded for field in TRACKED_SALE_FIELDS):
+        return None
+    return loaded
+
+
+def _car_brand(sale, car_id):
+    # Rollups are bucketed by brand; reuse the car already attached to the sale if any
+    car = Sale.car.field.get_cached_value(sale, default=None)
+    if car is not None and car.pk == car_id:
+        return car.brand
+    return Car.objects.filter(pk=car_id).values_list('brand', flat=True).first()
+
+
+@receiver(post_save, sender=Customer)
+def create_customer_summary(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        CustomerSummary.objects.get_or_create(customer=instance)
+
+
+@receiver(pre_save, sender=Sale)
+def remember_sale_before_save(sender, instance, raw=False, **kwargs):
+    # Instances that were not loaded through the ORM (or had fields deferred) need
+    # one lookup to know what the row held before this save
+    if raw or instance._state.adding or _previous_sale(instance):
+        return
+    instance._loaded_values = Sale.objects.filter(pk=instance.pk).values(*TRACKED_SALE_FIELDS).first()
+
+
+@receiver(post_save, sender=Sale)
+def track_sale_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return  # loaddata: counters are rebuilt with `manage.py rebuild_sales_counters`
+
+    spend = instance.total_price or 0
+    previous = None if created else _previous_sale(instance)
+    if previous is None:
+        bump_sold_count(instance.car_id, instance.quantity)
+        bump_customer_summary(
+            instance.customer_id, sales=1, units=instance.quantity, spend=spend,
+            purchased_at=instance.sale_date,
+        )
+    else:
+        previous_spend = previous['total_price'] or 0
+        if previous['car_id'] == instance.car_id:
+            bump_sold_count(instance.car_id, instance.quantity - previous['quantity'])
+        else:
+            bump_sold_count(previous['car_id'], -previous['quantity'])
+            bump_sold_count(instance.car_id, instance.quantity)
+
+        if previous['customer_id'] == instance.customer_id:
+            bump_customer_summary(
+                instance.customer_id,
+                units=instance.quantity - previous['quantity'],
+                spend=spend - previous_spend,
+            )
+        else:
+            bump_customer_summary(
+                previous['customer_id'], sales=-1, units=-previous['quantity'],
+                spend=-previous_spend, recompute_last_purchase=True,
+            )
+            bump_customer_summary(
+                instance.customer_id, sales=1, units=instance.quantity, spend=spend,
+                purchased_at=instance.sale_date,
+            )
+
+    brand = instance.car.brand
+    if previous is None:
+        bump_sales_rollups(
+            instance.car_id, brand, instance.customer_id, instance.sale_date, 1, instance.quantity, spend,
+        )
+    elif (previous['car_id'], previous['customer_id']) == (instance.car_id, instance.customer_id):
+        bump_sales_rollups(
+            instance.car_id, brand, instance.customer_id, instance.sale_date,
+            0, instance.quantity - previous['quantity'], spend - (previous['total_price'] or 0),
+        )
+    else:
+        bump_sales_rollups(
+            previous['car_id'], _car_brand(instance, previous['car_id']), previous['customer_id'],
+            instance.sale_date, -1, -previous['quantity'], -(previous['total_price'] or 0),
+            create_missing=False,
+        )
+        bump_sales_rollups(
+            instance.car_id, brand, instance.customer_id, instance.sale_date, 1, instance.quantity, spend,
+        )
+
+    # The saved row is the new baseline for the next update of this instance
+    instance._loaded_values = {field: getattr(instance, field) for field in TRACKED_SALE_FIELDS}
+
+
+@receiver(post_delete, sender=Sale)
+def track_sale_deleted(sender, instance, **kwargs):
+    bump_sold_count(instance.car_id, -instance.quantity)
+    # When the customer itself is being deleted its summary may already be gone
+    bump_customer_summary(
+        instance.customer_id, sales=-1, units=-instance.quantity,
+        spend=-(instance.total_price or 0), recompute_last_purchase=True,
+        create_missing=False,
+    )
+    # Never recreate rollup rows here: on a cascading car / customer delete they may
+    # already be gone, and a new row would point at the row being deleted
+    bump_sales_rollups(
+        instance.car_id, _car_brand(instance, instance.car_id), instance.customer_id,
+        instance.sale_date, -1, -instance.quantity, -(instance.total_price or 0),
+        create_missing=False,
+    )
+
+
+# ✅ Brand rollups follow a renamed car: its sales leave the old brand's buckets, so
+# later edits and deletes of them find the bucket they were counted in
+@receiver(pre_save, sender=Car)
+def remember_car_brand(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding or hasattr(instance, '_loaded_brand'):
+        return
+    if update_fields is not None and 'brand' not in update_fields:
+        return
+    # Built by hand rather than loaded: one lookup for the stored brand
+    instance._loaded_brand = Car.objects.filter(pk=instance.pk).values_list('brand', flat=True).first()
+
+
+@receiver(post_save, sender=Car)
+def move_renamed_car_rollups(sender, instance, created, raw=False, **kwargs):
+    old_brand = getattr(instance, '_loaded_brand', None)
+    if not (created or raw) and old_brand is not None and old_brand != instance.brand:
+        with transaction.atomic():
+            move_brand_rollups(instance.pk, old_brand, instance.brand)
+    instance._loaded_brand = instance.brand
+
+
+# ✅ Cached read models (statistics snapshot, facets, car list responses) are keyed on
+# the inventory version
+@receiver(post_save, sender=Car)
+@receiver(post_delete, sender=Car)
+@receiver(post_save, sender=Sale)
+@receiver(post_delete, sender=Sale)
+def invalidate_inventory_caches(sender, **kwargs):
+    bump_inventory_version()
+
+
+# ✅ Keep the portable trigram search index current (MySQL uses its FULLTEXT index)
+@receiver(post_save, sender=Car)
+def index_car_for_search(sender, instance, raw=False, **kwargs):
+    if raw or search_backend() != 'trigram':
+        return
+    car_id, brand, model = instance.pk, instance.brand, instance.model
+    transaction.on_commit(lambda: trigram_index.update(car_id, brand, model))
+
+
+@receiver(post_delete, sender=Car)
+def unindex_car_for_search(sender, instance, **kwargs):
+    if search_backend() != 'trigram':
+        return
+    car_id = instance.pk
+    transaction.on_commit(lambda: trigram_index.remove(car_id))
+
+
+# ✅ Delta sync: clients syncing with a cursor learn which cars to drop (see sync.py)
+@receiver(post_delete, sender=Car)
+def record_car_tombstone(sender, instance, **kwargs):
+    CarTombstone.objects.create(car_id=instance.pk)
+
+
+# ✅ Live stock events (see events.py)
+@receiver(post_save, sender=Car)
+def publish_car_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        cars_changed([instance.pk])
+
+
+@receiver(post_delete, sender=Car)
+def publish_car_deleted(sender, instance, **kwargs):
+    car_deleted(instance.pk)
+
+
+# ✅ A deleted hold gives its units back: deleting a customer or a car cascades to
+# their reservations, and reservations can be deleted in the admin
+@receiver(pre_delete, sender=Reservation)
+def release_deleted_hold(sender, instance, **kwargs):
+    if instance.status == Reservation.ACTIVE:
+        release_deleted_reservation(instance)
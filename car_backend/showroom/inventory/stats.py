@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from showroom.db.routers import read_model_timeout, read_source
+
+from .caching import aget_inventory_version, get_inventory_version
+from .models import Car
+
+STATS_CACHE_TIMEOUT = getattr(settings, 'INVENTORY_STATS_CACHE_TIMEOUT', 300)
+
+
+# ✅ Inventory statistics snapshot
+# One grouped query per brand yields everything: the global figures are sums of the
+# per-brand rows ((brand, model) pairs are unique per brand, so distinct models add up).
+def _brand_rows():
+    return (
+        Car.objects.order_by()
+        .values('brand')
+        .annotate(
+            cars=Count('id'),
+            price_sum=Sum('price'),
+            stock=Sum('stock'),
+            models=Count('model', distinct=True),
+        )
+        .order_by('brand')
+    )
+
+
+def compute_inventory_stats():
+    return _summarize(_brand_rows())
+
+
+async def acompute_inventory_stats():
+    return _summarize([row async for row in _brand_rows()])
+
+
+def _summarize(rows):
+    brands = []
+    total_cars = total_stock = unique_models = 0
+    total_price = Decimal('0')
+    for row in rows:
+        total_cars += row['cars']
+        total_price += row['price_sum'] or 0
+        total_stock += row['stock'] or 0
+        unique_models += row['models']
+        brands.append({
+            'brand': row['brand'],
+            'total_cars': row['cars'],
+            'average_price': _average(row['price_sum'], row['cars']),
+            'total_stock': row['stock'] or 0,
+            'unique_models': row['models'],
+        })
+
+    return {
+        'total_cars': total_cars,
+        'average_price': _average(total_price, total_cars),
+        'total_stock': total_stock if total_cars else None,
+        'unique_models': unique_models,
+        'brands': brands,
+    }
+
+
+def _average(total, count):
+    if not count:
+        return None
+    return (Decimal(total) / count).quantize(Decimal('0.01'))
+
+
+def get_inventory_stats():
+    key = f'inventory:stats:{get_inventory_version()}:{read_source()}'
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_inventory_stats()
+        cache.set(key, stats, read_model_timeout(STATS_CACHE_TIMEOUT))
+    return stats
+
+
+async def aget_inventory_stats():
+    key = f'inventory:stats:{await aget_inventory_version()}:{read_source()}'
+    stats = await cache.aget(key)
+    if stats is None:
+        stats = await acompute_inventory_stats()
+        await cache.aset(key, stats, read_model_timeout(STATS_CACHE_TIMEOUT))
+    return stats
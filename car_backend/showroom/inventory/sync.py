@@ -0,0 +1,100 @@
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from showroom.db.routers import replica_reads
+
+from .models import Car, CarTombstone
+
+SYNC_SETTINGS = {
+    # A change is only handed out once it is this old. updated_at is stamped when a
+    # transaction writes the row but becomes visible when it commits, so a cursor must
+    # never pass a timestamp that a transaction still in flight may carry.
+    'SETTLE_SECONDS': 5,
+    # Tombstones are kept this long; an older cursor may have missed deletions
+    'TOMBSTONE_DAYS': 30,
+    'PAGE_SIZE': 200,
+    'MAX_PAGE_SIZE': 1000,
+    **getattr(settings, 'CAR_SYNC', {}),
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class CursorExpired(Exception):
+    """The cursor is older than the kept tombstones: the client has to sync from scratch."""
+
+
+# ✅ Cursors: the (timestamp, car id) of the last change a client has seen, opaque to it
+def encode_cursor(position):
+    moment, pk = position
+    raw = f'{(moment - EPOCH) // MICROSECOND}:{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Raises ValueError for anything encode_cursor() did not produce."""
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    micros, pk = raw.split(':')
+    return EPOCH + int(micros) * MICROSECOND, int(pk)
+
+
+def _after(queryset, field, id_field, position):
+    if position is None:
+        return queryset
+    moment, pk = position
+    # Rows sharing a timestamp are ordered by id, so none is skipped or repeated across
+    # pages; the >= bound gives the (timestamp, id) index its range start
+    return queryset.filter(**{f'{field}__gte': moment}).filter(
+        Q(**{f'{field}__gt': moment}) | Q(**{field: moment, f'{id_field}__gt': pk})
+    )
+
+
+# ✅ Delta sync
+# Cars and tombstones are read in (timestamp, id) order from the same position and
+# merged, each with one index range scan. Without a position the client has nothing
+# to delete yet, so a full sync is the cars alone.
+def car_changes(position=None, limit=None):
+    """Cars created or changed, and ids of cars deleted, after ``position``.
+
+    Returns ``(cars, deleted_ids, next_position, has_more)``. Raises CursorExpired when
+    ``position`` is older than the tombstones kept.
+    """
+    limit = limit or SYNC_SETTINGS['PAGE_SIZE']
+    now = timezone.now()
+    if position is not None and position[0] < now - timedelta(days=SYNC_SETTINGS['TOMBSTONE_DAYS']):
+        raise CursorExpired
+    horizon = now - timedelta(seconds=SYNC_SETTINGS['SETTLE_SECONDS'])
+
+    # Always the primary: a lagging replica would move the cursor past rows it lacks
+    with replica_reads(False):
+        cars = _after(Car.objects.filter(updated_at__lte=horizon), 'updated_at', 'id', position)
+        events = [((car.updated_at, car.pk), car) for car in cars.order_by('updated_at', 'id')[:limit + 1]]
+        if position is not None:
+            tombstones = _after(CarTombstone.objects.filter(deleted_at__lte=horizon), 'deleted_at', 'car_id', position)
+            events += [
+                (key, None)
+                for key in tombstones.order_by('deleted_at', 'car_id').values_list('deleted_at', 'car_id')[:limit + 1]
+            ]
+    events.sort(key=lambda event: event[0])
+
+    has_more = len(events) > limit
+    events = events[:limit]
+    if has_more or (events and events[-1][0][0] == horizon):
+        next_position = events[-1][0]
+    else:
+        # Everything up to the horizon has been seen: move the cursor there, so clients
+        # of a quiet catalog do not age out of the tombstone window
+        next_position = (horizon, 0)
+    cars = [car for _, car in events if car is not None]
+    deleted = [pk for (_, pk), car in events if car is None]
+    return cars, deleted, next_position, has_more
+
+
+def prune_tombstones(now=None):
+    cutoff = (now or timezone.now()) - timedelta(days=SYNC_SETTINGS['TOMBSTONE_DAYS'])
+    deleted, _ = CarTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
@@ -1,3 +1,1440 @@
-from django.test import TestCase
+import base64
+import json
+import re
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, router, transaction
+from django.db.models import F
+from django.http import HttpResponse, QueryDict
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from showroom.db.pool import ConnectionPool, PoolTimeout
+from showroom.db.routers import ReplicaRoutingMiddleware, replica_reads
+
+from .analytics import sales_analytics
+from .authentication import token_cache
+from .benchmarking import SCENARIOS, Fixture, inventory_route_names, run_scenario
+from .caching import get_inventory_version
+from .facets import facet_cache_key
+from .importers import CarImporter
+from .metrics import METRICS_SETTINGS, registry as metrics_registry
+from .models import (
+    Car, CarTombstone, Customer, CustomerSummary, DailyCarSales, MonthlyBrandSales, MonthlyCustomerSales, Reservation, Sale,
+    UserProfile,
+)
+from .provisioning import ROLE_FLAGS, provision_users
+from .querycheck import QueryInspector, fingerprint, query_budget
+from .search import SEARCH_SETTINGS, SEARCH_VERSION_KEY, TrigramIndex, trigram_index
+from .serializers import CarSerializer, SaleSerializer
+from .services import (
+    InsufficientStock, ReservationUnavailable, commit_bulk_sales, commit_sale, convert_reservation,
+    expire_reservations, release_reservation, reserve_stock,
+)
+from .sync import SYNC_SETTINGS, encode_cursor
+from .throttling import RATE_LIMIT_SETTINGS, rate_limits_bypassed
+
+# ✅ Query budgets: the most SQL statements each route may run on a cold cache.
+# Raising one is a deliberate, reviewed change; an N+1 shows up as a failure here.
+QUERY_BUDGETS = {
+    'car-list-create': 4,
+    'car-detail': 3,
+    'car-list-cache-stats': 1,
+    'car-facets': 4,
+    'car-changes': 3,
+    'car-import': 5,
+    'car-statistics': 2,
+    'average-price': 2,
+    'expensive-cars': 2,
+    'low-stock-cars': 2,
+    'register': 7,
+    'login': 4,
+    'logout': 2,
+    'user-bulk-create': 7,
+    'sale-list-create': 3,
+    'sale-bulk-create': 12,
+    'sale-feed': 2,
+    'sales-analytics': 3,
+    'sale-detail': 2,
+    'async-car-list': 4,
+    'async-car-detail': 2,
+    'async-car-statistics': 2,
+    'async-car-stream': 1,
+    'async-sale-list': 3,
+    'reservation-list-create': 3,
+    'reservation-detail': 2,
+    'reservation-convert': 15,
+    'reservation-release': 6,
+    'customer-list-create': 3,
+    'customer-detail': 3,
+    'db-pool-stats': 1,
+    'metrics': 1,
+    'assign-role': 3,
+}
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cars = [
+            Car.objects.create(brand=f'Brand {n % 3}', model=f'Model {n}', year=2020, price=100000 + n, stock=50)
+            for n in range(12)
+        ]
+        customers = [
+            Customer.objects.create(cust_id=n, name=f'Customer {n}', phone=f'555-{n}', address='-')
+            for n in range(1, 4)
+        ]
+        # Enough rows for several pages, so per-row queries cannot hide
+        for n in range(30):
+            Sale.objects.create(car=cars[n % 12], customer=customers[n % 3], quantity=1, total_price=cars[n % 12].price)
+        cls.car, cls.customer, cls.sale = cars[0], customers[0], Sale.objects.latest('pk')
+
+    def _cold(self):
+        for alias_cache in caches.all():
+            alias_cache.clear()
+        token_cache.clear()
+
+    def test_every_route_has_a_budget(self):
+        self.assertEqual(sorted(inventory_route_names()), sorted(QUERY_BUDGETS))
+        self.assertEqual(sorted(SCENARIOS), sorted(QUERY_BUDGETS))
+
+    def test_routes_stay_within_budget(self):
+        fixture = Fixture(self.car, self.customer, self.sale)
+        client = Client(HTTP_HOST='localhost')
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(route=name):
+                self._cold()
+                inspector = QueryInspector()
+                _, response, _ = run_scenario(client, name, fixture, inspector)
+                self.assertLess(response.status_code, 400, name)
+                self.assertLessEqual(inspector.count, budget, inspector.report(name))
+                self.assertEqual(inspector.repeated(), [], inspector.report(name))
+
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.client = token_client('reader', 'customer')
+        self.car = Car.objects.create(brand='B', model='M', year=2020, price=100, stock=5)
+
+    def test_not_modified_costs_one_query(self):
+        for path in ('/api/cars/', f'/api/cars/{self.car.pk}/'):
+            with self.subTest(path=path), rate_limits_bypassed():
+                etag = self.client.get(path)['ETag']  # also caches the token
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(len(queries), 1, [query['sql'] for query in queries])
+
+    def test_a_changed_car_gets_a_new_etag(self):
+        path = f'/api/cars/{self.car.pk}/'
+        with rate_limits_bypassed():
+            etag = self.client.get(path)['ETag']
+            Car.objects.filter(pk=self.car.pk).update(stock=4, updated_at=timezone.now() + timedelta(seconds=1))
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        for alias in ('default', 'responses'):
+            caches[alias].clear()
+        self.client = token_client('lister', 'customer')
+        self.car = Car.objects.create(brand='B', model='M', year=2020, price=100, stock=5)
+
+    def _list(self):
+        with rate_limits_bypassed():
+            return self.client.get('/api/cars/', {'page_size': 5})
+
+    def test_a_car_change_is_a_miss(self):
+        self.assertEqual(self._list()['X-Cache'], 'MISS')
+        self.assertEqual(self._list()['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            car = Car.objects.get(pk=self.car.pk)
+            car.price = 120
+            car.save()
+        response = self._list()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['price'], '120.00')
+        self.assertEqual(self._list()['X-Cache'], 'HIT')
+
+    def test_a_sale_is_a_miss(self):
+        self._list()
+        with self.captureOnCommitCallbacks(execute=True):
+            commit_sale(self.car, Customer.objects.create(cust_id=1, name='C', phone='1', address='-'), 2)
+        response = self._list()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['stock'], 3)
+
+
+class CarStatisticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = token_client('analyst', 'customer')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.corolla = Car.objects.create(brand='Toyota', model='Corolla', year=2020, price=Decimal('100.00'), stock=3)
+            Car.objects.create(brand='Toyota', model='Corolla', year=2021, price=Decimal('200.02'), stock=4)
+            Car.objects.create(brand='Honda', model='Civic', year=2020, price=Decimal('50.00'), stock=1)
+
+    def _stats(self):
+        with rate_limits_bypassed():
+            return self.client.get('/api/cars/statistics/').json()
+
+    def test_totals_and_per_brand_breakdown(self):
+        self.assertEqual(self._stats(), {
+            'total_cars': 3,
+            'average_price': 116.67,  # 350.02 / 3, rounded to cents
+            'total_stock': 8,
+            'unique_models': 2,
+            'brands': [
+                {'brand': 'Honda', 'total_cars': 1, 'average_price': 50.0, 'total_stock': 1, 'unique_models': 1},
+                {'brand': 'Toyota', 'total_cars': 2, 'average_price': 150.01, 'total_stock': 7, 'unique_models': 1},
+            ],
+        })
+
+    def test_an_empty_inventory_has_no_average(self):
+        Car.objects.all().delete()
+        cache.clear()
+        stats = self._stats()
+        self.assertEqual((stats['total_cars'], stats['average_price'], stats['brands']), (0, None, []))
+        with rate_limits_bypassed():
+            self.assertEqual(self.client.get('/api/cars/average-price/').status_code, 404)
+
+    def test_car_and_sale_writes_replace_the_snapshot(self):
+        self.assertEqual(self._stats()['total_stock'], 8)
+        # A write that skips the signals is not seen: the snapshot is served from the cache
+        Car.objects.filter(pk=self.corolla.pk).update(stock=30)
+        self.assertEqual(self._stats()['total_stock'], 8)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Car.objects.create(brand='Honda', model='Jazz', year=2020, price=Decimal('60.00'), stock=2)
+        stats = self._stats()
+        self.assertEqual((stats['total_cars'], stats['total_stock'], stats['unique_models']), (4, 37, 3))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            commit_sale(self.corolla, Customer.objects.create(cust_id=1, name='C', phone='1', address='-'), 5)
+        self.assertEqual(self._stats()['total_stock'], 32)
+
+
+class CarFacetsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = token_client('shopper', 'customer')
+        with self.captureOnCommitCallbacks(execute=True):
+            Car.objects.create(brand='Toyota', model='Corolla', year=2020, price=100000, stock=3)
+            Car.objects.create(brand='Toyota', model='Camry', year=2021, price=700000, stock=10)
+            Car.objects.create(brand='Honda', model='Civic', year=2021, price=1500000, stock=0)
+
+    def _facets(self, params=None):
+        with rate_limits_bypassed():
+            response = self.client.get('/api/cars/facets/', params or {})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return {
+            'total': data['total'],
+            'brands': {row['value']: row['count'] for row in data['brands']},
+            'years': {row['value']: row['count'] for row in data['years']},
+            'price': {row['label']: row['count'] for row in data['price_bands'] if row['count']},
+            'stock': {row['label']: row['count'] for row in data['stock_buckets'] if row['count']},
+        }
+
+    def test_a_facet_is_not_narrowed_by_its_own_filter(self):
+        facets = self._facets({'brand': 'Toyota'})
+        self.assertEqual(facets['total'], 2)
+        self.assertEqual(facets['brands'], {'Toyota': 2, 'Honda': 1})
+        self.assertEqual(facets['years'], {2020: 1, 2021: 1})
+        self.assertEqual(facets['price'], {'under-500k': 1, '500k-1m': 1})
+
+        facets = self._facets({'price__gte': 500000, 'stock__gte': 1})
+        self.assertEqual(facets['total'], 1)
+        self.assertEqual(facets['brands'], {'Toyota': 1})
+        # Price bands apply the stock filter only, stock buckets the price filter only
+        self.assertEqual(facets['price'], {'under-500k': 1, '500k-1m': 1})
+        self.assertEqual(facets['stock'], {'out-of-stock': 1, 'medium': 1})
+
+    def test_equivalent_query_strings_share_a_cache_key(self):
+        key = facet_cache_key(QueryDict('brand=Toyota&year=2021'))
+        self.assertEqual(facet_cache_key(QueryDict('year=2021&brand=+Toyota+&page=3&search=')), key)
+        self.assertNotEqual(facet_cache_key(QueryDict('brand=Honda&year=2021')), key)
+
+    def test_a_car_write_invalidates_the_cached_facets(self):
+        self.assertEqual(self._facets()['brands'], {'Toyota': 2, 'Honda': 1})
+        Car.objects.filter(brand='Honda').update(brand='Acura')  # no signals: still cached
+        self.assertEqual(self._facets()['brands'], {'Toyota': 2, 'Honda': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Car.objects.create(brand='Honda', model='Jazz', year=2022, price=90000, stock=1)
+        facets = self._facets()
+        self.assertEqual(facets['brands'], {'Toyota': 2, 'Acura': 1, 'Honda': 1})
+        self.assertEqual(facets['years'], {2020: 1, 2021: 2, 2022: 1})
+
+
+class AsyncViewParityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['responses'].clear()
+        self.client = token_client('parity', 'customer')
+        cars = [
+            Car.objects.create(brand='Toyota' if n % 2 else 'Honda', model=f'Model {n}', year=2018 + n % 4,
+                               price=100000 + n * 1000, stock=n)
+            for n in range(8)
+        ]
+        self.customers = [Customer.objects.create(cust_id=n, name=f'C{n}', phone=str(n), address='-') for n in (1, 2)]
+        for n in range(7):
+            Sale.objects.create(car=cars[n], customer=self.customers[n % 2], quantity=1, total_price=cars[n].price)
+        self.car = cars[0]
+
+    def _both(self, path, params=None, client=None, **extra):
+        responses = []
+        for prefix in ('/api/', '/api/async/'):
+            with rate_limits_bypassed():
+                responses.append((client or self.client).get(prefix + path, params or {}, **extra))
+        return responses
+
+    def assertSameResponse(self, drf, native):
+        self.assertEqual(native.status_code, drf.status_code)
+        # Pagination links differ only by the /async prefix
+        self.assertEqual(json.loads(native.content.decode().replace('/api/async/', '/api/')), drf.json())
+        for header in ('WWW-Authenticate', 'Retry-After'):
+            self.assertEqual(native.get(header), drf.get(header), header)
+        # List ETags include the path, so only their presence can match
+        self.assertEqual(native.has_header('ETag'), drf.has_header('ETag'))
+
+    def test_car_list(self):
+        for params in (
+            {}, {'page': 2}, {'page_size': 3, 'page': 'last'}, {'brand': 'Toyota', 'ordering': '-price'},
+            {'search': 'toyota', 'year__gte': 2020}, {'year__gte': 'soon'}, {'page': 99},
+        ):
+            with self.subTest(params=params):
+                self.assertSameResponse(*self._both('cars/', params))
+
+    def test_car_detail(self):
+        drf, native = self._both(f'cars/{self.car.pk}/')
+        self.assertSameResponse(drf, native)
+        self.assertEqual(native['ETag'], drf['ETag'])
+        self.assertSameResponse(*self._both('cars/999999/'))
+
+    def test_sale_list(self):
+        customer = self.customers[1].pk
+        for params in ({}, {'page': 2}, {'customer': customer}, {'customer': customer, 'page': 2}):
+            with self.subTest(params=params):
+                self.assertSameResponse(*self._both('sales/', params))
+
+    def test_authentication_failures(self):
+        anonymous = Client(HTTP_HOST='localhost')
+        for client in (anonymous, Client(HTTP_HOST='localhost', HTTP_AUTHORIZATION='Token nope')):
+            for path in ('cars/', f'cars/{self.car.pk}/', 'sales/'):
+                with self.subTest(path=path, client=client):
+                    drf, native = self._both(path, client=client)
+                    self.assertEqual(drf.status_code, 401)
+                    self.assertSameResponse(drf, native)
+
+    def test_throttling(self):
+        caches[RATE_LIMIT_SETTINGS['CACHE']].clear()
+        with mock.patch.dict(RATE_LIMIT_SETTINGS['RATES'], customer='1/min'):
+            for path in ('cars/', f'cars/{self.car.pk}/', 'sales/'):
+                with self.subTest(path=path):
+                    responses = []
+                    for prefix in ('/api/', '/api/async/'):
+                        self.client.get(prefix + path)
+                        responses.append(self.client.get(prefix + path))
+                    self.assertEqual(responses[0].status_code, 429)
+                    self.assertSameResponse(*responses)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        metrics_registry.reset()
+        caches[RATE_LIMIT_SETTINGS['CACHE']].clear()
+        self.admin = token_client('operator', 'admin')
+        self.client = token_client('visitor', 'customer')
+
+    def _scrape(self):
+        response = self.admin.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode().splitlines()
+
+    def test_requests_are_counted_and_timed_per_view(self):
+        self.client.get('/api/cars/')
+        self.client.get('/api/cars/')
+        self.client.get('/api/cars/999999/')
+        lines = self._scrape()
+
+        self.assertIn('showroom_http_requests_total{view="car-list-create",method="GET",status="200"} 2', lines)
+        self.assertIn('showroom_http_requests_total{view="car-detail",method="GET",status="404"} 1', lines)
+        for name in (
+            'showroom_http_request_duration_seconds', 'showroom_db_queries_per_request',
+            'showroom_http_response_size_bytes',
+        ):
+            with self.subTest(histogram=name):
+                self.assertIn(f'# TYPE {name} histogram', lines)
+                self.assertIn(f'{name}_bucket{{view="car-list-create",le="+Inf"}} 2', lines)
+                self.assertIn(f'{name}_count{{view="car-list-create"}} 2', lines)
+                buckets = [
+                    int(line.rsplit(' ', 1)[1]) for line in lines
+                    if line.startswith(f'{name}_bucket{{view="car-list-create",')
+                ]
+                self.assertEqual(buckets, sorted(buckets))  # cumulative
+        sql_time = 'showroom_db_query_seconds_total{view="car-list-create"}'
+        self.assertTrue(any(line.startswith(sql_time) for line in lines))
+
+    def test_unsampled_requests_are_only_counted(self):
+        with mock.patch.dict(METRICS_SETTINGS, SAMPLE_RATE=0):
+            self.client.get('/api/cars/')
+        lines = self._scrape()
+        self.assertIn('showroom_http_requests_total{view="car-list-create",method="GET",status="200"} 1', lines)
+        timed = 'showroom_http_request_duration_seconds_count{view="car-list-create"}'
+        self.assertFalse(any(line.startswith(timed) for line in lines))
+
+    def test_rate_limited_requests_are_counted_by_role(self):
+        with mock.patch.dict(RATE_LIMIT_SETTINGS['RATES'], customer='1/min'):
+            self.client.get('/api/cars/')
+            self.assertEqual(self.client.get('/api/cars/').status_code, 429)
+        lines = self._scrape()
+        self.assertIn('showroom_http_requests_total{view="car-list-create",method="GET",status="429"} 1', lines)
+        self.assertTrue(any(
+            re.fullmatch(r'showroom_rate_limited_total\{scope="[^"]+",role="customer"\} 1', line) for line in lines
+        ))
+
+    def test_only_admins_can_scrape(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        self.assertEqual(token_client('clerk', 'staff').get('/api/metrics/').status_code, 403)
+        self.assertEqual(Client(HTTP_HOST='localhost').get('/api/metrics/').status_code, 401)
+
+
+class QueryInspectorTests(TestCase):
+    def test_fingerprint_folds_literals_and_in_lists(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            fingerprint("SELECT * FROM t WHERE id IN (%s) AND name = 'y'  LIMIT 5"),
+        )
+
+    def test_reports_the_serializer_field_behind_an_n_plus_one(self):
+        car = Car.objects.create(brand='B', model='M', year=2020, price=1, stock=10)
+        customer = Customer.objects.create(cust_id=1, name='C', phone='1', address='-')
+        for _ in range(5):
+            Sale.objects.create(car=car, customer=customer, quantity=1)
+
+        with self.assertRaises(AssertionError) as failure:
+            with query_budget(threshold=3):
+                SaleSerializer(Sale.objects.all(), many=True).data
+        self.assertIn('SaleSerializer.car_model', str(failure.exception))
+        self.assertIn('SaleSerializer.customer_name', str(failure.exception))
+
+        with query_budget(max_queries=1, threshold=3):
+            SaleSerializer(Sale.objects.select_related('car', 'customer'), many=True).data
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        caches[RATE_LIMIT_SETTINGS['CACHE']].clear()
+
+    def test_login_attempts_are_limited_per_client(self):
+        client = Client(HTTP_HOST='localhost')
+        capacity = int(RATE_LIMIT_SETTINGS['SCOPES']['login']['anon'].split('/')[0])
+        for _ in range(capacity):
+            response = client.post('/api/login/', {'username': 'nobody', 'password': 'x'}, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+
+        response = client.post('/api/login/', {'username': 'nobody', 'password': 'x'}, content_type='application/json')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+        # Another address has its own bucket
+        response = client.post(
+            '/api/login/', {'username': 'nobody', 'password': 'x'}, content_type='application/json',
+            REMOTE_ADDR='10.0.0.2',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.honda = Car.objects.create(brand='Honda', model='Civic', year=2020, price=100, stock=50)
+        self.toyota = Car.objects.create(brand='Toyota', model='Corolla', year=2020, price=200, stock=50)
+        self.customer = Customer.objects.create(cust_id=1, name='C', phone='1', address='-')
+
+    def _sell(self, car, quantity):
+        return Sale.objects.create(car=car, customer=self.customer, quantity=quantity, total_price=car.price * quantity)
+
+    def _brands(self):
+        return {
+            row.brand: (row.sales_count, row.units, row.revenue) for row in MonthlyBrandSales.objects.all()
+        }
+
+    def _cars(self):
+        return {row.car_id: (row.sales_count, row.units) for row in DailyCarSales.objects.all()}
+
+    def _customers(self):
+        return {row.customer_id: (row.sales_count, row.units) for row in MonthlyCustomerSales.objects.all()}
+
+    def assertMatchesRebuild(self):
+        maintained = (self._brands(), self._cars(), self._customers())
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        self.assertEqual(maintained, (self._brands(), self._cars(), self._customers()))
+
+    def test_create(self):
+        self._sell(self.honda, 3)
+        self._sell(self.honda, 1)
+        self.assertEqual(self._brands(), {'Honda': (2, 4, 400)})
+        self.assertEqual(self._cars(), {self.honda.pk: (2, 4)})
+        self.assertEqual(self._customers(), {self.customer.pk: (2, 4)})
+        self.assertMatchesRebuild()
+
+    def test_quantity_update(self):
+        sale = self._sell(self.honda, 3)
+        sale.quantity, sale.total_price = 5, 500
+        sale.save()
+        self.assertEqual(self._brands(), {'Honda': (1, 5, 500)})
+        self.assertMatchesRebuild()
+
+    def test_move_to_another_car(self):
+        sale = self._sell(self.honda, 3)
+        sale.car, sale.total_price = self.toyota, 600
+        sale.save()
+        self.assertEqual(self._brands(), {'Toyota': (1, 3, 600)})
+        self.assertEqual(self._cars(), {self.toyota.pk: (1, 3)})
+        self.assertMatchesRebuild()
+
+    def test_delete(self):
+        sale = self._sell(self.honda, 3)
+        sale.delete()
+        self.assertEqual((self._brands(), self._cars(), self._customers()), ({}, {}, {}))
+
+    def test_brand_rename_moves_the_car_sales(self):
+        sale = self._sell(self.honda, 3)
+        self._sell(self.toyota, 1)
+        self.honda.brand = 'Acura'
+        self.honda.save()
+        self.assertEqual(self._brands(), {'Acura': (1, 3, 300), 'Toyota': (1, 1, 200)})
+        self.assertMatchesRebuild()
+
+        # Later writes find the bucket the sale is counted in
+        Sale.objects.get(pk=sale.pk).delete()
+        self.assertEqual(self._brands(), {'Toyota': (1, 1, 200)})
+
+    def test_brand_rename_of_a_car_loaded_without_its_brand(self):
+        self._sell(self.honda, 2)
+        car = Car.objects.only('model').get(pk=self.honda.pk)
+        car.brand = 'Acura'
+        car.save()
+        self.assertEqual(self._brands(), {'Acura': (1, 2, 200)})
+
+    def test_rebuild_replaces_drifted_rollups(self):
+        self._sell(self.honda, 3)
+        MonthlyBrandSales.objects.update(units=99)
+        DailyCarSales.objects.all().delete()
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        self.assertEqual(self._brands(), {'Honda': (1, 3, 300)})
+        self.assertEqual(self._cars(), {self.honda.pk: (1, 3)})
+
+    def test_rebuild_goes_a_month_at_a_time(self):
+        january = self._sell(self.honda, 3)
+        march = self._sell(self.toyota, 1)
+        Sale.objects.filter(pk=january.pk).update(sale_date=timezone.make_aware(datetime(2024, 1, 31, 23, 59)))
+        Sale.objects.filter(pk=march.pk).update(sale_date=timezone.make_aware(datetime(2024, 3, 1)))
+        for model in (DailyCarSales, MonthlyBrandSales, MonthlyCustomerSales):
+            model.objects.all().delete()  # still bucketed under the day the sales were made
+        # A stale bucket in a month without sales
+        MonthlyBrandSales.objects.create(month=date(2024, 2, 1), brand='Honda', sales_count=1, units=1, revenue=1)
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command('rebuild_sales_rollups', stdout=StringIO())
+        self.assertEqual(
+            {(row.month, row.brand): row.units for row in MonthlyBrandSales.objects.all()},
+            {(date(2024, 1, 1), 'Honda'): 3, (date(2024, 3, 1), 'Toyota'): 1},
+        )
+        self.assertEqual(
+            {(row.date, row.car_id) for row in DailyCarSales.objects.all()},
+            {(date(2024, 1, 31), self.honda.pk), (date(2024, 3, 1), self.toyota.pk)},
+        )
+        # Each month, January to March, replaces only its own rows
+        deletes = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 3 * 3)
+        self.assertTrue(all('WHERE' in sql for sql in deletes))
+
+    def test_analytics_render_money_as_decimal_strings(self):
+        self._sell(self.honda, 3)
+        data, errors = sales_analytics(QueryDict('group_by=brand'))
+        self.assertIsNone(errors)
+        self.assertEqual(data['totals'], {'sales_count': 1, 'units': 3, 'revenue': '300.00'})
+        self.assertEqual(data['results'], [{'brand': 'Honda', 'sales_count': 1, 'units': 3, 'revenue': '300.00'}])
+
+
+class ReservationTests(TestCase):
+    def setUp(self):
+        self.car = Car.objects.create(brand='Honda', model='Civic', year=2020, price=100, stock=10)
+        self.customer = Customer.objects.create(cust_id=1, name='C', phone='1', address='-')
+
+    def _car(self):
+        return Car.objects.values('stock', 'reserved', 'sold_count').get(pk=self.car.pk)
+
+    def test_reserve_holds_units(self):
+        reserve_stock(self.car, self.customer, 7, ttl=60)
+        self.assertEqual(self._car(), {'stock': 10, 'reserved': 7, 'sold_count': 0})
+        with self.assertRaises(InsufficientStock):
+            reserve_stock(self.car, self.customer, 4, ttl=60)
+        with self.assertRaises(InsufficientStock):
+            commit_sale(self.car, self.customer, 4)
+
+    def test_convert_sells_the_held_units_once(self):
+        reservation = reserve_stock(self.car, self.customer, 3, ttl=60)
+        sale, remaining = convert_reservation(reservation)
+        self.assertEqual((sale.quantity, remaining), (3, 7))
+        self.assertEqual(self._car(), {'stock': 7, 'reserved': 0, 'sold_count': 3})
+        with self.assertRaises(ReservationUnavailable):
+            convert_reservation(reservation)
+        with self.assertRaises(ReservationUnavailable):
+            release_reservation(reservation)
+
+    def test_release_returns_the_units(self):
+        reservation = reserve_stock(self.car, self.customer, 3, ttl=60)
+        release_reservation(reservation)
+        self.assertEqual(self._car(), {'stock': 10, 'reserved': 0, 'sold_count': 0})
+        self.assertEqual(Reservation.objects.get(pk=reservation.pk).status, Reservation.RELEASED)
+
+    def test_expired_holds_are_swept_and_cannot_be_converted(self):
+        expired = [reserve_stock(self.car, self.customer, 2, ttl=60) for _ in range(3)]
+        live = reserve_stock(self.car, self.customer, 1, ttl=60)
+        Reservation.objects.filter(pk__in=[r.pk for r in expired]).update(expires_at=timezone.now() - timedelta(seconds=1))
+        with self.assertRaises(ReservationUnavailable):
+            convert_reservation(expired[0])
+
+        self.assertEqual(expire_reservations(batch_size=2), 3)
+        self.assertEqual(self._car()['reserved'], 1)
+        self.assertEqual(Reservation.objects.get(pk=live.pk).status, Reservation.ACTIVE)
+
+    def test_deleting_a_customer_gives_their_held_units_back(self):
+        reserve_stock(self.car, self.customer, 3, ttl=60)
+        self.customer.delete()
+        self.assertFalse(Reservation.objects.exists())
+        self.assertEqual(self._car()['reserved'], 0)
+
+    def test_deleting_a_hold_gives_its_units_back_once(self):
+        active = reserve_stock(self.car, self.customer, 3, ttl=60)
+        converted = reserve_stock(self.car, self.customer, 2, ttl=60)
+        convert_reservation(converted)
+        Reservation.objects.get(pk=converted.pk).delete()
+        self.assertEqual(self._car(), {'stock': 8, 'reserved': 3, 'sold_count': 2})
+        Reservation.objects.get(pk=active.pk).delete()
+        self.assertEqual(self._car(), {'stock': 8, 'reserved': 0, 'sold_count': 2})
+
+    def test_expiry_leaves_holds_closed_since_it_read_them(self):
+        reservations = [reserve_stock(self.car, self.customer, 2, ttl=60) for _ in range(2)]
+        Reservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        released = []
+
+        def release_after_the_read(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            if not released and sql.startswith('SELECT') and 'inventory_reservation' in sql:
+                # Committed by another request between the sweeper's read and its UPDATE
+                released.append(True)
+                Reservation.objects.filter(pk=reservations[0].pk).update(status=Reservation.RELEASED)
+                Car.objects.filter(pk=self.car.pk).update(reserved=F('reserved') - 2)
+            return result
+
+        with connection.execute_wrapper(release_after_the_read):
+            self.assertEqual(expire_reservations(), 1)
+        self.assertEqual(self._car()['reserved'], 0)
+        self.assertEqual(
+            list(Reservation.objects.order_by('pk').values_list('status', flat=True)),
+            [Reservation.RELEASED, Reservation.EXPIRED],
+        )
+
+    def test_stock_edit_below_the_held_units_is_a_400(self):
+        reserve_stock(self.car, self.customer, 7, ttl=60)
+        serializer = CarSerializer(Car.objects.get(pk=self.car.pk), data={'stock': 5}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        with self.assertRaises(ValidationError) as failure:
+            serializer.save()
+        self.assertIn('stock', failure.exception.detail)
+        self.assertEqual(self._car()['stock'], 10)
+
+    def test_import_cannot_drop_stock_below_the_held_units(self):
+        other = Car.objects.create(brand='Honda', model='Jazz', year=2020, price=100, stock=10)
+        reserve_stock(self.car, self.customer, 7, ttl=60)
+        rows = [(2, {'brand': 'Honda', 'model': 'Civic', 'year': 2020, 'price': '100.00', 'stock': 5}),
+                (3, {'brand': 'Honda', 'model': 'Jazz', 'year': 2020, 'price': '100.00', 'stock': 5})]
+        events = list(CarImporter().run(iter(rows)))
+        self.assertEqual(events[0], {'event': 'error', 'line': 2, 'errors': {
+            'stock': ['7 units are held by reservations.'],
+        }})
+        self.assertEqual(events[-1], {'event': 'done', 'rows': 2, 'created': 0, 'updated': 1, 'unchanged': 0, 'failed': 1})
+        self.assertEqual(self._car()['stock'], 10)
+        self.assertEqual(Car.objects.get(pk=other.pk).stock, 5)
+
+
+class CarImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = token_client('importer', 'admin')
+        self.civic = Car.objects.create(brand='Honda', model='Civic', year=2020, price=100, stock=10)
+        self.jazz = Car.objects.create(brand='Honda', model='Jazz', year=2020, price=200, stock=4)
+
+    def _import(self, *lines):
+        upload = SimpleUploadedFile('catalog.ndjson', '\n'.join(lines).encode())
+        with rate_limits_bypassed(), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/cars/import/', {'file': upload})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+            return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_upsert_creates_updates_and_reports_bad_rows(self):
+        jazz_stamp = Car.objects.get(pk=self.jazz.pk).updated_at
+        events = self._import(
+            json.dumps({'brand': 'Honda', 'model': 'Fit', 'year': 2021, 'price': '150.00', 'stock': 3}),
+            json.dumps({'brand': 'Honda', 'model': 'Civic', 'year': 2020, 'price': '120.00', 'stock': 8}),
+            json.dumps({'brand': 'Honda', 'model': 'Jazz', 'year': 2020, 'price': '200.00', 'stock': 4}),
+            '{"brand": "Honda", "model": ',
+            json.dumps({'brand': 'Honda', 'model': 'City', 'year': 2020, 'price': '90.00', 'stock': -1}),
+        )
+        errors = [event for event in events if event['event'] == 'error']
+        self.assertEqual([event['line'] for event in errors], [4, 5])
+        self.assertIn('Invalid JSON', errors[0]['errors']['non_field_errors'][0])
+        self.assertIn('stock', errors[1]['errors'])
+        self.assertEqual(events[-1], {
+            'event': 'done', 'rows': 5, 'created': 1, 'updated': 1, 'unchanged': 1, 'failed': 2,
+        })
+
+        self.assertEqual(Car.objects.get(brand='Honda', model='Fit').stock, 3)
+        civic = Car.objects.get(pk=self.civic.pk)
+        self.assertEqual((civic.price, civic.stock), (Decimal('120.00'), 8))
+        # The unchanged row was not written
+        self.assertEqual(Car.objects.get(pk=self.jazz.pk).updated_at, jazz_stamp)
+
+    def test_an_unchanged_catalog_keeps_the_caches(self):
+        version = get_inventory_version()
+        events = self._import(
+            json.dumps({'brand': 'Honda', 'model': 'Civic', 'year': 2020, 'price': '100.00', 'stock': 10}),
+        )
+        self.assertEqual(events[-1]['unchanged'], 1)
+        self.assertEqual(get_inventory_version(), version)
+
+
+def token_client(username, role):
+    user = User.objects.create_user(username=username, password='x')
+    UserProfile.objects.create(user=user, role=role)
+    return Client(HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+
+
+class ReportPaginationTests(TestCase):
+    def setUp(self):
+        self.client = token_client('reports', 'staff')
+        # Most rows share a stock and a price, so pages have to split between equal values
+        self.cars = [
+            Car.objects.create(brand='B', model=f'M{n}', year=2020, price=9000000 if n % 4 else 8000000, stock=2 if n % 4 else 1)
+            for n in range(11)
+        ]
+
+    def _walk(self, url, key):
+        ids, pages = [], []
+        with rate_limits_bypassed():
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                pages.append(response.json())
+                ids += [car['id'] for car in pages[-1][key]]
+                url = pages[-1]['next']
+        return ids, pages
+
+    def test_pages_split_rows_with_equal_values(self):
+        ids, pages = self._walk('/api/cars/low-stock/?page_size=3', 'low_stock_cars')
+        expected = sorted(self.cars, key=lambda car: (car.stock, car.pk))
+        self.assertEqual(ids, [car.pk for car in expected])
+        self.assertEqual(len(pages), 4)
+
+        ids, _ = self._walk('/api/cars/expensive/?page_size=4', 'expensive_cars')
+        expected = sorted(self.cars, key=lambda car: (car.price, car.pk), reverse=True)
+        self.assertEqual(ids, [car.pk for car in expected])
+
+    def test_previous_links_walk_back_the_same_pages(self):
+        _, pages = self._walk('/api/cars/low-stock/?page_size=3', 'low_stock_cars')
+        url, seen = pages[-1]['previous'], []
+        with rate_limits_bypassed():
+            while url:
+                page = self.client.get(url).json()
+                seen.insert(0, [car['id'] for car in page['low_stock_cars']])
+                url = page['previous']
+        self.assertEqual(seen, [[car['id'] for car in page['low_stock_cars']] for page in pages[:-1]])
+
+    def test_rejects_thresholds_and_cursors_that_are_not_numbers(self):
+        with rate_limits_bypassed():
+            for query in ('below=NaN', 'below=Infinity', 'below=-inf', 'below=abc'):
+                with self.subTest(query=query):
+                    self.assertEqual(self.client.get(f'/api/cars/low-stock/?{query}').status_code, 400)
+            self.assertEqual(self.client.get('/api/cars/expensive/?above=sNaN').status_code, 400)
+            cursor = base64.b64encode(b'p=NaN:1').decode()
+            self.assertEqual(self.client.get(f'/api/cars/expensive/?cursor={cursor}').status_code, 404)
+
+
+class SaleFeedTests(TestCase):
+    def setUp(self):
+        self.client = token_client('feeder', 'customer')
+        car = Car.objects.create(brand='B', model='M', year=2020, price=100, stock=50)
+        self.customers = [Customer.objects.create(cust_id=n, name=f'C{n}', phone=str(n), address='-') for n in (1, 2)]
+        for n in range(13):
+            Sale.objects.create(car=car, customer=self.customers[n % 2], quantity=1, total_price=100)
+        # Sales recorded in the same instant: pages have to split between equal dates
+        now = timezone.now()
+        moments = [now - timedelta(minutes=minutes) for minutes in (0, 0, 0, 0, 5, 5, 5, 5, 5, 9, 9, 9, 9)]
+        for sale, moment in zip(Sale.objects.order_by('pk'), moments):
+            Sale.objects.filter(pk=sale.pk).update(sale_date=moment)
+
+    def _walk(self, params):
+        ids, pages, url = [], [], '/api/sales/feed/'
+        with rate_limits_bypassed(), CaptureQueriesContext(connection) as queries:
+            while url:
+                response = self.client.get(url, params if not pages else None)
+                self.assertEqual(response.status_code, 200)
+                pages.append(response.json())
+                ids += [sale['id'] for sale in pages[-1]['results']]
+                url = pages[-1]['next']
+        # Keyset positions: no page skips rows with an OFFSET
+        self.assertFalse([query['sql'] for query in queries if 'OFFSET' in query['sql']])
+        return ids, pages
+
+    def test_every_sale_is_listed_once_in_date_order(self):
+        for customer in (None, self.customers[0]):
+            with self.subTest(customer=customer):
+                sales = Sale.objects.order_by('-sale_date', '-id')
+                params = {'page_size': 3}
+                if customer is not None:
+                    sales, params['customer'] = sales.filter(customer=customer), customer.pk
+                ids, pages = self._walk(params)
+                self.assertEqual(ids, list(sales.values_list('pk', flat=True)))
+
+                # And back again through the previous links
+                url, seen = pages[-1]['previous'], []
+                with rate_limits_bypassed():
+                    while url:
+                        page = self.client.get(url).json()
+                        seen = [sale['id'] for sale in page['results']] + seen
+                        url = page['previous']
+                self.assertEqual(seen + [sale['id'] for sale in pages[-1]['results']], ids)
+
+
+class BulkSaleTests(TestCase):
+    def setUp(self):
+        self.client = token_client('clerk', 'staff')
+        self.cars = [Car.objects.create(brand='B', model=f'M{n}', year=2020, price=100, stock=5) for n in range(2)]
+        self.customer = Customer.objects.create(cust_id=1, name='C', phone='1', address='-')
+
+    def _post(self, mode, sales):
+        with rate_limits_bypassed():
+            return self.client.post('/api/sales/bulk/', {'mode': mode, 'sales': sales}, content_type='application/json')
+
+    def _state(self):
+        return (
+            list(Car.objects.order_by('pk').values_list('stock', 'sold_count')),
+            CustomerSummary.objects.filter(pk=self.customer.pk).values_list('sales_count', 'units_bought').first(),
+            Sale.objects.count(),
+        )
+
+    def test_atomic_batch_with_an_invalid_item_writes_nothing(self):
+        before = self._state()
+        response = self._post('atomic', [
+            {'car': self.cars[0].pk, 'customer': 1, 'quantity': 2},
+            {'car': self.cars[1].pk, 'customer': 1, 'quantity': 6},
+        ])
+        self.assertEqual(response.status_code, 400)
+        body = response.json()
+        self.assertEqual((body['created'], body['failed']), (0, 1))
+        self.assertEqual([item['status'] for item in body['results']], ['skipped', 'error'])
+        self.assertEqual(self._state(), before)
+
+    def test_partial_batch_records_the_valid_items(self):
+        response = self._post('partial', [
+            {'car': self.cars[0].pk, 'customer': 1, 'quantity': 2},
+            {'car': self.cars[1].pk, 'customer': 1, 'quantity': 6},
+            {'car': self.cars[0].pk, 'customer': 1, 'quantity': 3},
+            {'car': self.cars[0].pk, 'customer': 1, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body['created'], body['failed']), (2, 2))
+        self.assertEqual([item['status'] for item in body['results']], ['created', 'error', 'created', 'error'])
+        self.assertEqual(self._state(), ([(0, 5), (5, 0)], (2, 5), 2))
+        created = [item for item in body['results'] if item['status'] == 'created']
+        self.assertEqual(
+            [(item['id'], item['quantity']) for item in created],
+            list(Sale.objects.order_by('pk').values_list('pk', 'quantity')),
+        )
+
+    def test_ids_are_read_back_when_the_backend_returns_none(self):
+        # As on MySQL, where bulk_create leaves the primary keys unset
+        items = [{'car': self.cars[n % 2].pk, 'customer': 1, 'quantity': 1} for n in range(4)]
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            results = commit_bulk_sales(items)
+        self.assertEqual(
+            [(sale.pk, sale.car_id) for sale in results],
+            list(Sale.objects.order_by('pk').values_list('pk', 'car_id')),
+        )
+
+
+class UserProvisioningTests(TestCase):
+    def setUp(self):
+        self.client = token_client('provisioner', 'admin')
+
+    def _bulk(self, payload):
+        with rate_limits_bypassed():
+            return self.client.post('/api/users/bulk/', payload, content_type='application/json')
+
+    def test_atomic_batches_create_nobody_when_a_row_is_bad(self):
+        response = self._bulk({'users': [
+            {'username': 'ann', 'password': 'pw'},
+            {'username': 'bad name!', 'password': 'pw'},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['created'], 0)
+        self.assertEqual([row['status'] for row in response.json()['results']], ['skipped', 'error'])
+        self.assertFalse(User.objects.filter(username='ann').exists())
+
+    def test_partial_batches_create_the_good_rows(self):
+        response = self._bulk({'mode': 'partial', 'users': [
+            {'username': 'ann', 'password': 'pw'},
+            {'username': 'bad name!', 'password': 'pw'},
+        ]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()['created'], response.json()['failed']), (1, 1))
+        created = response.json()['results'][0]
+        self.assertEqual(Token.objects.get(user__username='ann').key, created['token'])
+        self.assertTrue(User.objects.get(username='ann').check_password('pw'))
+
+    def test_a_username_repeated_in_the_batch_is_rejected(self):
+        response = self._bulk({'mode': 'partial', 'users': [
+            {'username': 'ann', 'password': 'pw'},
+            {'username': 'ANN', 'password': 'pw'},
+            {'username': 'provisioner', 'password': 'pw'},
+        ]})
+        self.assertEqual([row['status'] for row in response.json()['results']], ['created', 'error', 'error'])
+        self.assertIn('username', response.json()['results'][1]['errors'])
+        self.assertEqual(User.objects.filter(username__iexact='ann').count(), 1)
+
+    def test_roles_set_the_user_flags_and_profile(self):
+        results = provision_users([
+            {'username': role, 'password': 'pw', 'role': role} for role in ('admin', 'staff', 'customer')
+        ])
+        for user in results:
+            with self.subTest(role=user.username):
+                stored = User.objects.select_related('userprofile').get(pk=user.pk)
+                self.assertEqual(
+                    {'is_staff': stored.is_staff, 'is_superuser': stored.is_superuser}, ROLE_FLAGS[user.username]
+                )
+                self.assertEqual(stored.userprofile.role, user.username)
+                self.assertEqual(stored.auth_token.key, user.auth_token.key)
+
+
+class TokenCacheInvalidationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.client = token_client('staffer', 'staff')
+        self.user = User.objects.get(username='staffer')
+        self.assertEqual(self._get(), 200)  # the token is cached from here on
+
+    def _get(self):
+        with rate_limits_bypassed():
+            return self.client.get('/api/cars/low-stock/').status_code
+
+    def test_logout(self):
+        with self.captureOnCommitCallbacks(execute=True), rate_limits_bypassed():
+            self.assertEqual(self.client.post('/api/logout/').status_code, 200)
+        self.assertEqual(self._get(), 401)
+
+    def test_role_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            profile = UserProfile.objects.get(user=self.user)
+            profile.role = 'customer'
+            profile.save()
+        self.assertEqual(self._get(), 403)
+
+    def test_deactivation(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self._get(), 401)
+
+    def test_entries_are_dropped_only_once_the_change_commits(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.is_active = False
+            self.user.save()
+            # Not committed yet: other requests still read the old row, keep its entry
+            self.assertIsNotNone(token_cache.get(Token.objects.get(user=self.user).key))
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(token_cache.get(Token.objects.get(user=self.user).key))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class PrimaryReplicaRouterTests(TransactionTestCase):
+    # Routing decisions only: no query ever reaches the 'replica' alias here
+
+    def setUp(self):
+        cache.clear()
+
+    def test_reads_go_to_the_replica_and_writes_to_the_primary(self):
+        with replica_reads():
+            self.assertEqual(Car.objects.all().db, 'replica')
+        with replica_reads():
+            self.assertEqual(router.db_for_write(Car), 'default')
+        # Outside a replica-enabled request (commands, shells, writes)
+        self.assertEqual(Car.objects.all().db, 'default')
+
+    def test_reads_inside_a_transaction_stay_on_the_primary(self):
+        with replica_reads():
+            with transaction.atomic():
+                self.assertEqual(Car.objects.all().db, 'default')
+            self.assertEqual(Car.objects.all().db, 'replica')
+
+    def test_reads_after_a_write_stay_on_the_primary(self):
+        with replica_reads():
+            Car.objects.create(brand='B', model='M', year=2020, price=1, stock=1)
+            self.assertEqual(Car.objects.all().db, 'default')
+        with replica_reads():
+            self.assertEqual(Car.objects.all().db, 'replica')
+
+    def test_clients_that_write_are_pinned_to_the_primary(self):
+        seen = []
+        middleware = ReplicaRoutingMiddleware(lambda request: seen.append(Car.objects.all().db) or HttpResponse())
+        client = RequestFactory(HTTP_AUTHORIZATION='Token writer', REMOTE_ADDR='10.0.0.1')
+        middleware(client.get('/'))
+        middleware(client.post('/'))
+        middleware(client.get('/'))
+        middleware(RequestFactory(HTTP_AUTHORIZATION='Token reader', REMOTE_ADDR='10.0.0.2').get('/'))
+        self.assertEqual(seen, ['replica', 'default', 'default', 'replica'])
+
+    def test_a_write_does_not_pin_other_clients_behind_the_same_address(self):
+        seen = []
+        middleware = ReplicaRoutingMiddleware(lambda request: seen.append(Car.objects.all().db) or HttpResponse())
+        writer = RequestFactory(HTTP_AUTHORIZATION='Token writer', REMOTE_ADDR='10.0.0.1')
+        reader = RequestFactory(HTTP_AUTHORIZATION='Token reader', REMOTE_ADDR='10.0.0.1')
+        middleware(writer.post('/'))
+        middleware(writer.get('/'))
+        middleware(reader.get('/'))
+        self.assertEqual(seen, ['default', 'default', 'replica'])
+
+    def test_a_login_pins_the_address_it_came_from(self):
+        seen = []
+        middleware = ReplicaRoutingMiddleware(lambda request: seen.append(Car.objects.all().db) or HttpResponse())
+        # Behind a proxy: the client address is the forwarded one
+        middleware(RequestFactory(REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.5').post('/login/'))
+        middleware(RequestFactory(
+            HTTP_AUTHORIZATION='Token new', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.5'
+        ).get('/'))
+        middleware(RequestFactory(
+            HTTP_AUTHORIZATION='Token other', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.9'
+        ).get('/'))
+        self.assertEqual(seen, ['default', 'default', 'replica'])
+
+    def test_migrations_only_run_on_the_primary(self):
+        self.assertTrue(router.allow_migrate('default', 'inventory'))
+        self.assertFalse(router.allow_migrate('replica', 'inventory'))
+
+
+@skipUnless(settings.DATABASE_REPLICAS, "needs a replica alias, e.g. SQLITE_DATABASE=db.sqlite3 SQLITE_REPLICAS=replica.sqlite3")
+class ReplicaConnectionTests(TransactionTestCase):
+    databases = '__all__'
+
+    def test_queries_run_on_the_routed_connection(self):
+        replica = connections[settings.DATABASE_REPLICAS[0]]
+        with CaptureQueriesContext(replica) as on_replica, CaptureQueriesContext(connection) as on_primary:
+            with replica_reads():
+                list(Car.objects.all())
+                Car.objects.create(brand='B', model='M', year=2020, price=1, stock=1)
+                list(Car.objects.all())
+        self.assertEqual(len(on_replica), 1)
+        self.assertTrue(any(query['sql'].startswith('INSERT') for query in on_primary))
+        self.assertIn('SELECT', on_primary[-1]['sql'])
+
+
+class OversellTests(TestCase):
+    def setUp(self):
+        self.car = Car.objects.create(brand='B', model='M', year=2020, price=100, stock=5)
+        self.customer = Customer.objects.create(cust_id=1, name='C', phone='1', address='-')
+
+    def test_a_car_out_of_stock_cannot_be_sold(self):
+        Car.objects.filter(pk=self.car.pk).update(stock=0)
+        with self.assertRaises(InsufficientStock) as failure:
+            commit_sale(self.car, self.customer, 1)
+        self.assertEqual(failure.exception.available, 0)
+
+        client = token_client('clerk', 'staff')
+        with rate_limits_bypassed():
+            response = client.post(
+                '/api/sales/', {'car': self.car.pk, 'customer': 1, 'quantity': 1}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Sale.objects.exists())
+
+    def test_the_stock_check_reads_the_row_not_the_instance(self):
+        # Another seller took 4 units after this instance was loaded
+        stale = Car.objects.get(pk=self.car.pk)
+        commit_sale(self.car, self.customer, 4)
+        with self.assertRaises(InsufficientStock):
+            commit_sale(stale, self.customer, 2)
+        _, remaining = commit_sale(stale, self.customer, 1)
+        self.assertEqual(remaining, 0)
+        self.assertEqual(Car.objects.values_list('stock', 'sold_count').get(pk=self.car.pk), (0, 5))
+
+
+class ConcurrentSalesTests(TransactionTestCase):
+    def test_concurrent_sellers_never_oversell(self):
+        out = StringIO()
+        # The command raises CommandError on an oversell or a lost update. SQLite
+        # serializes the writers, so some attempts may fail with "database is locked".
+        call_command('bench_concurrent_sales', threads=4, attempts=10, stock=25, stdout=out)
+        final_stock, recorded = map(int, re.search(r'final_stock=(\d+) units_recorded=(\d+)', out.getvalue()).groups())
+        self.assertEqual(final_stock + recorded, 25)
+        # The benchmark leaves nothing behind, not even a tombstone
+        self.assertFalse(Car.objects.exists())
+        self.assertFalse(CarTombstone.objects.exists())
+
+
+class SoldCountTests(TestCase):
+    def setUp(self):
+        self.cars = [Car.objects.create(brand='B', model=f'M{n}', year=2020, price=100, stock=50) for n in range(2)]
+        self.customer = Customer.objects.create(cust_id=1, name='C', phone='1', address='-')
+
+    def _sold(self):
+        return list(Car.objects.order_by('pk').values_list('sold_count', flat=True))
+
+    def assertMatchesRebuild(self):
+        out = StringIO()
+        call_command('rebuild_sales_counters', stdout=out)
+        self.assertIn('Corrected sold_count of 0 cars', out.getvalue())
+
+    def test_create(self):
+        Sale.objects.create(car=self.cars[0], customer=self.customer, quantity=3)
+        Sale.objects.create(car=self.cars[0], customer=self.customer, quantity=2)
+        self.assertEqual(self._sold(), [5, 0])
+        self.assertMatchesRebuild()
+
+    def test_quantity_edit(self):
+        sale = Sale.objects.create(car=self.cars[0], customer=self.customer, quantity=3)
+        sale = Sale.objects.get(pk=sale.pk)
+        sale.quantity = 1
+        sale.save()
+        self.assertEqual(self._sold(), [1, 0])
+        self.assertMatchesRebuild()
+
+    def test_move_between_cars(self):
+        sale = Sale.objects.create(car=self.cars[0], customer=self.customer, quantity=3)
+        sale.car = self.cars[1]
+        sale.quantity = 4
+        sale.save()
+        self.assertEqual(self._sold(), [0, 4])
+        self.assertMatchesRebuild()
+
+    def test_delete(self):
+        Sale.objects.create(car=self.cars[0], customer=self.customer, quantity=3)
+        Sale.objects.create(car=self.cars[0], customer=self.customer, quantity=2).delete()
+        self.assertEqual(self._sold(), [3, 0])
+        Sale.objects.filter(car=self.cars[0]).delete()
+        self.assertEqual(self._sold(), [0, 0])
+        self.assertMatchesRebuild()
+
+
+class CustomerSummaryTests(TestCase):
+    def setUp(self):
+        self.car = Car.objects.create(brand='B', model='M', year=2020, price=100, stock=50)
+        self.customers = [
+            Customer.objects.create(cust_id=n, name=f'C{n}', phone=str(n), address='-') for n in range(1, 3)
+        ]
+
+    def _sell(self, customer, quantity):
+        return Sale.objects.create(car=self.car, customer=customer, quantity=quantity, total_price=100 * quantity)
+
+    def _summaries(self):
+        return {
+            row.customer_id: (row.sales_count, row.units_bought, row.lifetime_spend, row.last_purchase_at)
+            for row in CustomerSummary.objects.order_by('pk')
+        }
+
+    def assertMatchesRebuild(self):
+        maintained = self._summaries()
+        CustomerSummary.rebuild([customer.pk for customer in self.customers])
+        self.assertEqual(maintained, self._summaries())
+
+    def test_create(self):
+        self.assertEqual(self._summaries()[1][:3], (0, 0, 0))
+        self._sell(self.customers[0], 2)
+        latest = self._sell(self.customers[0], 1)
+        self.assertEqual(self._summaries()[1], (2, 3, 300, latest.sale_date))
+        self.assertMatchesRebuild()
+
+    def test_quantity_edit(self):
+        sale = self._sell(self.customers[0], 2)
+        sale.quantity, sale.total_price = 5, 500
+        sale.save()
+        self.assertEqual(self._summaries()[1][:3], (1, 5, 500))
+        self.assertMatchesRebuild()
+
+    def test_move_between_customers(self):
+        sale = self._sell(self.customers[0], 2)
+        sale.customer = self.customers[1]
+        sale.save()
+        summaries = self._summaries()
+        self.assertEqual((summaries[1][:3], summaries[2][:3]), ((0, 0, 0), (1, 2, 200)))
+        self.assertMatchesRebuild()
+
+    def test_delete(self):
+        first = self._sell(self.customers[0], 2)
+        self._sell(self.customers[0], 1).delete()
+        # The last purchase falls back to the remaining sale
+        self.assertEqual(self._summaries()[1], (1, 2, 200, first.sale_date))
+        first.delete()
+        self.assertEqual(self._summaries()[1], (0, 0, 0, None))
+        self.assertMatchesRebuild()
+
+    def test_substring_name_filter_is_gone(self):
+        client = token_client('desk', 'staff')
+        with rate_limits_bypassed():
+            response = client.get('/api/customers/', {'name__icontains': 'c'})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('name__icontains', response.json())
+            response = client.get('/api/customers/', {'name': 'C2'})
+        self.assertEqual([customer['cust_id'] for customer in response.json()['results']], [2])
+
+
+class CarSyncTests(TestCase):
+    def setUp(self):
+        self.client = token_client('syncer', 'customer')
+        self.cars = [Car.objects.create(brand='B', model=f'M{n}', year=2020, price=100, stock=5) for n in range(5)]
+
+    def _sync(self, cursor=None, page_size=2):
+        query = {'page_size': page_size, **({'cursor': cursor} if cursor else {})}
+        with rate_limits_bypassed():
+            return self.client.get('/api/cars/changes/', query)
+
+    def _sync_all(self, cursor=None):
+        changed, deleted = [], []
+        while True:
+            body = self._sync(cursor).json()
+            changed += [car['id'] for car in body['changed']]
+            deleted += body['deleted']
+            cursor = body['cursor']
+            if not body['has_more']:
+                return changed, deleted, cursor
+
+    def test_pages_split_cars_changed_at_the_same_instant(self):
+        moment = timezone.now() - timedelta(hours=1)
+        Car.objects.update(updated_at=moment)
+        changed, deleted, cursor = self._sync_all()
+        self.assertEqual(changed, [car.pk for car in self.cars])
+        self.assertEqual(deleted, [])
+        # Nothing new: the cursor has moved past every change
+        self.assertEqual(self._sync_all(cursor)[:2], ([], []))
+
+    def test_deleted_cars_come_back_as_tombstones(self):
+        with mock.patch.dict(SYNC_SETTINGS, SETTLE_SECONDS=0):
+            _, _, cursor = self._sync_all()
+            deleted_id = self.cars[1].pk
+            self.cars[1].delete()
+            self.cars[2].stock = 1
+            self.cars[2].save()
+            changed, deleted, _ = self._sync_all(cursor)
+        self.assertEqual((changed, deleted), ([self.cars[2].pk], [deleted_id]))
+
+    def test_cursor_older_than_the_tombstones_is_gone(self):
+        cursor = encode_cursor((timezone.now() - timedelta(days=SYNC_SETTINGS['TOMBSTONE_DAYS'] + 1), 0))
+        self.assertEqual(self._sync(cursor).status_code, 410)
+
+    def test_invalid_cursor_or_page_size_is_a_400(self):
+        self.assertEqual(self._sync('not-a-cursor').status_code, 400)
+        self.assertEqual(self._sync(base64.urlsafe_b64encode(b'12:x').decode()).status_code, 400)
+        self.assertEqual(self._sync(page_size=0).status_code, 400)
+
+
+class LiveEventTests(TestCase):
+    def setUp(self):
+        self.client = token_client('watcher', 'customer')
+        self.car = Car.objects.create(brand='B', model='M', year=2020, price=100, stock=10)
+        self.customer = Customer.objects.create(cust_id=1, name='C', phone='1', address='-')
+
+    def _events(self, last_event_id=None):
+        headers = {'HTTP_LAST_EVENT_ID': str(last_event_id)} if last_event_id is not None else {}
+        with rate_limits_bypassed():
+            response = self.client.get('/api/async/cars/stream/', {'timeout': 0}, **headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        frames = []
+        for block in response.content.decode().strip().split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in block.split('\n') if not line.startswith(':'))
+            frames.append((int(fields['id']), fields.get('event'), json.loads(fields.get('data', 'null'))))
+        return frames
+
+    def test_changes_are_streamed_in_commit_order_and_resumed_by_id(self):
+        [(start, _, _)] = self._events()
+        with self.captureOnCommitCallbacks(execute=True):
+            commit_sale(self.car, self.customer, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            car = Car.objects.get(pk=self.car.pk)
+            car.price = 150
+            car.save()
+
+        header, sold, repriced = self._events(start)
+        self.assertEqual(header[0], start)
+        self.assertEqual([sold[0], repriced[0]], [start + 1, start + 2])
+        self.assertEqual((sold[1], sold[2]['stock'], sold[2]['price']), ('car', 8, '100.00'))
+        self.assertEqual((repriced[1], repriced[2]['stock'], repriced[2]['price']), ('car', 8, '150.00'))
+
+        # A client that saw the sale only gets what came after it
+        self.assertEqual(self._events(sold[0])[1:], [repriced])
+
+    def test_rolled_back_writes_are_not_published(self):
+        [(start, _, _)] = self._events()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                commit_sale(self.car, self.customer, 2)
+                transaction.set_rollback(True)
+        self.assertEqual(len(self._events(start)), 1)
+
+    def test_an_id_no_longer_kept_gets_a_reset(self):
+        frames = self._events(5)
+        self.assertEqual(frames[-1][1], 'reset')
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.opened, self.closed = [], []
+
+    def _connect(self):
+        self.opened.append(object())
+        return self.opened[-1]
+
+    def _checkout(self, pool, ping=lambda connection: None):
+        return pool.checkout(self._connect, self.closed.append, ping)
+
+    def test_released_connections_are_reused(self):
+        pool = ConnectionPool(size=2)
+        first = self._checkout(pool)
+        pool.checkin(first, self.closed.append)
+        self.assertIs(self._checkout(pool), first)
+        self.assertEqual(pool.stats()['connections_opened'], 1)
+
+    def test_checkout_times_out_when_every_connection_is_in_use(self):
+        pool = ConnectionPool(size=1, timeout=0.05)
+        self._checkout(pool)
+        with self.assertRaises(PoolTimeout):
+            self._checkout(pool)
+        self.assertEqual(pool.stats()['checkout_failures'], 1)
+
+    def test_a_waiting_checkout_gets_the_released_connection(self):
+        pool = ConnectionPool(size=1, timeout=5)
+        connection = self._checkout(pool)
+        releaser = threading.Timer(0.05, pool.checkin, (connection, self.closed.append))
+        releaser.start()
+        self.assertIs(self._checkout(pool), connection)
+        releaser.join()
+        self.assertGreater(pool.stats()['wait_time_max'], 0)
+
+    def test_connections_failing_the_health_check_are_replaced(self):
+        pool = ConnectionPool(size=1)
+        broken = self._checkout(pool)
+        pool.checkin(broken, self.closed.append)
+
+        def ping(connection):
+            raise OSError('server has gone away')
+
+        fresh = self._checkout(pool, ping)
+        self.assertIsNot(fresh, broken)
+        self.assertEqual(self.closed, [broken])
+        self.assertEqual(pool.stats()['health_check_failures'], 1)
+
+    def test_slots_are_released_when_a_checkout_or_a_request_fails(self):
+        pool = ConnectionPool(size=1, timeout=0.05)
+
+        def refuse():
+            raise OSError('connection refused')
+
+        with self.assertRaises(OSError):
+            pool.checkout(refuse, self.closed.append, lambda connection: None)
+        # A connection left mid-transaction by a failed request is closed, not reused
+        connection = self._checkout(pool)
+        pool.checkin(connection, self.closed.append, reusable=False)
+        self.assertIsNot(self._checkout(pool), connection)
+        self.assertEqual(self.closed, [connection])
+        self.assertEqual(pool.stats()['in_use'], 1)
+
+
+class TrigramSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.corolla = Car.objects.create(brand='Toyota', model='Corolla', year=2020, price=1, stock=1)
+            self.camry = Car.objects.create(brand='Toyota', model='Camry', year=2020, price=1, stock=1)
+            self.civic = Car.objects.create(brand='Honda', model='Civic', year=2020, price=1, stock=1)
+
+    def _search(self, term, index=trigram_index):
+        return [car_id for _, car_id in index.search(term, 10, SEARCH_SETTINGS['MIN_SCORE'])]
+
+    def test_prefixes_and_typos_match(self):
+        self.assertEqual(sorted(self._search('toy')), sorted([self.corolla.pk, self.camry.pk]))
+        self.assertEqual(self._search('civ'), [self.civic.pk])
+        self.assertEqual(self._search('corola')[0], self.corolla.pk)
+        self.assertIn(self.camry.pk, self._search('toyta camry'))
+        self.assertEqual(self._search('zzz'), [])
+
+    def test_other_processes_reload_only_the_changed_cars(self):
+        worker = TrigramIndex()  # another process, already serving searches
+        self.assertEqual(self._search('civic', worker), [self.civic.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.civic.model = 'Accord'
+            self.civic.save()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._search('accord', worker), [self.civic.pk])
+        self.assertEqual(len(queries), 1)
+        self.assertIn('IN', queries[0]['sql'])
+        self.assertEqual(self._search('civic', worker), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.camry.delete()
+        self.assertEqual(self._search('camry', worker), [])
+
+    def test_an_index_missing_changes_is_rebuilt(self):
+        worker = TrigramIndex()
+        worker.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            Car.objects.create(brand='Honda', model='Jazz', year=2020, price=1, stock=1)
+        cache.delete(f'inventory:search-change:{cache.get(SEARCH_VERSION_KEY)}')  # aged out of the log
+        with mock.patch.object(worker, 'rebuild', wraps=worker.rebuild) as rebuild:
+            self.assertEqual(len(self._search('jazz', worker)), 1)
+        rebuild.assert_called_once()
+
+        # A bulk write without the signals: every car is re-read
+        Car.objects.filter(pk=self.civic.pk).update(model='Fit')
+        trigram_index.invalidate()
+        with mock.patch.object(worker, 'rebuild', wraps=worker.rebuild) as rebuild:
+            self.assertEqual(self._search('fit', worker), [self.civic.pk])
+        rebuild.assert_called_once()
+
+    def test_matches_past_the_ranking_cap_still_count_and_filter(self):
+        client = token_client('browser', 'customer')
+        with mock.patch.dict(SEARCH_SETTINGS, MAX_RESULTS=1), rate_limits_bypassed():
+            everything = client.get('/api/cars/', {'search': 'toy'}).json()
+            filtered = client.get('/api/cars/', {'search': 'toy', 'model': 'Camry'}).json()
+        self.assertEqual(everything['count'], 2)
+        self.assertEqual([car['id'] for car in everything['results']], [self.corolla.pk, self.camry.pk])
+        # The best match is filtered out; the one past the cap is still found
+        self.assertEqual([car['id'] for car in filtered['results']], [self.camry.pk])
+
+    def test_substring_filters_are_gone(self):
+        client = token_client('browser', 'customer')
+        with rate_limits_bypassed():
+            response = client.get('/api/cars/', {'brand__icontains': 'toy'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('brand__icontains', response.json())
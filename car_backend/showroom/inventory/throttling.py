@@ -0,0 +1,169 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ObjectDoesNotExist
+from rest_framework.throttling import BaseThrottle
+
+from .metrics import registry
+
+RATE_LIMIT_SETTINGS = {
+    'ENABLED': True,
+    # Cache holding the buckets: must be shared (Redis / Memcached) for limits to hold
+    # across worker processes
+    'CACHE': 'default',
+    # Requests per client by role ("N/period", or None for no limit); the bucket holds
+    # N tokens and refills over the period
+    'RATES': {'anon': '120/min', 'customer': '600/min', 'staff': '1200/min', 'admin': None},
+    # Views with a throttle_scope get their own buckets, and the rates given here
+    'SCOPES': {},
+    **getattr(settings, 'RATE_LIMITS', {}),
+}
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+_bypassed = ContextVar('rate_limits_bypassed', default=False)
+
+
+@contextmanager
+def rate_limits_bypassed():
+    """Skip rate limiting in this context (benchmarks, query budget tests)."""
+    token = _bypassed.set(True)
+    try:
+        yield
+    finally:
+        _bypassed.reset(token)
+
+
+def parse_rate(rate):
+    """'100/min' -> (100, 60): bucket capacity and seconds to refill it. None: no limit."""
+    if rate is None:
+        return None
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def rate_for(scope, role):
+    rates = RATE_LIMIT_SETTINGS['SCOPES'].get(scope, {})
+    return parse_rate(rates[role] if role in rates else RATE_LIMIT_SETTINGS['RATES'].get(role))
+
+
+def _role(user):
+    if not user or not user.is_authenticated:
+        return 'anon'
+    try:
+        # Attached by CachedTokenAuthentication: no query
+        return user.userprofile.role
+    except ObjectDoesNotExist:
+        return 'customer'
+
+
+# ✅ Token buckets in the shared cache
+# Each bucket is a single integer, its "theoretical arrival time" in ms (GCRA, the
+# token bucket expressed as one timestamp): taking a token is one atomic cache.incr
+# by the time a token takes to refill, and the request is allowed while that time
+# stays within the bucket's burst of now. No read-modify-write, so concurrent workers
+# cannot both spend the last token.
+def _bucket_timeout(period):
+    # Only needs to outlive the burst window; a lost key is a full bucket
+    return max(3600, period * 2)
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def _verdict(tat, now, emission, burst):
+    """(allowed, seconds to wait) for a bucket whose arrival time became `tat`."""
+    if tat - now <= burst:
+        return True, 0
+    return False, (tat - burst - now) / 1000
+
+
+def take_token(cache, key, capacity, period):
+    emission = max(1, round(period * 1000 / capacity))
+    now = _now_ms()
+    try:
+        tat = cache.incr(key, emission)
+    except ValueError:
+        if cache.add(key, now + emission, _bucket_timeout(period)):
+            return True, 0
+        tat = cache.incr(key, emission)
+    if tat < now + emission:
+        # Idle bucket (arrival time in the past): it is full, restart it from now
+        tat = now + emission
+        cache.set(key, tat, _bucket_timeout(period))
+    allowed, wait = _verdict(tat, now, emission, emission * capacity)
+    if not allowed:
+        cache.decr(key, emission)  # rejected requests do not spend a token
+    return allowed, wait
+
+
+async def atake_token(cache, key, capacity, period):
+    emission = max(1, round(period * 1000 / capacity))
+    now = _now_ms()
+    try:
+        tat = await cache.aincr(key, emission)
+    except ValueError:
+        if await cache.aadd(key, now + emission, _bucket_timeout(period)):
+            return True, 0
+        tat = await cache.aincr(key, emission)
+    if tat < now + emission:
+        tat = now + emission
+        await cache.aset(key, tat, _bucket_timeout(period))
+    allowed, wait = _verdict(tat, now, emission, emission * capacity)
+    if not allowed:
+        await cache.adecr(key, emission)
+    return allowed, wait
+
+
+# ✅ DRF throttle (REST_FRAMEWORK['DEFAULT_THROTTLE_CLASSES'])
+# One bucket per client (user, or address when anonymous) per scope: views without a
+# throttle_scope share the "default" scope. The rate depends on the client's role.
+# DRF turns a rejection into 429 with Retry-After.
+class TokenBucketThrottle(BaseThrottle):
+    def __init__(self):
+        self.retry_after = None
+
+    def _bucket(self, request, scope):
+        role = _role(request.user)
+        rate = rate_for(scope, role)
+        if rate is None:
+            return None
+        if role == 'anon':
+            ident = 'addr:' + self.get_ident(request)
+        else:
+            ident = f'user:{request.user.pk}'
+        return f'ratelimit:{scope}:{ident}', rate, role
+
+    def _active(self):
+        return RATE_LIMIT_SETTINGS['ENABLED'] and not _bypassed.get()
+
+    def allow_request(self, request, view, scope=None):
+        if not self._active():
+            return True
+        scope = scope or getattr(view, 'throttle_scope', None) or 'default'
+        bucket = self._bucket(request, scope)
+        if bucket is None:
+            return True
+        key, (capacity, period), role = bucket
+        allowed, self.retry_after = take_token(caches[RATE_LIMIT_SETTINGS['CACHE']], key, capacity, period)
+        if not allowed:
+            registry.rate_limited(scope, role)
+        return allowed
+
+    async def aallow_request(self, request, scope):
+        if not self._active():
+            return True
+        bucket = self._bucket(request, scope)
+        if bucket is None:
+            return True
+        key, (capacity, period), role = bucket
+        allowed, self.retry_after = await atake_token(caches[RATE_LIMIT_SETTINGS['CACHE']], key, capacity, period)
+        if not allowed:
+            registry.rate_limited(scope, role)
+        return allowed
+
+    def wait(self):
+        return self.retry_after
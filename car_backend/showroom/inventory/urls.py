@@ -1,8 +1,11 @@
 from django.urls import path
+from . import async_views
 from .views import (
-    CarListCreateView, CarDetailView, CarStatisticsView, AveragePriceView,
-    RegisterView, LoginView, LogoutView,
-    SaleListCreateView, SaleDetailView,
+    CarListCreateView, CarListCacheStatsView, CarDetailView, CarFacetsView, CarChangesView, CarImportView, CarStatisticsView, AveragePriceView,
+    RegisterView, LoginView, LogoutView, UserBulkCreateView,
+    DatabasePoolStatsView, MetricsView,
+    SaleListCreateView, SaleBulkCreateView, SaleFeedView, SalesAnalyticsView, SaleDetailView,
+    ReservationListCreateView, ReservationDetailView, ReservationConvertView, ReservationReleaseView,
     CustomerListCreateView, CustomerDetailView,
     ExpensiveCarsView, LowStockCarsView,
     assign_role
@@ -12,6 +15,10 @@ urlpatterns = [
     # 🚗 Car APIs
     path('cars/', CarListCreateView.as_view(), name='car-list-create'),
     path('cars/<int:pk>/', CarDetailView.as_view(), name='car-detail'),
+    path('cars/cache-stats/', CarListCacheStatsView.as_view(), name='car-list-cache-stats'),
+    path('cars/facets/', CarFacetsView.as_view(), name='car-facets'),
+    path('cars/changes/', CarChangesView.as_view(), name='car-changes'),
+    path('cars/import/', CarImportView.as_view(), name='car-import'),
     path('cars/statistics/', CarStatisticsView.as_view(), name='car-statistics'),
     path('cars/average-price/', AveragePriceView.as_view(), name='average-price'),
     path('cars/expensive/', ExpensiveCarsView.as_view(), name='expensive-cars'),
@@ -21,15 +28,36 @@ urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('users/bulk/', UserBulkCreateView.as_view(), name='user-bulk-create'),
 
     # 💸 Sales APIs
     path('sales/', SaleListCreateView.as_view(), name='sale-list-create'),
+    path('sales/bulk/', SaleBulkCreateView.as_view(), name='sale-bulk-create'),
+    path('sales/feed/', SaleFeedView.as_view(), name='sale-feed'),
+    path('sales/analytics/', SalesAnalyticsView.as_view(), name='sales-analytics'),
     path('sales/<int:pk>/', SaleDetailView.as_view(), name='sale-detail'),
 
+    # 🔒 Reservation APIs
+    path('reservations/', ReservationListCreateView.as_view(), name='reservation-list-create'),
+    path('reservations/<int:pk>/', ReservationDetailView.as_view(), name='reservation-detail'),
+    path('reservations/<int:pk>/convert/', ReservationConvertView.as_view(), name='reservation-convert'),
+    path('reservations/<int:pk>/release/', ReservationReleaseView.as_view(), name='reservation-release'),
+
+    # ⚡ Async read APIs (native under ASGI)
+    path('async/cars/', async_views.car_list, name='async-car-list'),
+    path('async/cars/<int:pk>/', async_views.car_detail, name='async-car-detail'),
+    path('async/cars/statistics/', async_views.car_statistics, name='async-car-statistics'),
+    path('async/cars/stream/', async_views.car_stream, name='async-car-stream'),
+    path('async/sales/', async_views.sale_list, name='async-sale-list'),
+
     # 👥 Customer APIs
     path('customers/', CustomerListCreateView.as_view(), name='customer-list-create'),
     path('customers/<int:pk>/', CustomerDetailView.as_view(), name='customer-detail'),
 
+    # 📊 Monitoring
+    path('db/pool-stats/', DatabasePoolStatsView.as_view(), name='db-pool-stats'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+
     # 🔧 Role Management
     path('assign-role/', assign_role, name='assign-role'),
 ]
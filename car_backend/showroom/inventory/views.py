@@ -1,24 +1,47 @@
+import json
+import os
+from decimal import Decimal, InvalidOperation
+
 from rest_framework import generics, status, filters
 from rest_framework.permissions import AllowAny, IsAuthenticated, BasePermission
-from rest_framework.authentication import TokenAuthentication
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.pagination import PageNumberPagination
-from django.db import transaction, connection
-from django.db.models import Avg, Sum
-from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination, CursorPagination, Cursor
+from django.db import IntegrityError
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Max, Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
-
-from .models import Car, Sale, Customer, UserProfile
-from .serializers import CarSerializer, UserSerializer, SaleSerializer, CustomerSerializer
+from showroom.db.pool import pool_stats
+
+from .models import Car, Reservation, Sale, Customer, UserProfile
+from .serializers import (
+    CarSerializer, UserSerializer, SaleSerializer, CustomerSerializer, BulkSaleItemSerializer, BulkUserItemSerializer,
+    ReservationSerializer,
+)
+from .services import ReservationUnavailable, commit_bulk_sales, convert_reservation, release_reservation
+from .provisioning import PROVISIONING_SETTINGS, provision_users
+from .authentication import CachedTokenAuthentication
+from .filters import CarFilter, CustomerFilter
+from .importers import CarImporter, guess_format, open_rows
+from .stats import get_inventory_stats
+from .search import CarSearchFilter
+from .facets import get_car_facets
+from .sync import SYNC_SETTINGS, CursorExpired, car_changes, decode_cursor, encode_cursor
+from .conditional import ConditionalGetMixin, make_etag
+from .caching import car_list_cache
+from .analytics import sales_analytics
+from .metrics import registry as metrics_registry
 
 # ✅ Temporary Role Assignment (for testing only)
 @api_view(['POST'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def assign_role(request):
     role = request.data.get("role")
@@ -44,14 +67,117 @@ class IsStaffOrAdmin(BasePermission):
         return request.user.is_authenticated and request.user.userprofile.role in ['admin', 'staff']
 
 # ✅ Pagination
+# Keyset cursor over a (sort field, id) index. DRF's CursorPagination keys on the first
+# field alone and pages through rows sharing a value (a stock, a price, a sale date)
+# with an OFFSET; here the position carries both values, so every page is one index
+# range scan.
+class KeysetCursorPagination(CursorPagination):
+    offset_cutoff = 0  # positions are unique, cursors never carry an offset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.view = view
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        current_position = self.cursor.position if self.cursor is not None else None
+
+        # A previous-page cursor reads backwards from its position
+        ordering = tuple(
+            (field[1:] if field.startswith("-") else f"-{field}") for field in self.ordering
+        ) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = self.filter_after(queryset, ordering, self.parse_position(queryset, current_position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > len(self.page)
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, current_position is not None
+        # An empty page links back to where it was read from
+        self.next_position = self.previous_position = current_position
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering) if self.page else self.next_position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering) if self.page else self.previous_position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def filter_after(self, queryset, ordering, position):
+        # (field, id) > (value, pk), written so the >= bound gives the composite index
+        # its range start (see sync.py)
+        (field, id_field), (value, pk) = [name.lstrip("-") for name in ordering], position
+        op = "lt" if ordering[0].startswith("-") else "gt"
+        return queryset.filter(**{f"{field}__{op}e": value}).filter(
+            Q(**{f"{field}__{op}": value}) | Q(**{field: value, f"{id_field}__{op}": pk})
+        )
+
+    def parse_position(self, queryset, position):
+        field = queryset.model._meta.get_field(self.ordering[0].lstrip("-"))
+        try:
+            raw, pk = position.rsplit(":", 1)
+            value = field.to_python(raw)
+            if isinstance(value, Decimal) and not value.is_finite():
+                raise ValueError
+            return value, int(pk)
+        except (DjangoValidationError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_position_from_instance(self, instance, ordering):
+        return f"{getattr(instance, ordering[0].lstrip('-'))}:{instance.pk}"
+
+class ReportCursorPagination(KeysetCursorPagination):
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        return view.get_report_ordering()
+
+    def get_paginated_response(self, data):
+        # Results stay under the report's historical key (e.g. "low_stock_cars")
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            self.view.results_key: data,
+        })
+
 class CarPagination(PageNumberPagination):
     page_size = 5
     page_size_query_param = "page_size"
     max_page_size = 100
 
+class CustomerPagination(PageNumberPagination):
+    page_size = 5
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+# Every page is an index range scan on (sale_date, id), or (customer, sale_date, id) for
+# one customer's feed, and no COUNT(*)
+class SaleCursorPagination(KeysetCursorPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ('-sale_date', '-id')
+
 class RegisterView(APIView):
     permission_classes = [AllowAny]
+    throttle_scope = "register"
 
+    # One username lookup and three INSERTs (user, profile, token): see provisioning.py
     def post(self, request):
         username = request.data.get("username")
         password = request.data.get("password")
@@ -62,51 +188,99 @@ class RegisterView(APIView):
         if not username or not password:
             return Response({"error": "Username and password required"}, status=400)
 
-        if User.objects.filter(username=username).exists():
-            return Response({"error": "Username already exists"}, status=400)
-
         try:
-            with transaction.atomic():
-                # Step 1: Create user
-                user = User.objects.create_user(username=username, password=password)
-
-                # Step 2: Assign role-based flags
-                if role == "admin":
-                    user.is_superuser = True
-                    user.is_staff = True
-                elif role == "staff":
-                    user.is_staff = True
-                user.save()
-
-                # Step 3: Ensure no duplicate profile (failsafe check)
-                if UserProfile.objects.filter(user=user).exists():
-                    raise ValidationError("UserProfile already exists for this user.")
-
-                # Step 4: Create user profile
-                UserProfile.objects.create(user=user, role=role)
-
-                # Step 5: Create token
-                token, _ = Token.objects.get_or_create(user=user)
-
-                return Response({
-                    "message": "User registered successfully",
-                    "token": token.key,
-                    "username": user.username,
-                    "role": role
-                }, status=status.HTTP_201_CREATED)
-
-        except ValidationError as ve:
-            user.delete()  # Cleanup orphaned user
-            return Response({"error": str(ve)}, status=400)
-
+            [user] = provision_users([{"username": username, "password": password, "role": role}])
+        except IntegrityError:
+            user = None  # registered concurrently, between the lookup and the insert
         except Exception as e:
-            # Handle any unknown issue and try to rollback user if created
-            if 'user' in locals():
-                user.delete()
             return Response({"error": f"Registration failed: {str(e)}"}, status=500)
+        if not isinstance(user, User):
+            return Response({"error": "Username already exists"}, status=400)
+
+        return Response({
+            "message": "User registered successfully",
+            "token": user.auth_token.key,
+            "username": user.username,
+            "role": role
+        }, status=status.HTTP_201_CREATED)
+
+class UserBulkCreateView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdmin]
+    throttle_scope = "user-bulk-create"
+    max_items = PROVISIONING_SETTINGS["MAX_USERS"]
+
+    # Accepts a list of users, or {"mode": "atomic" | "partial", "role": ..., "users": [...]}.
+    # "role" is the default for items without one. "atomic" (default) creates nobody
+    # unless every item is valid; "partial" creates the valid items and reports the others.
+    def post(self, request):
+        payload = request.data
+        if isinstance(payload, list):
+            items = payload
+            mode = request.query_params.get("mode", "atomic")
+            default_role = request.query_params.get("role", "customer")
+        else:
+            items = payload.get("users")
+            mode = payload.get("mode", "atomic")
+            default_role = payload.get("role", "customer")
+
+        if mode not in ["atomic", "partial"]:
+            return Response({"error": "mode must be 'atomic' or 'partial'"}, status=400)
+        if not isinstance(default_role, str) or default_role.lower() not in ["admin", "staff", "customer"]:
+            return Response({"error": "Role must be admin, staff, or customer"}, status=400)
+        if not isinstance(items, list) or not items:
+            return Response({"error": "Provide a non-empty list of users"}, status=400)
+        if len(items) > self.max_items:
+            return Response({"error": f"At most {self.max_items} users per request"}, status=400)
+
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = BulkUserItemSerializer(data=item, context={"default_role": default_role.lower()})
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = serializer.errors
+
+        atomic = mode == "atomic"
+        if valid:
+            try:
+                provisioned = provision_users(
+                    [data for _, data in valid],
+                    all_or_nothing=atomic,
+                    validate_only=atomic and len(valid) != len(items),
+                )
+            except IntegrityError:
+                return Response({"error": "Some of these usernames were registered concurrently, retry"}, status=409)
+            for (index, _), result in zip(valid, provisioned):
+                results[index] = result
+
+        failed = {i for i, result in enumerate(results) if not isinstance(result, User)}
+        created = 0 if atomic and failed else len(items) - len(failed)
+        report = []
+        for index, result in enumerate(results):
+            if index in failed:
+                report.append({"index": index, "status": "error", "errors": result})
+            elif not created:
+                # Valid, but not written because the atomic batch was rejected
+                report.append({"index": index, "status": "skipped"})
+            else:
+                report.append({
+                    "index": index, "status": "created", "id": result.pk,
+                    "username": result.username, "role": result.userprofile.role,
+                    "token": result.auth_token.key,
+                })
+
+        return Response({
+            "mode": mode,
+            "created": created,
+            "failed": len(failed),
+            "results": report,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
 
 class LoginView(APIView):
     permission_classes = [AllowAny]
+    throttle_scope = "login"
 
     def post(self, request):
         username = request.data.get('username')
@@ -128,30 +302,25 @@ class LoginView(APIView):
         return Response({'error': 'Invalid Credentials'}, status=status.HTTP_400_BAD_REQUEST)
 
 class LogoutView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
     def post(self, request):
         try:
-            request.user.auth_token.delete()
+            # Deleting the token also evicts it from the authentication cache (signals.py)
+            request.auth.delete()
             return Response({"message": "Successfully logged out"}, status=status.HTTP_200_OK)
         except:
             return Response({"error": "Something went wrong"}, status=status.HTTP_400_BAD_REQUEST)
 
 # ✅ Car Views
-class CarListCreateView(generics.ListCreateAPIView):
+class CarListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = Car.objects.all()
     serializer_class = CarSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     pagination_class = CarPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = {
-        'brand': ['exact', 'icontains'],
-        'model': ['exact', 'icontains'],
-        'year': ['exact', 'lt', 'lte', 'gt', 'gte'],
-        'price': ['exact', 'lt', 'lte', 'gt', 'gte'],
-        'stock': ['exact', 'lt', 'lte', 'gt', 'gte']
-    }
-    search_fields = ['brand', 'model']
+    # ?search= goes through the indexed search backend instead of LIKE '%term%' scans
+    filter_backends = [DjangoFilterBackend, CarSearchFilter, filters.OrderingFilter]
+    filterset_class = CarFilter
     ordering_fields = ['price', 'year', 'stock']
 
     def get_permissions(self):
@@ -159,45 +328,157 @@ class CarListCreateView(generics.ListCreateAPIView):
             return [IsAuthenticated(), IsAdmin()]
         return [IsAuthenticated()]
 
-class CarDetailView(generics.RetrieveUpdateDestroyAPIView):
+    def get_validators(self, request, *args, **kwargs):
+        # Any change inside the filtered set moves max(updated_at); removals change the count
+        state = self.filter_queryset(self.get_queryset()).aggregate(
+            last_modified=Max('updated_at'), total=Count('id')
+        )
+        etag = make_etag(request.get_full_path(), state['last_modified'], state['total'])
+        return etag, state['last_modified']
+
+    def list(self, request, *args, **kwargs):
+        key = car_list_cache.key(request)
+        data = car_list_cache.get(key)
+        if data is not None:
+            return Response(data, headers={"X-Cache": "HIT"})
+        response = super().list(request, *args, **kwargs)
+        car_list_cache.set(key, response.data)
+        response["X-Cache"] = "MISS"
+        return response
+
+class CarFacetsView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    # Same filter (and ?search=) parameters as the car list; cached per normalized filter set
+    def get(self, request):
+        facets, errors = get_car_facets(request.query_params)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(facets)
+
+# ✅ Delta sync of the catalog (see sync.py): start without a cursor for a full copy, then
+# pass back the cursor of every response to get only what changed since. 410 means the
+# cursor outlived the deletion tombstones and the client must start over.
+class CarChangesView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        cursor = request.query_params.get("cursor")
+        page_size = request.query_params.get("page_size", str(SYNC_SETTINGS['PAGE_SIZE']))
+        if not page_size.isdigit() or int(page_size) < 1:
+            raise ValidationError({"page_size": "Enter a positive whole number."})
+        try:
+            position = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            raise ValidationError({"cursor": "Invalid cursor."})
+
+        try:
+            cars, deleted, position, has_more = car_changes(
+                position, min(int(page_size), SYNC_SETTINGS['MAX_PAGE_SIZE'])
+            )
+        except CursorExpired:
+            return Response({"error": "Cursor expired, sync again without a cursor"}, status=status.HTTP_410_GONE)
+        return Response({
+            "cursor": encode_cursor(position),
+            "has_more": has_more,
+            "changed": CarSerializer(cars, many=True).data,
+            "deleted": deleted,
+        })
+
+class CarListCacheStatsView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        return Response(car_list_cache.stats())
+
+# Connection pool counters of the worker process that answers the request
+class DatabasePoolStatsView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        return Response({"pid": os.getpid(), "pools": pool_stats()})
+
+# Prometheus text exposition of the request metrics of the answering worker
+class MetricsView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        return HttpResponse(metrics_registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+class CarDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Car.objects.all()
     serializer_class = CarSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     def get_permissions(self):
         if self.request.method in ['PUT', 'PATCH', 'DELETE']:
             return [IsAuthenticated(), IsAdmin()]
         return [IsAuthenticated()]
 
+    def get_validators(self, request, *args, **kwargs):
+        updated_at = Car.objects.filter(pk=kwargs['pk']).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return None, None
+        return make_etag('car', kwargs['pk'], updated_at), updated_at
+
+class CarImportView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdmin]
+    throttle_scope = "car-import"
+
+    # Multipart upload with a "file" field (.csv or .ndjson, or set "file_format").
+    # The response is NDJSON streamed while the file is imported: one line per row
+    # error, a progress line per batch and a final "done" summary.
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "Upload the catalog as a 'file' field"}, status=400)
+        file_format = request.data.get("file_format") or guess_format(upload.name)
+        if file_format not in ["csv", "ndjson"]:
+            return Response({"error": "file_format must be 'csv' or 'ndjson'"}, status=400)
+        try:
+            batch_size = min(max(int(request.data.get("batch_size", 500)), 1), 5000)
+        except (TypeError, ValueError):
+            return Response({"error": "batch_size must be an integer"}, status=400)
+
+        events = CarImporter(batch_size=batch_size).run(open_rows(upload, file_format))
+        return StreamingHttpResponse(
+            (json.dumps(event) + "\n" for event in events),
+            content_type="application/x-ndjson",
+        )
+
 # ✅ Car Stats
+# Both views read the cached statistics snapshot (see stats.py), which is recomputed
+# in a single grouped query after any Car / Sale change.
 class CarStatisticsView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    throttle_scope = "car-statistics"
 
     def get(self, request):
-        data = {
-            "total_cars": Car.objects.count(),
-            "average_price": Car.objects.aggregate(Avg("price"))["price__avg"],
-            "total_stock": Car.objects.aggregate(Sum("stock"))["stock__sum"],
-            "unique_models": Car.objects.values("brand", "model").distinct().count()
-        }
-        return Response(data)
+        return Response(get_inventory_stats())
 
 class AveragePriceView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    throttle_scope = "car-statistics"
 
     def get(self, request):
-        avg_price = Car.objects.aggregate(avg_price=Avg('price'))['avg_price']
+        avg_price = get_inventory_stats()["average_price"]
         if avg_price is None:
             return Response({"error": "No cars available"}, status=status.HTTP_404_NOT_FOUND)
         return Response({"average_price": avg_price}, status=status.HTTP_200_OK)
 
 # ✅ Sales Views
 class SaleListCreateView(generics.ListCreateAPIView):
-    queryset = Sale.objects.all()
+    queryset = Sale.objects.select_related('car', 'customer').order_by('-sale_date', '-id')
     serializer_class = SaleSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -211,80 +492,236 @@ class SaleListCreateView(generics.ListCreateAPIView):
             queryset = queryset.filter(customer_id=customer_id)
         return queryset
 
-    def perform_create(self, serializer):
-        car = serializer.validated_data['car']
-        quantity = serializer.validated_data['quantity']
-        if car.stock < quantity:
-            raise ValidationError(f"Not enough stock! Only {car.stock} left.")
-        with transaction.atomic():
-            car.stock -= quantity
-            car.save()
-            serializer.save()
+class SaleBulkCreateView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsStaffOrAdmin]
+    max_items = 1000
+
+    # Accepts a list of sales, or {"mode": "atomic" | "partial", "sales": [...]}.
+    # "atomic" (default) writes nothing unless every item is valid; "partial" records
+    # the valid items and reports the others.
+    def post(self, request):
+        payload = request.data
+        if isinstance(payload, list):
+            items, mode = payload, request.query_params.get("mode", "atomic")
+        else:
+            items, mode = payload.get("sales"), payload.get("mode", "atomic")
+
+        if mode not in ["atomic", "partial"]:
+            return Response({"error": "mode must be 'atomic' or 'partial'"}, status=400)
+        if not isinstance(items, list) or not items:
+            return Response({"error": "Provide a non-empty list of sales"}, status=400)
+        if len(items) > self.max_items:
+            return Response({"error": f"At most {self.max_items} sales per request"}, status=400)
+
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = BulkSaleItemSerializer(data=item)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = serializer.errors
+
+        atomic = mode == "atomic"
+        if valid:
+            committed = commit_bulk_sales(
+                [data for _, data in valid],
+                all_or_nothing=atomic,
+                # Still report stock/lookup errors when the atomic batch is already rejected
+                validate_only=atomic and len(valid) != len(items),
+            )
+            for (index, _), result in zip(valid, committed):
+                results[index] = result
+
+        failed = {i for i, result in enumerate(results) if not isinstance(result, Sale)}
+        created = 0 if atomic and failed else len(items) - len(failed)
+        report = []
+        for index, result in enumerate(results):
+            if index in failed:
+                report.append({"index": index, "status": "error", "errors": result})
+            elif not created:
+                # Valid, but not written because the atomic batch was rejected
+                report.append({"index": index, "status": "skipped"})
+            else:
+                report.append({
+                    "index": index, "status": "created", "id": result.pk,
+                    "car": result.car_id, "customer": result.customer_id,
+                    "quantity": result.quantity, "total_price": str(result.total_price),
+                })
+
+        return Response({
+            "mode": mode,
+            "created": created,
+            "failed": len(failed),
+            "results": report,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
+class SaleFeedView(generics.ListAPIView):
+    queryset = Sale.objects.select_related('car', 'customer')
+    serializer_class = SaleSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = SaleCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        customer_id = self.request.query_params.get('customer', None)
+        if customer_id is not None:
+            queryset = queryset.filter(customer_id=customer_id)
+        return queryset
+
+# Revenue and units per day / month / car / brand / customer, read from the rollups
+class SalesAnalyticsView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsStaffOrAdmin]
+
+    def get(self, request):
+        data, errors = sales_analytics(request.query_params)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
 
 class SaleDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Sale.objects.all()
+    queryset = Sale.objects.select_related('car', 'customer')
     serializer_class = SaleSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsStaffOrAdmin]
+
+# ✅ Reservation Views
+# Holds on car stock while a deal is closed (see services.py). A hold expires after
+# its TTL unless converted into a sale or released first.
+class ReservationListCreateView(generics.ListCreateAPIView):
+    serializer_class = ReservationSerializer
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated, IsStaffOrAdmin]
 
+    def get_queryset(self):
+        queryset = Reservation.objects.order_by('-created_at', '-id')
+        status_filter = self.request.query_params.get('status')
+        if status_filter is not None:
+            queryset = queryset.filter(status=status_filter)
+        for param in ['car', 'customer']:
+            value = self.request.query_params.get(param)
+            if value is not None:
+                if not value.isdigit():
+                    raise ValidationError({param: "Enter a whole number."})
+                queryset = queryset.filter(**{f'{param}_id': value})
+        return queryset
+
+class ReservationDetailView(generics.RetrieveAPIView):
+    queryset = Reservation.objects.all()
+    serializer_class = ReservationSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsStaffOrAdmin]
+
+class ReservationConvertView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsStaffOrAdmin]
+
+    def post(self, request, pk):
+        reservation = get_object_or_404(Reservation, pk=pk)
+        try:
+            sale, remaining = convert_reservation(reservation)
+        except ReservationUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        sale = Sale.objects.select_related('car', 'customer').get(pk=sale.pk)
+        sale.remaining_stock = remaining
+        return Response(SaleSerializer(sale).data, status=status.HTTP_201_CREATED)
+
+class ReservationReleaseView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsStaffOrAdmin]
+
+    def post(self, request, pk):
+        reservation = get_object_or_404(Reservation, pk=pk)
+        try:
+            release_reservation(reservation)
+        except ReservationUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response(ReservationSerializer(reservation).data)
+
 # ✅ Customer Views
 class CustomerListCreateView(generics.ListCreateAPIView):
-    queryset = Customer.objects.all()
+    # Purchase aggregates are read from CustomerSummary in the same query as the page
+    queryset = Customer.objects.select_related('summary').order_by('cust_id')
     serializer_class = CustomerSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
+    pagination_class = CustomerPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = CustomerFilter
 
     def get_permissions(self):
         if self.request.method == 'POST':
             return [IsAuthenticated(), IsAdmin()]
         return [IsAuthenticated()]
 
-class CustomerDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Customer.objects.all()
+class CustomerDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Customer.objects.select_related('summary')
     serializer_class = CustomerSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     def get_permissions(self):
         if self.request.method in ['PUT', 'PATCH', 'DELETE']:
             return [IsAuthenticated(), IsAdmin()]
         return [IsAuthenticated()]
 
-# ✅ Advanced Raw SQL Queries
-class LowStockCarsView(APIView):
-    authentication_classes = [TokenAuthentication]
+    def get_validators(self, request, *args, **kwargs):
+        # The representation covers the customer row and its purchase summary
+        row = Customer.objects.filter(pk=kwargs['pk']).values_list('updated_at', 'summary__updated_at').first()
+        if row is None:
+            return None, None
+        last_modified = max(value for value in row if value is not None)
+        return make_etag('customer', kwargs['pk'], *row), last_modified
+
+# ✅ Inventory Reports
+# Thresholds and sort order come from the query string, rows are served through
+# CarSerializer like the other car endpoints, and pages are keyset cursors over the
+# (stock, id) / (price, id) indexes.
+class CarReportView(generics.ListAPIView):
+    serializer_class = CarSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    pagination_class = ReportCursorPagination
+    results_key = None
+    threshold_param = None
+    default_threshold = None
+    sort_field = None
+    default_order = "asc"
+
+    def get_threshold(self):
+        value = self.request.query_params.get(self.threshold_param, self.default_threshold)
+        try:
+            threshold = Decimal(str(value))
+        except InvalidOperation:
+            threshold = None
+        if threshold is None or not threshold.is_finite():
+            raise ValidationError({self.threshold_param: "Enter a number."})
+        return threshold
+
+    def get_report_ordering(self):
+        order = self.request.query_params.get("order", self.default_order)
+        if order not in ["asc", "desc"]:
+            raise ValidationError({"order": "Must be 'asc' or 'desc'."})
+        prefix = "-" if order == "desc" else ""
+        return (f"{prefix}{self.sort_field}", f"{prefix}id")
+
+class LowStockCarsView(CarReportView):
     permission_classes = [IsAuthenticated, IsStaffOrAdmin]
+    results_key = "low_stock_cars"
+    threshold_param = "below"
+    default_threshold = 5
+    sort_field = "stock"
 
-    def get(self, request):
-        query = "SELECT id, brand, model, year, price, stock FROM inventory_car WHERE stock < 5 ORDER BY stock ASC"
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute(query)
-                cars = cursor.fetchall()
-            result = [
-                {
-                    "id": c[0], "brand": c[1], "model": c[2],
-                    "year": c[3], "price": c[4], "stock": c[5]
-                } for c in cars
-            ]
-            return Response({"low_stock_cars": result}, status=200)
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
+    def get_queryset(self):
+        return Car.objects.filter(stock__lt=self.get_threshold())
 
-class ExpensiveCarsView(APIView):
-    authentication_classes = [TokenAuthentication]
+class ExpensiveCarsView(CarReportView):
     permission_classes = [IsAuthenticated]  # Changed: Removed IsStaffOrAdmin to allow all authenticated users
+    results_key = "expensive_cars"
+    threshold_param = "above"
+    default_threshold = 5000000
+    sort_field = "price"
+    default_order = "desc"
 
-    def get(self, request):
-        query = "SELECT id, brand, model, year, price, stock FROM inventory_car WHERE price > 5000000 ORDER BY price DESC"
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute(query)
-                cars = cursor.fetchall()
-            result = [
-                {
-                    "id": c[0], "brand": c[1], "model": c[2],
-                    "year": c[3], "price": c[4], "stock": c[5]
-                } for c in cars
-            ]
-            return Response({"expensive_cars": result})
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
\ No newline at end of file
+    def get_queryset(self):
+        return Car.objects.filter(price__gt=self.get_threshold())
@@ -3,6 +3,12 @@ ASGI config for showroom project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the live stock stream (/api/async/cars/stream/) through this entry point, e.g.
+``uvicorn showroom.asgi:application --workers 4``: every open stream then waits on
+the event loop instead of holding a worker thread. Under WSGI a stream ties up a
+thread for its whole lifetime. With more than one worker, set
+LIVE_EVENTS_BACKEND=cache so that events reach every worker.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
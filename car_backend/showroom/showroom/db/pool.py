@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+# ✅ Per-process database connection pool
+# Django opens a connection per thread and closes it at the end of each request; a
+# pooled backend hands those "closes" back here instead, so a request only pays for
+# a connection handshake when the pool has none idle. Idle connections are reused
+# most-recently-used first, checked (ping) before reuse when health checks are on,
+# and retired once older than max_lifetime. When all `size` connections are checked
+# out, callers wait up to `timeout` seconds and then fail.
+class ConnectionPool:
+    def __init__(self, size=10, max_lifetime=1800, timeout=10, health_check=True):
+        self.size = size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.health_check = health_check
+        self._idle = deque()  # (connection, created_at)
+        self._created_at = {}  # id(connection) -> created_at, for connections checked out
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'checkout_failures': 0,
+            'connections_opened': 0,
+            'connections_closed': 0,
+            'health_check_failures': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+
+    def _expired(self, created_at):
+        return self.max_lifetime is not None and time.monotonic() - created_at > self.max_lifetime
+
+    def _discard(self, connection, close):
+        self._stats['connections_closed'] += 1
+        try:
+            close(connection)
+        except Exception:
+            pass  # already broken
+
+    def checkout(self, connect, close, ping):
+        """Return an open connection; ``connect``, ``close`` and ``ping`` are backend callables."""
+        started = time.monotonic()
+        reused = None
+        with self._cond:
+            while True:
+                while self._idle:
+                    connection, created_at = self._idle.pop()
+                    if self._expired(created_at):
+                        self._discard(connection, close)
+                        continue
+                    reused = (connection, created_at)
+                    break
+                if reused is not None or self._in_use + len(self._idle) < self.size:
+                    self._in_use += 1
+                    break
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._stats['checkout_failures'] += 1
+                    raise PoolTimeout(
+                        f"No database connection available after {self.timeout}s "
+                        f"({self.size} in use)"
+                    )
+                self._cond.wait(remaining)
+            waited = time.monotonic() - started
+            self._stats['checkouts'] += 1
+            self._stats['wait_time_total'] += waited
+            self._stats['wait_time_max'] = max(self._stats['wait_time_max'], waited)
+
+        # Network round-trips happen outside the lock; the slot is already reserved
+        if reused is not None and self.health_check:
+            try:
+                ping(reused[0])
+            except Exception:
+                with self._cond:
+                    self._stats['health_check_failures'] += 1
+                    self._discard(reused[0], close)
+                reused = None
+        if reused is not None:
+            connection, created_at = reused
+        else:
+            try:
+                connection, created_at = connect(), time.monotonic()
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._stats['checkout_failures'] += 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats['connections_opened'] += 1
+        with self._cond:
+            self._created_at[id(connection)] = created_at
+        return connection
+
+    def checkin(self, connection, close, reusable=True):
+        with self._cond:
+            created_at = self._created_at.pop(id(connection), None)
+            self._in_use -= 1
+            if reusable and created_at is not None and not self._expired(created_at):
+                self._idle.append((connection, created_at))
+            else:
+                self._discard(connection, close)
+            self._cond.notify()
+
+    def close_idle(self, close):
+        with self._cond:
+            while self._idle:
+                self._discard(self._idle.pop()[0], close)
+
+    def stats(self):
+        with self._cond:
+            checkouts = self._stats['checkouts']
+            return {
+                'size': self.size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                **self._stats,
+                'wait_time_avg': self._stats['wait_time_total'] / checkouts if checkouts else 0.0,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, options):
+    """The pool of ``alias`` in this process; a forked worker never inherits its parent's sockets."""
+    with _pools_lock:
+        pid, pool = _pools.get(alias, (None, None))
+        if pool is None or pid != os.getpid():
+            pool = ConnectionPool(**options)
+            _pools[alias] = (os.getpid(), pool)
+        return pool
+
+
+def pool_stats():
+    with _pools_lock:
+        pools = {alias: pool for alias, (pid, pool) in _pools.items() if pid == os.getpid()}
+    return {alias: pool.stats() for alias, pool in pools.items()}
+
+
+# ✅ Database backend support
+# Mixed into a backend's DatabaseWrapper: opening a connection checks one out of the
+# alias's pool and closing it checks it back in. Pool settings live under
+# DATABASES[alias]['OPTIONS']['pool'] and are kept away from the driver.
+class PooledDatabaseWrapperMixin:
+    pool_defaults = {'size': 10, 'max_lifetime': 1800, 'timeout': 10, 'health_check': True}
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, {**self.pool_defaults, **self.settings_dict['OPTIONS'].get('pool', {})})
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        open_connection = super().get_new_connection
+        try:
+            return self.pool.checkout(
+                lambda: open_connection(conn_params), self.close_pooled_connection, self.ping_pooled_connection
+            )
+        except PoolTimeout as e:
+            raise self.Database.OperationalError(str(e)) from e
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Never hand a connection with an open transaction to the next request
+        reusable = not self.in_atomic_block
+        if reusable and not self.autocommit:
+            try:
+                self.connection.rollback()
+            except Exception:
+                reusable = False
+        self.pool.checkin(self.connection, self.close_pooled_connection, reusable=reusable)
+
+    @staticmethod
+    def close_pooled_connection(connection):
+        connection.close()
+
+    @staticmethod
+    def ping_pooled_connection(connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
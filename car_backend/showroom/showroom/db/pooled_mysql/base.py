@@ -0,0 +1,11 @@
+from django.db.backends.mysql import base
+
+from showroom.db.pool import PooledDatabaseWrapperMixin
+
+
+# MySQL backend drawing its connections from a per-process pool (showroom/db/pool.py)
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    @staticmethod
+    def ping_pooled_connection(connection):
+        # mysqlclient's ping() is a protocol-level round-trip, cheaper than SELECT 1
+        connection.ping()
@@ -0,0 +1,129 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.throttling import BaseThrottle
+
+PRIMARY = 'default'
+STICKY_SECONDS = getattr(settings, 'DATABASE_READ_YOUR_WRITES_SECONDS', 10)
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Reads may only leave the primary while this is set: ReplicaRoutingMiddleware sets it
+# for safe requests of clients that have not written recently. Management commands,
+# shells and write requests always read from the primary.
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def reading_from_replica():
+    return _replica_reads.get() and bool(replicas())
+
+
+def read_source():
+    """'replica' or 'primary': part of read-model cache keys, so clients pinned to the
+    primary never get an entry computed from a lagging replica."""
+    return 'replica' if reading_from_replica() else 'primary'
+
+
+def read_model_timeout(timeout):
+    """Cache lifetime for a read model computed now: data read from a replica may lag,
+    so it is kept no longer than the read-your-writes window."""
+    if reading_from_replica():
+        return STICKY_SECONDS if timeout is None else min(timeout, STICKY_SECONDS)
+    return timeout
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+# ✅ Primary / replica router
+# Writes, migrations and every read outside a replica-enabled request go to the
+# primary; reads inside one are spread randomly over DATABASE_REPLICAS. Reads inside a
+# transaction on the primary, and reads after a write in the same request, stay on
+# the primary too: they must see what the transaction / request wrote.
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if reading_from_replica() and not connections[PRIMARY].in_atomic_block:
+            return random.choice(replicas())
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _replica_reads.set(False)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        return db not in replicas()
+
+
+def _client_keys(request, write=False):
+    # A client is its credentials. Only a write without any (login, register) pins its
+    # address, since the token it will read with next is not known yet. The address
+    # is the client's own (X-Forwarded-For behind proxies, as the rate limits use it),
+    # so one write does not pin every client behind the same proxy.
+    credentials = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    keys = []
+    if credentials:
+        keys.append('db:primary-pin:auth:' + hashlib.sha256(credentials.encode()).hexdigest())
+    if not (write and credentials):
+        keys.append('db:primary-pin:addr:' + BaseThrottle().get_ident(request))
+    return keys
+
+
+# ✅ Read-your-writes
+# Any write request pins its client (see _client_keys) to the primary for
+# STICKY_SECONDS (longer than the replication lag we tolerate), so the client never
+# sees its own change undone by a replica that has not caught up yet. The pin lives in the default cache, so it is
+# shared by all workers when that cache is.
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replicas():
+            return self.get_response(request)
+
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            cache.set_many(dict.fromkeys(_client_keys(request, write=True), 1), STICKY_SECONDS)
+            return response
+        with replica_reads(not cache.get_many(_client_keys(request))):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not replicas():
+            return await self.get_response(request)
+
+        if request.method not in SAFE_METHODS:
+            response = await self.get_response(request)
+            await cache.aset_many(dict.fromkeys(_client_keys(request, write=True), 1), STICKY_SECONDS)
+            return response
+        with replica_reads(not await cache.aget_many(_client_keys(request))):
+            return await self.get_response(request)
@@ -38,7 +38,7 @@ INSTALLED_APPS = [
 # ✅ REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'inventory.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -49,11 +49,113 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'inventory.throttling.TokenBucketThrottle',
+    ],
+}
+
+# ✅ Rate limiting (inventory.throttling): token buckets per client, role and scope.
+# Buckets live in RATE_LIMIT_CACHE; use a shared cache (see Caches) with several workers.
+RATE_LIMITS = {
+    'ENABLED': os.getenv('RATE_LIMITS_ENABLED', 'True') == 'True',
+    'CACHE': os.getenv('RATE_LIMIT_CACHE', 'default'),
+    'RATES': {
+        'anon': os.getenv('RATE_LIMIT_ANON', '120/min'),
+        'customer': os.getenv('RATE_LIMIT_CUSTOMER', '600/min'),
+        'staff': os.getenv('RATE_LIMIT_STAFF', '1200/min'),
+        'admin': None,
+    },
+    # Per-view limits, by the view's throttle_scope
+    'SCOPES': {
+        'login': {'anon': '10/min', 'customer': '10/min', 'staff': '10/min'},  # password hashing per attempt
+        'register': {'anon': '5/min'},
+        'car-statistics': {'anon': '30/min', 'customer': '60/min', 'staff': '120/min'},
+        'car-import': {'admin': '10/min'},
+        'user-bulk-create': {'admin': '10/min'},
+        # Connections, not requests: a stream lasts up to LIVE_EVENTS['MAX_STREAM_SECONDS']
+        'car-stream': {'customer': '20/min', 'staff': '20/min'},
+    },
+}
+
+# ✅ Caches
+# Point DJANGO_CACHE_BACKEND / DJANGO_CACHE_LOCATION at a shared cache (e.g.
+# django.core.cache.backends.redis.RedisCache) when running several workers: the
+# inventory version that invalidates cached statistics and responses lives here, and
+# with the local-memory default every worker keeps its own.
+CACHE_BACKEND = os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+CACHE_LOCATION = os.getenv('DJANGO_CACHE_LOCATION', '')
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1000'))
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION or 'showroom-default',
+    },
+    # Cached API responses (inventory.caching.ResponseCache), size-bounded on its own
+    'responses': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION or 'showroom-responses',
+        'KEY_PREFIX': 'responses',
+        'TIMEOUT': int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300')),
+    },
+}
+if 'redis' not in CACHE_BACKEND and 'memcached' not in CACHE_BACKEND:
+    # Shared stores bound their size through their own eviction policy
+    CACHES['responses']['OPTIONS'] = {'MAX_ENTRIES': RESPONSE_CACHE_MAX_ENTRIES}
+
+# ✅ Token authentication cache (inventory.authentication.CachedTokenAuthentication)
+AUTH_TOKEN_CACHE = {
+    'MAX_SIZE': int(os.getenv('AUTH_TOKEN_CACHE_SIZE', '10000')),
+    'TTL': int(os.getenv('AUTH_TOKEN_CACHE_TTL', '300')),
+    # The per-process LRU only learns about logouts and role changes made in its own
+    # worker, so its entries live a few seconds
+    'LOCAL_TTL': int(os.getenv('AUTH_TOKEN_LOCAL_CACHE_TTL', '5')),
+    # Name of a CACHES alias to share entries across workers; empty = per-process LRU.
+    # Defaults to the shared default cache when there is one (Redis / Memcached).
+    'SHARED_CACHE': os.getenv(
+        'AUTH_TOKEN_SHARED_CACHE', 'default' if 'redis' in CACHE_BACKEND or 'memcached' in CACHE_BACKEND else ''
+    ),
+}
+
+# ✅ Bulk user provisioning (inventory.provisioning)
+USER_PROVISIONING = {
+    # Threads hashing passwords in parallel (the hashers release the GIL)
+    'HASH_WORKERS': int(os.getenv('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 1))),
+    'MAX_USERS': int(os.getenv('BULK_USERS_MAX', '1000')),
+}
+
+# ✅ Stock reservations (inventory.services); run `manage.py sweep_reservations --interval 30`
+# to hand the stock of expired holds back
+RESERVATIONS = {
+    'DEFAULT_TTL': int(os.getenv('RESERVATION_TTL_SECONDS', '900')),
+    'MAX_TTL': int(os.getenv('RESERVATION_MAX_TTL_SECONDS', '86400')),
+}
+
+# ✅ Car catalog delta sync (inventory.sync); run `manage.py prune_car_tombstones` daily
+CAR_SYNC = {
+    # Changes are handed out once they are this old: keep it above the longest
+    # transaction writing cars plus the clock skew between app servers
+    'SETTLE_SECONDS': int(os.getenv('CAR_SYNC_SETTLE_SECONDS', '5')),
+    'TOMBSTONE_DAYS': int(os.getenv('CAR_SYNC_TOMBSTONE_DAYS', '30')),
+}
+
+# ✅ Live stock events (inventory.events), streamed by /api/async/cars/stream/ under ASGI.
+# With several workers set LIVE_EVENTS_BACKEND=cache and a shared cache (Redis / Memcached).
+LIVE_EVENTS = {
+    'ENABLED': os.getenv('LIVE_EVENTS_ENABLED', 'True') == 'True',
+    'BACKEND': os.getenv('LIVE_EVENTS_BACKEND', 'local'),
+    'CACHE': os.getenv('LIVE_EVENTS_CACHE', 'default'),
+    'BUFFER_SIZE': int(os.getenv('LIVE_EVENTS_BUFFER_SIZE', '1000')),
+    'RETENTION_SECONDS': int(os.getenv('LIVE_EVENTS_RETENTION_SECONDS', '300')),
+    'MAX_STREAM_SECONDS': int(os.getenv('LIVE_EVENTS_MAX_STREAM_SECONDS', '300')),
 }
 
 # ✅ Middleware
 MIDDLEWARE = [
+    'inventory.metrics.RequestMetricsMiddleware',  # ✅ outermost: times the whole stack
+    'inventory.querycheck.QueryInspectionMiddleware',  # ✅ opt-in, see QUERY_INSPECTION
     'django.middleware.security.SecurityMiddleware',
+    'showroom.db.routers.ReplicaRoutingMiddleware',  # ✅ before anything that reads the database
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # ✅ CORS before CommonMiddleware
     'django.middleware.common.CommonMiddleware',
@@ -63,6 +165,22 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# ✅ Request metrics (published at /api/metrics/)
+REQUEST_METRICS = {
+    'ENABLED': os.getenv('REQUEST_METRICS_ENABLED', 'True') == 'True',
+    # Share of requests (0..1) whose latency, SQL and response size are recorded
+    'SAMPLE_RATE': float(os.getenv('REQUEST_METRICS_SAMPLE_RATE', '1.0')),
+}
+
+# ✅ N+1 / duplicate query detection (development and CI; walks the stack per query)
+QUERY_INSPECTION = {
+    'ENABLED': os.getenv('QUERY_INSPECTION_ENABLED', 'False') == 'True',
+    # Statement shapes repeated more often than this in one request are reported
+    'THRESHOLD': int(os.getenv('QUERY_INSPECTION_THRESHOLD', '3')),
+    # Fail the request instead of logging a warning
+    'RAISE': os.getenv('QUERY_INSPECTION_RAISE', 'False') == 'True',
+}
+
 # ✅ CORS configuration
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:5173').split(',')
 
@@ -103,9 +221,12 @@ TEMPLATES = [
 WSGI_APPLICATION = 'showroom.wsgi.application'
 
 # ✅ Database
+# ✅ Connection pool (per worker process, see showroom/db/pool.py); DB_POOL_SIZE=0 disables it
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'showroom.db.pooled_mysql' if DB_POOL_SIZE else 'django.db.backends.mysql',
         'NAME': os.getenv('MYSQL_DATABASE', 'car_showroom'),
         'USER': os.getenv('MYSQL_USER', 'root'),
         'PASSWORD': os.getenv('MYSQL_PASSWORD', 'root'),
@@ -116,6 +237,40 @@ DATABASES = {
         },
     }
 }
+# Locally, SQLITE_DATABASE=<path> replaces MySQL (and the pool) with a SQLite file
+if os.getenv('SQLITE_DATABASE'):
+    DATABASES['default'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.getenv('SQLITE_DATABASE')}
+elif DB_POOL_SIZE:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'size': DB_POOL_SIZE,
+        # Seconds; keep it below MySQL's wait_timeout so the server never drops a pooled connection first
+        'max_lifetime': int(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+        # Seconds a request waits for a free connection before failing
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        # Ping idle connections before handing them out again
+        'health_check': os.getenv('DB_POOL_HEALTH_CHECKS', 'True') == 'True',
+    }
+
+# ✅ Read replicas: safe (GET/HEAD) requests read from them, everything else uses 'default'.
+# A client that writes is pinned to the primary for DATABASE_READ_YOUR_WRITES_SECONDS.
+# Locally, two SQLite files work too: SQLITE_REPLICAS=<path>[,<path>...] adds SQLite
+# replicas next to SQLITE_DATABASE (keep them copies of it; tests mirror them onto it).
+DATABASE_REPLICAS = []
+for index, path in enumerate(filter(None, os.getenv('SQLITE_REPLICAS', '').split(',')), start=1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+for index, host in enumerate(filter(None, os.getenv('MYSQL_REPLICA_HOSTS', '').split(',')), start=1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['showroom.db.routers.PrimaryReplicaRouter']
+DATABASE_READ_YOUR_WRITES_SECONDS = int(os.getenv('DB_READ_YOUR_WRITES_SECONDS', '10'))
 
 # ✅ Password validation
 AUTH_PASSWORD_VALIDATORS = [